@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# bench_planner.py  –  Benchmark del planificador  • puzzleBot
+# =========================================================
+# Tableros sintéticos N×N (por defecto 50×50) con tres disposiciones:
+#   • permutacion : tablero lleno, piezas barajadas
+#   • disperso    : mitad de casillas ocupadas, destinos al azar
+#   • casi        : tablero lleno con un 5 % de piezas intercambiadas
+#
+# Para cada una mide, en ms:
+#   • indice   : construir los trabajos (np.where por pieza → índice inverso)
+#   • greedy   : plan greedy con destinos libres (lista completa por paso →
+#                cubetas + anillos con cota del modelo de tiempos)
+#   • ciclos   : plan por defecto (ciclos + buffer)
+# y comprueba que la versión indexada da exactamente el mismo plan que la
+# de referencia O(N²) que se conserva aquí.
+#
+# Uso:
+#   python bench_planner.py --size 50 --seeds 3
+# =========================================================
+
+from __future__ import annotations
+import argparse
+import time
+from typing import List
+
+import numpy as np
+
+from cost_model import MachineModel
+from planification import HOME, _jobs, generate_plan
+
+# ──────────────────────────────────────────────────────────
+#   REFERENCIA O(N²)  (implementación anterior)
+# ──────────────────────────────────────────────────────────
+def _coords_ref(matrix: np.ndarray, piece_id: int):
+    pos = np.where(matrix == piece_id)
+    return int(pos[1][0]), int(pos[0][0])
+
+def _jobs_ref(puzzle_resuelto, pos_inicial, pos_final, rotaciones):
+    pending = []
+    for piece_id in np.unique(puzzle_resuelto):
+        sx, sy = _coords_ref(pos_inicial, piece_id)
+        dx, dy = _coords_ref(pos_final, piece_id)
+        if (sx, sy) != (dx, dy):
+            pending.append(((sx, sy), (dx, dy), int(rotaciones[sy, sx])))
+    return pending
+
+def _greedy_ref(pending, model: MachineModel) -> List[dict]:
+    pending, plan, cursor = list(pending), [], HOME
+    while pending:
+        t = np.asarray([s for s, _, _ in pending], float)
+        idx = int(np.argmin(model.travel_time(t[:, 0] - cursor[0], t[:, 1] - cursor[1])))
+        src, dst, rot = pending.pop(idx)
+        plan.append({"src_col": src[0], "src_row": src[1],
+                     "dst_col": dst[0], "dst_row": dst[1], "rot": rot})
+        cursor = dst
+    return plan
+
+# ──────────────────────────────────────────────────────────
+#   TABLEROS SINTÉTICOS
+# ──────────────────────────────────────────────────────────
+def tablero(tipo: str, n: int, rng: np.random.Generator):
+    """(puzzle_resuelto, pos_inicial, pos_final, rotaciones) de un tablero n×n."""
+    celdas = n * n
+    if tipo == "disperso":
+        k = celdas // 2
+        ini, fin = np.full(celdas, -1), np.full(celdas, -1)
+        ini[rng.choice(celdas, k, replace=False)] = np.arange(k)
+        fin[rng.choice(celdas, k, replace=False)] = np.arange(k)
+    else:
+        k = celdas
+        fin = np.arange(celdas)
+        ini = rng.permutation(celdas) if tipo == "permutacion" else fin.copy()
+        if tipo == "casi":
+            a = rng.choice(celdas, max(2, celdas // 20), replace=False)
+            ini[a] = ini[rng.permutation(a)]
+    rot = rng.integers(0, 4, (n, n)) * 90
+    return np.arange(k), ini.reshape(n, n), fin.reshape(n, n), rot
+
+def _ms(fn, *args, **kw):
+    t0 = time.perf_counter()
+    out = fn(*args, **kw)
+    return out, (time.perf_counter() - t0) * 1e3
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark del planificador sobre tableros sintéticos.")
+    ap.add_argument("--size", type=int, default=50, help="Lado del tablero N×N")
+    ap.add_argument("--seeds", type=int, default=3, help="Tableros por disposición")
+    ap.add_argument("--tipos", nargs="+", default=["permutacion", "disperso", "casi"])
+    args = ap.parse_args()
+
+    model = MachineModel.from_config()
+    print(f"{'tablero':<13}{'piezas':>7}{'índice ref':>12}{'índice':>9}"
+          f"{'greedy ref':>12}{'greedy':>9}{'ciclos':>9}  mismo plan")
+    for tipo in args.tipos:
+        for seed in range(args.seeds):
+            datos = tablero(tipo, args.size, np.random.default_rng(seed))
+            ref, t_ref = _ms(_jobs_ref, *datos)
+            nuevo, t_idx = _ms(_jobs, *datos)
+            plan_ref, g_ref = _ms(_greedy_ref, ref, model)
+            plan, g_new = _ms(generate_plan, *datos, model=model, assume_free=True)
+            _, t_cic = _ms(generate_plan, *datos, model=model)
+            igual = "sí" if ref == nuevo and plan_ref == plan else "NO"
+            print(f"{f'{tipo}#{seed}':<13}{len(datos[0]):>7}{t_ref:>12.1f}{t_idx:>9.1f}"
+                  f"{g_ref:>12.1f}{g_new:>9.1f}{t_cic:>9.1f}  {igual}")
+    print("(tiempos en ms; greedy incluye construir los trabajos)")
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# cost_model.py  –  Model de temps de la màquina  • puzzleBot
+# =========================================================
+# Prediu quant triga de veritat cada moviment pick → gir → place, a partir
+# de les constants de config.py (CFG), que són les mateixes que fa servir
+# movement.CONFIG:
+#
+#   • X (DualStepper) i Y (SingleStepper): rampa trapezoïdal lineal de
+#     `_ramp_delay` entre F_STEP_DELAY i LIMIT_FREQ, dues esperes per pas.
+#     El temps d'un desplaçament de n passos té forma tancada (suma d'una
+#     recta), així que es calcula vectoritzat sobre matrius senceres.
+#   • Z (28BYJ-48): 2 voltes avall i amunt a cada pick i place,
+#     STEP_DELAY_Z per pas, més l'espera de la bomba (0,3 s / 0,2 s).
+#   • Servo: `rotate` espera 0,8 s fixos; es gira a `rot` i de tornada a 0.
+#
+# `MovementSystem.move_xyz` mou X i després Y: per defecte els temps dels
+# eixos se sumen; amb `simultaneous_xy=True` es pren el màxim (eixos
+# solapats, si algun dia es mouen en paral·lel).
+#
+# Ús:
+#   from cost_model import MachineModel
+#   m = MachineModel.from_config()
+#   m.move_time((0, 0), (3, 1), (5, 5))   # {"approach_s", "carry_s", …, "total_s"}
+#   C = m.travel_matrix(src, dst)         # segons, per al planificador
+# =========================================================
+
+from __future__ import annotations
+import sys
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+
+try:
+    from config import CFG
+except ImportError:                  # executat des de src/: config viu a sockets/
+    sys.path.insert(0, str(Path(__file__).resolve().parent / "sockets"))
+    from config import CFG
+
+# ──────────────────────────────────────────────────────────
+#   CONSTANTS DE movement.py QUE NO SÓN A config.py
+# ──────────────────────────────────────────────────────────
+Z_REV_PICK = 2.0      # voltes de Z per baixar / pujar a pick() i place()
+PUMP_ON_S  = 0.3      # espera amb la bomba engegada abans de pujar
+PUMP_OFF_S = 0.2      # espera després d'apagar-la
+SERVO_S    = 0.8      # Servo.rotate dorm sempre aquest temps
+
+# ──────────────────────────────────────────────────────────
+@dataclass(frozen=True)
+class MachineModel:
+    cell_mm:      float
+    origin_x_mm:  float
+    origin_y_mm:  float
+    spmm_x:       float          # passos / mm
+    spmm_y:       float
+    delay_base:   float          # F_STEP_DELAY (s, inici i final de rampa)
+    delay_floor:  float          # LIMIT_FREQ   (s, creuer)
+    steps_rev_z:  int
+    step_delay_z: float
+    z_rev:        float = Z_REV_PICK
+    pump_on_s:    float = PUMP_ON_S
+    pump_off_s:   float = PUMP_OFF_S
+    servo_s:      float = SERVO_S
+    simultaneous_xy: bool = False
+
+    @classmethod
+    def from_config(cls, cfg=CFG, **kw) -> "MachineModel":
+        """Model amb els paràmetres de `cfg` (per defecte el CFG global)."""
+        hw, mot, ws = cfg.HW, cfg.MOT, cfg.WS
+        return cls(cell_mm=ws.CELL_MM, origin_x_mm=ws.ORIGIN_X_MM,
+                   origin_y_mm=ws.ORIGIN_Y_MM,
+                   spmm_x=200 * hw.MICROSTEP_X / hw.PITCH_X_MM,
+                   spmm_y=200 * hw.MICROSTEP_Y / hw.PITCH_Y_MM,
+                   delay_base=mot.F_STEP_DELAY, delay_floor=mot.LIMIT_FREQ,
+                   steps_rev_z=hw.STEPS_REV_Z, step_delay_z=hw.STEP_DELAY_Z, **kw)
+
+    def with_(self, **kw) -> "MachineModel":
+        return replace(self, **kw)
+
+    # ─────────── EIXOS ───────────
+    def ramp_time(self, steps) -> np.ndarray:
+        """
+        Segons de `steps` passos amb la rampa de `_ramp_delay`: el factor k
+        baixa d'1 a 0 la primera meitat i puja de 0 a 1 la segona.  Amb
+        menys de 2 passos (on `_ramp_delay` dividiria per 0) es pren k = 1.
+        """
+        n = np.asarray(steps, np.float64)
+        half = np.floor(n / 2)
+        rest = n - half
+        h = np.maximum(half, 1)
+        suma_k = np.where(half >= 1, (half + 1) / 2 + (rest - 1) * rest / (2 * h), n)
+        return 2.0 * (n * self.delay_floor + (self.delay_base - self.delay_floor) * suma_k)
+
+    def axis_time(self, mm, spmm: float) -> np.ndarray:
+        """Temps d'un eix per desplaçar-se `mm` (els passos es trunquen com a move_mm)."""
+        return self.ramp_time(np.floor(np.abs(np.asarray(mm, np.float64)) * spmm))
+
+    def travel_time(self, dcol, drow) -> np.ndarray:
+        """Segons per desplaçar el capçal (dcol, drow) caselles, vectoritzat."""
+        tx = self.axis_time(np.asarray(dcol, np.float64) * self.cell_mm, self.spmm_x)
+        ty = self.axis_time(np.asarray(drow, np.float64) * self.cell_mm, self.spmm_y)
+        return np.maximum(tx, ty) if self.simultaneous_xy else tx + ty
+
+    # ─────────── MOVIMENTS ───────────
+    @property
+    def z_time(self) -> float:
+        """Una baixada o pujada de Z."""
+        return self.z_rev * self.steps_rev_z * self.step_delay_z
+
+    @property
+    def handling_time(self) -> float:
+        """Part fixa de cada moviment: pick, gir i tornada del servo, place."""
+        return (4 * self.z_time + self.pump_on_s + self.pump_off_s + 2 * self.servo_s)
+
+    def move_time(self, cursor: Tuple[int, int], src: Tuple[int, int],
+                  dst: Tuple[int, int]) -> dict:
+        """Desglossament (s) d'un moviment complet amb el capçal a `cursor`."""
+        approach = float(self.travel_time(src[0] - cursor[0], src[1] - cursor[1]))
+        carry    = float(self.travel_time(dst[0] - src[0], dst[1] - src[1]))
+        return {"approach_s": approach, "carry_s": carry,
+                "z_s": 4 * self.z_time, "pump_s": self.pump_on_s + self.pump_off_s,
+                "servo_s": 2 * self.servo_s,
+                "total_s": approach + carry + self.handling_time}
+
+    def travel_matrix(self, src: np.ndarray, dst: np.ndarray,
+                      start: Tuple[float, float] = (0, 0)) -> np.ndarray:
+        """
+        Matriu (n+2)×(n+2) de temps en buit per al TSP del planificador:
+        C[i, j] = de dst[i] a src[j] (treballs 0‥n-1), fila n = des de
+        `start` i columna n+1 = fi fictícia (cost 0).
+        """
+        n = len(src)
+        src = np.asarray(src, np.float64).reshape(-1, 2)
+        fin = np.vstack([np.asarray(dst, np.float64).reshape(-1, 2), [start]])
+        C = np.zeros((n + 2, n + 2))
+        C[:n + 1, :n] = self.travel_time(src[None, :, 0] - fin[:, None, 0],
+                                         src[None, :, 1] - fin[:, None, 1])
+        return C
+
+    def carry_times(self, src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+        """Temps carregat de cada treball src[i] → dst[i]."""
+        d = np.asarray(dst, np.float64).reshape(-1, 2) - np.asarray(src, np.float64).reshape(-1, 2)
+        return self.travel_time(d[:, 0], d[:, 1])
+
+
+# prova ràpida quan s'executa directament
+if __name__ == "__main__":
+    m = MachineModel.from_config()
+    print(f"Z (una carrera): {m.z_time:.2f} s · part fixa per moviment: {m.handling_time:.2f} s")
+    for cells in (1, 2, 5, 10):
+        print(f"{cells:>3} caselles: X {float(m.travel_time(cells, 0)):6.2f} s · "
+              f"XY diagonal seq. {float(m.travel_time(cells, cells)):6.2f} s · "
+              f"simult. {float(m.with_(simultaneous_xy=True).travel_time(cells, cells)):6.2f} s")
@@ -8,7 +8,8 @@
 #   • rotaciones       → matriz NxM con el ángulo (0-270) para cada ID
 #
 # Salida:
-#   ▸ lista “plan” de movimientos en orden optimizado (greedy NN):
+#   ▸ lista “plan” de movimientos en orden optimizado (greedy NN, o con
+#     optimize=True greedy + búsqueda local 2-opt / Or-opt, ver abajo):
 #       [
 #          {"src_col": 3, "src_row": 0,
 #           "dst_col": 1, "dst_row": 2,
@@ -17,17 +18,66 @@
 #       ]
 #
 # El ControlSystem ejecutará la lista uno a uno.
+#
+# Los movimientos se ordenan por segundos previstos, no por distancia en
+# casillas: cost_model.MachineModel (rampas de X / Y, Z, servo, a partir de
+# config.py) da el tiempo de cada desplazamiento.
+#
+# Destinos ocupados: si el tablero inicial es una permutación del resuelto,
+# el destino de cada pieza suele estar ocupado por otra.  El plan descompone
+# la permutación origen → destino en ciclos (y cadenas que acaban en una
+# casilla libre) y rompe cada ciclo pasando una pieza por una celda buffer:
+#
+#   Mínimo de movimientos = m + c, con m piezas fuera de sitio y c ciclos de
+#   longitud ≥ 2.  Cota inferior: cada pieza descolocada se mueve al menos
+#   una vez; en cada ciclo, la primera pieza que se mueve tiene su destino
+#   ocupado por otra pieza del mismo ciclo (que aún no se ha movido), así
+#   que no puede ir directa y se mueve al menos dos veces; los ciclos son
+#   disjuntos, luego hacen falta ≥ m + c movimientos.  Se alcanza con una
+#   sola celda libre: pieza del ciclo → buffer, el resto del ciclo en
+#   cadena hacia atrás (cada una a la casilla que acaba de quedar libre) y
+#   buffer → destino.  Las cadenas no necesitan buffer (m movimientos).
+#
+# El número de movimientos es siempre el mínimo; lo que se elige es el
+# orden de ciclos y cadenas, la pieza de cada ciclo que va al buffer y qué
+# buffer usar, para minimizar el tiempo de viaje (ver `plan_cycles`).
+#
+# Modo optimizado: el orden de los movimientos es un TSP asimétrico sobre
+# los trabajos pick→place.  El coste en vacío de i a j es el tiempo del
+# destino de i al origen de j (≠ de j a i); la matriz de costes sale de
+# una sola operación NumPy.  Se parte del tour greedy y se mejora con 2-opt
+# (invertir un tramo; con sumas prefijas en los dos sentidos cada inversión
+# se evalúa en O(1)) y Or-opt (mover tramos de 1-3 trabajos) hasta un
+# óptimo local o hasta agotar `time_budget`.
+#
+# Streaming: `iter_plan` es un generador que entrega cada movimiento en
+# cuanto queda comprometido (el primero sale del tour greedy) y, entre uno
+# y otro, sigue refinando con 2-opt / Or-opt sólo lo que aún no se ha
+# entregado.  Cada movimiento tarda segundos en el robot, así que la
+# búsqueda local se solapa con la ejecución.  `stats` da el tiempo hasta
+# el primer movimiento (`first_move_s`) junto al total (`planning_s`).
 # =========================================================
 
 from __future__ import annotations
 import json
+import time
 from dataclasses import dataclass
-from math import hypot
 from pathlib import Path
 from typing import List, Tuple
 
 import numpy as np
 
+from cost_model import MachineModel
+
+# ──────────────────────────────────────────────────────────
+#   CONSTANTES
+# ──────────────────────────────────────────────────────────
+HOME          = (0, 0)       # casilla donde arranca el brazo
+TIME_BUDGET_S = 1.0          # tiempo máximo de búsqueda local (optimize=True)
+OR_OPT_MAX    = 3            # longitud máxima de los tramos que mueve Or-opt
+OPCIONES_MAX  = 64           # (pieza al buffer, buffer) por ciclo que se consideran
+REFINE_S      = 0.5          # búsqueda local entre dos movimientos entregados (iter_plan)
+
 # ──────────────────────────────────────────────────────────
 #   MODELOS DE DATOS
 # ──────────────────────────────────────────────────────────
@@ -49,16 +99,460 @@ class Move:
 # ──────────────────────────────────────────────────────────
 #   FUNCIONES AUXILIARES
 # ──────────────────────────────────────────────────────────
-def _coords(matrix: np.ndarray, piece_id: int) -> Tuple[int, int]:
-    """Devuelve (col,row) donde aparece piece_id en matrix."""
-    pos = np.where(matrix == piece_id)
-    return int(pos[1][0]), int(pos[0][0])     # (x, y)
+def _inverse_index(matrix: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """
+    (col,row) donde aparece cada ID de `ids` en matrix, (len(ids), 2), en
+    una sola pasada (orden + búsqueda binaria).  Si un ID se repite vale
+    su primera aparición en orden de filas, como `np.where`.
+    """
+    flat = np.asarray(matrix).ravel()
+    orden = np.argsort(flat, kind="stable")
+    k = np.searchsorted(flat[orden], ids)
+    if np.any(k >= len(flat)) or np.any(flat[orden[np.minimum(k, len(flat) - 1)]] != ids):
+        raise ValueError("Hay piezas que no aparecen en la matriz")
+    pos = orden[k]
+    return np.column_stack([pos % matrix.shape[1], pos // matrix.shape[1]])  # (x, y)
+
+def _jobs(puzzle_resuelto, pos_inicial, pos_final, rotaciones):
+    """Movimientos pendientes ((sx,sy), (dx,dy), rot) en orden de ID."""
+    ids = np.unique(puzzle_resuelto)
+    src = _inverse_index(pos_inicial, ids)
+    dst = _inverse_index(pos_final, ids)
+    mover = np.any(src != dst, axis=1)        # ya está en su sitio? => saltar
+    src, dst = src[mover], dst[mover]
+    rot = np.asarray(rotaciones)[src[:, 1], src[:, 0]]
+    return [((sx, sy), (dx, dy), r) for (sx, sy), (dx, dy), r
+            in zip(src.tolist(), dst.tolist(), rot.tolist())]
+
+def _occupied(puzzle_resuelto, pos_inicial, pos_final) -> set:
+    """
+    Casillas (col,row) que no pueden ser buffer: las que tienen pieza al
+    empezar (también las ya colocadas, que `_jobs` descarta) y los
+    destinos de todas las piezas.
+    """
+    ids = np.unique(puzzle_resuelto)
+    fila, col = np.nonzero(np.isin(pos_inicial, ids))
+    return ({(int(x), int(y)) for x, y in zip(col, fila)}
+            | {tuple(c) for c in _inverse_index(pos_final, ids).tolist()})
+
+class _Cubetas:
+    """
+    Orígenes pendientes repartidos en cubetas de `lado`×`lado` casillas
+    para el greedy: la búsqueda del más rápido de alcanzar recorre anillos
+    de cubetas alrededor del cursor y para en cuanto la cota inferior del
+    siguiente anillo (tiempo de recorrer la distancia mínima a la que
+    puede estar cualquier punto fuera del cuadrado ya mirado) supera al
+    mejor encontrado.  Empates: el de índice menor, como `np.argmin` sobre
+    la lista en orden de ID.  Las casillas son enteras, así que los tiempos
+    se leen de una tabla [|dx|, |dy|] del modelo que crece según haga falta.
+    """
+
+    def __init__(self, pts: np.ndarray, model: MachineModel, lado: int | None = None):
+        pts = np.asarray(pts, np.int64).reshape(-1, 2)
+        if lado is None:                      # ~2 orígenes por cubeta al empezar
+            area = np.ptp(pts, axis=0).prod() + 1 if len(pts) else 1
+            lado = max(1, int(round(np.sqrt(2.0 * area / max(len(pts), 1)))))
+        self.pts, self.model, self.lado = pts, model, lado
+        self.cubetas: dict = {}
+        for i, c in enumerate((pts // lado).tolist()):
+            self.cubetas.setdefault(tuple(c), []).append(i)
+        self.lim = ((pts // lado).min(0), (pts // lado).max(0)) if len(pts) else None
+        self._tabla = np.zeros((0, 0))
+
+    def quitar(self, i: int) -> None:
+        c = tuple((self.pts[i] // self.lado).tolist())
+        self.cubetas[c].remove(i)
+        if not self.cubetas[c]:
+            del self.cubetas[c]
+
+    def _tiempo(self, dx: np.ndarray, dy: np.ndarray) -> np.ndarray:
+        dx, dy = np.abs(dx), np.abs(dy)
+        m = int(max(dx.max(), dy.max()))
+        if m >= len(self._tabla):
+            d = np.arange(2 * m + 1)
+            self._tabla = self.model.travel_time(d[:, None], d[None, :])
+        return self._tabla[dx, dy]
+
+    def _cota(self, d: int) -> float:
+        t = self._tiempo(np.array([d, 0]), np.array([0, d]))
+        return float(t.min())
+
+    def mas_cercano(self, cursor: Tuple[int, int]) -> int:
+        L = self.lado
+        cx, cy = int(cursor[0]), int(cursor[1])
+        bx, by = cx // L, cy // L
+        (x0, y0), (x1, y1) = self.lim
+        r_max = max(bx - x0, x1 - bx, by - y0, y1 - by, 0)
+        mejor, mejor_t = -1, np.inf
+        for r in range(r_max + 1):
+            if r and mejor >= 0:
+                d = min(cx - (bx - r + 1) * L + 1, (bx + r) * L - cx,
+                        cy - (by - r + 1) * L + 1, (by + r) * L - cy)
+                if self._cota(d) > mejor_t:
+                    break
+            cand = []
+            for x in range(bx - r, bx + r + 1):
+                for y in ((by - r, by + r) if abs(x - bx) != r and r else range(by - r, by + r + 1)):
+                    cand += self.cubetas.get((x, y), ())
+            if not cand:
+                continue
+            cand = np.array(cand)
+            p = self.pts[cand]
+            t = self._tiempo(p[:, 0] - cx, p[:, 1] - cy)
+            k = np.lexsort((cand, t))[0]
+            if t[k] < mejor_t or (t[k] == mejor_t and cand[k] < mejor):
+                mejor, mejor_t = int(cand[k]), float(t[k])
+        return mejor
+
+# ──────────────────────────────────────────────────────────
+#   TSP ASIMÉTRICO SOBRE TRABAJOS PICK → PLACE
+# ──────────────────────────────────────────────────────────
+def travel_matrix(src: np.ndarray, dst: np.ndarray,
+                  start: Tuple[float, float] = HOME) -> np.ndarray:
+    """
+    Matriz (n+2)×(n+2) de recorrido en vacío, en casillas, para n trabajos
+    con origen `src[i]` y destino `dst[i]` (arrays (n, 2)).  Nodos 0‥n-1:
+    trabajos; n: inicio (`start`); n+1: fin ficticio (llegar cuesta 0).
+    C[i, j] = distancia de dst[i] a src[j]; C[n, j] = de start a src[j].
+    Misma disposición que `MachineModel.travel_matrix` (en segundos).
+    """
+    n = len(src)
+    fin = np.vstack([np.asarray(dst, float).reshape(-1, 2), [start]])       # de dónde se sale
+    d = fin[:, None, :] - np.asarray(src, float).reshape(-1, 2)[None, :, :]
+    C = np.zeros((n + 2, n + 2))
+    C[:n + 1, :n] = np.hypot(d[..., 0], d[..., 1])
+    return C
+
+def tour_cost(C: np.ndarray, order) -> float:
+    """Recorrido en vacío del tour `order` (índices de trabajo) desde el inicio."""
+    p = np.concatenate(([len(C) - 2], np.asarray(order, np.intp)))
+    return float(C[p[:-1], p[1:]].sum())
+
+def greedy_order(C: np.ndarray) -> np.ndarray:
+    """Vecino más próximo desde el inicio (mismo orden que el plan greedy)."""
+    n = len(C) - 2
+    libre = np.ones(n, bool)
+    order = np.empty(n, np.intp)
+    cur = n
+    for t in range(n):
+        fila = np.where(libre, C[cur, :n], np.inf)
+        cur = order[t] = int(np.argmin(fila))
+        libre[cur] = False
+    return order
+
+def _row_2opt(C: np.ndarray, p: np.ndarray, w: np.ndarray,
+              Fp: np.ndarray, Rp: np.ndarray, i: int):
+    """Mejor inversión p[i..j] para un i fijo (j > i): (delta, j)."""
+    j = np.arange(i + 1, len(p) - 1)
+    if not len(j):
+        return 0.0, 0
+    delta = (C[p[i - 1], p[j]] + C[p[i], p[j + 1]] - w[i - 1] - w[j]
+             + (Rp[j] - Rp[i]) - (Fp[j] - Fp[i]))
+    t = int(np.argmin(delta))
+    return float(delta[t]), int(j[t])
+
+def _row_oropt(C: np.ndarray, p: np.ndarray, w: np.ndarray, i: int, L: int):
+    """Mejor traslado del tramo p[i..i+L-1] tras otro p[k]: (delta, k)."""
+    e = i + L - 1
+    k = np.arange(0, len(p) - 1)
+    k = k[(k < i - 1) | (k > e)]
+    if e >= len(p) - 1 or not len(k):
+        return 0.0, 0
+    quitar = w[i - 1] + w[e] - C[p[i - 1], p[e + 1]]
+    delta = C[p[k], p[i]] + C[p[e], p[k + 1]] - w[k] - quitar
+    t = int(np.argmin(delta))
+    return float(delta[t]), int(k[t])
+
+def improve_order(C: np.ndarray, order, time_budget: float = TIME_BUDGET_S,
+                  stats: dict | None = None) -> np.ndarray:
+    """
+    Búsqueda local 2-opt + Or-opt sobre `order` hasta un óptimo local o
+    hasta `time_budget` segundos.  Se recorren las posiciones del tour y,
+    para cada una, se evalúan con NumPy todos sus movimientos en O(n) y se
+    aplica el mejor si mejora (primera mejora por posición).  `order`
+    puede ser un subconjunto de los trabajos de C (los que quedan por
+    entregar en `iter_plan`).
+    """
+    stats = {} if stats is None else stats
+    n = len(C) - 2
+    p = np.concatenate(([n], np.asarray(order, np.intp), [n + 1]))
+    t_fin = time.perf_counter() + time_budget
+    stats.update(moves_2opt=0, moves_oropt=0, local_optimum=False)
+
+    def sumas(p):
+        w = C[p[:-1], p[1:]]
+        return (w, np.concatenate(([0.0], np.cumsum(w))),
+                np.concatenate(([0.0], np.cumsum(C[p[1:], p[:-1]]))))
+
+    w, Fp, Rp = sumas(p)
+    mejorado = True
+    while mejorado and time.perf_counter() < t_fin:
+        mejorado = False
+        for i in range(1, len(p) - 1):
+            if time.perf_counter() >= t_fin:
+                break
+            d, j = _row_2opt(C, p, w, Fp, Rp, i)
+            if d < -1e-9:
+                p[i:j + 1] = p[i:j + 1][::-1].copy()
+                stats["moves_2opt"] += 1
+                w, Fp, Rp = sumas(p)
+                mejorado = True
+            for L in range(1, OR_OPT_MAX + 1):
+                d, k = _row_oropt(C, p, w, i, L)
+                if d < -1e-9:
+                    tramo = p[i:i + L].copy()
+                    resto = np.concatenate((p[:i], p[i + L:]))
+                    pos = k + 1 if k < i else k + 1 - L     # tras p[k] en `resto`
+                    p = np.concatenate((resto[:pos], tramo, resto[pos:]))
+                    stats["moves_oropt"] += 1
+                    w, Fp, Rp = sumas(p)
+                    mejorado = True
+                    break
+        else:
+            stats["local_optimum"] = not mejorado
+    return p[1:-1]
+
+def optimize_jobs(src: np.ndarray, dst: np.ndarray,
+                  start: Tuple[float, float] = HOME,
+                  time_budget: float = TIME_BUDGET_S,
+                  stats: dict | None = None,
+                  model: MachineModel | None = None) -> np.ndarray:
+    """
+    Orden de n trabajos genéricos (origen `src[i]` → destino `dst[i]`) que
+    minimiza el tiempo en vacío previsto por `model` desde `start`: tour
+    greedy mejorado con 2-opt / Or-opt.  Si se pasa `stats`, se rellena con
+    el recorrido (casillas) y el tiempo estimado (s, con pick / place) de
+    los dos tours, y los movimientos de la búsqueda local.
+    """
+    stats = {} if stats is None else stats
+    model = MachineModel.from_config() if model is None else model
+    t0 = time.perf_counter()
+    C = model.travel_matrix(src, dst, start)
+    greedy = greedy_order(C)
+    order = improve_order(C, greedy, time_budget, stats)
+    stats["optimize_s"] = time.perf_counter() - t0
+
+    D = travel_matrix(src, dst, start)
+    d = np.asarray(dst, float).reshape(-1, 2) - np.asarray(src, float).reshape(-1, 2)
+    cargado = float(np.hypot(d[:, 0], d[:, 1]).sum())
+    fijo = float(model.carry_times(src, dst).sum()) + len(d) * model.handling_time
+    for nombre, o in (("greedy", greedy), ("optimized", order)):
+        stats[f"{nombre}_empty"] = tour_cost(D, o)
+        stats[f"{nombre}_travel"] = stats[f"{nombre}_empty"] + cargado
+        stats[f"{nombre}_empty_s"] = tour_cost(C, o)
+        stats[f"{nombre}_s"] = stats[f"{nombre}_empty_s"] + fijo
+    return order
+
+# ──────────────────────────────────────────────────────────
+#   CICLOS Y CELDAS BUFFER  (destinos ocupados)
+# ──────────────────────────────────────────────────────────
+def decompose_jobs(src: np.ndarray, dst: np.ndarray):
+    """
+    Descompone los trabajos (src[i] → dst[i]) según quién ocupa cada
+    destino.  Devuelve (ciclos, cadenas): listas de índices J tales que
+    dst[J[k]] == src[J[k+1]]; en un ciclo además dst[J[-1]] == src[J[0]],
+    en una cadena dst[J[-1]] es una casilla libre.
+    """
+    n = len(src)
+    destinos = [tuple(c) for c in np.asarray(dst).tolist()]
+    if len(set(destinos)) != n:
+        raise ValueError("Dos piezas con la misma casilla destino")
+    en = {tuple(c): i for i, c in enumerate(np.asarray(src).tolist())}
+    bloqueo = [en.get(c, -1) for c in destinos]       # quién ocupa mi destino
+    tiene_previo = np.zeros(n, bool)
+    for b in bloqueo:
+        if b >= 0:
+            tiene_previo[b] = True
+    visto = np.zeros(n, bool)
+    ciclos, cadenas = [], []
+    for i in range(n):                        # cadenas: empiezan sin previo
+        if tiene_previo[i]:
+            continue
+        J = [i]
+        while bloqueo[J[-1]] >= 0:
+            J.append(bloqueo[J[-1]])
+        visto[J] = True
+        cadenas.append(J)
+    for i in range(n):                        # lo que queda son ciclos
+        if visto[i]:
+            continue
+        J = [i]
+        while bloqueo[J[-1]] != i:
+            J.append(bloqueo[J[-1]])
+        visto[J] = True
+        ciclos.append(J)
+    return ciclos, cadenas
+
+def _t(model: MachineModel, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Tiempo de viaje de las casillas a[..., 2] a b[..., 2]."""
+    return model.travel_time(b[..., 0] - a[..., 0], b[..., 1] - a[..., 1])
+
+def _cycle_options(src: np.ndarray, buffers: np.ndarray, model: MachineModel):
+    """
+    Opciones (s, b) de un ciclo de L trabajos con orígenes `src` (L, 2):
+    el trabajo s va al buffer b, los demás en cadena hacia atrás
+    (s-1, s-2, …, s+1) y el buffer a dst[s] = src[s+1].  Devuelve arrays
+    (s, b, entrada, salida, coste interno en s) de las OPCIONES_MAX mejores.
+    """
+    L = len(src)
+    nxt, prv, nxt2 = (np.roll(src, -k, 0) for k in (1, -1, 2))
+    carry = _t(model, src, nxt)               # src[k] → dst[k] = src[k+1]
+    vacio = _t(model, nxt, prv)               # tras J[k] (acaba en src[k+1]) a src[k-1]
+    if L == 2:                                # la cadena es un solo trabajo: sin vacíos
+        vacio = np.zeros(2)
+    s, b = np.meshgrid(np.arange(L), np.arange(len(buffers)), indexing="ij")
+    s, b = s.ravel(), b.ravel()
+    B = buffers[b]
+    coste = (carry.sum() - carry[s] + vacio.sum() - vacio[s] - vacio[(s + 1) % L]
+             + _t(model, src[s], B) + _t(model, B, prv[s])
+             + _t(model, nxt2[s], B) + _t(model, B, nxt[s]))
+    mejores = np.argsort(coste, kind="stable")[:OPCIONES_MAX]
+    s, b = s[mejores], b[mejores]
+    return s, b, src[s], nxt[s], coste[mejores]
+
+def _cycle_moves(J, s: int, buffer, src, dst, rot):
+    """Movimientos ((sx,sy), (dx,dy), rot) de un ciclo roto por el trabajo J[s]."""
+    L = len(J)
+    buffer = tuple(int(v) for v in buffer)
+    mov = [(tuple(src[J[s]]), buffer, rot[J[s]])]               # gira al ir al buffer
+    for k in range(1, L):
+        j = J[(s - k) % L]
+        mov.append((tuple(src[j]), tuple(dst[j]), rot[j]))
+    mov.append((buffer, tuple(dst[J[s]]), 0))
+    return mov
+
+def plan_seconds(movimientos, start: Tuple[float, float] = HOME,
+                 model: MachineModel | None = None) -> float:
+    """Tiempo previsto (s) de ejecutar `movimientos` [(src, dst, rot)] desde `start`."""
+    if not movimientos:
+        return 0.0
+    model = MachineModel.from_config() if model is None else model
+    a = np.array([m[0] for m in movimientos], np.float64)
+    b = np.array([m[1] for m in movimientos], np.float64)
+    previo = np.vstack([[start], b[:-1]])
+    return float(_t(model, previo, a).sum() + _t(model, a, b).sum()
+                 + len(movimientos) * model.handling_time)
+
+def _cycle_inputs(src, dst, rot, buffers):
+    """Normaliza los trabajos y los buffers de `plan_cycles` / `iter_plan`."""
+    src = np.asarray(src, np.int64).reshape(-1, 2)
+    dst = np.asarray(dst, np.int64).reshape(-1, 2)
+    rot = [int(r) for r in rot]
+    buffers = np.asarray(buffers if buffers is not None else [], np.float64).reshape(-1, 2)
+    return src, dst, rot, buffers
+
+def _cycle_units(src: np.ndarray, dst: np.ndarray, buffers: np.ndarray,
+                 model: MachineModel, ocupadas: set | None = None):
+    """
+    Unidades del plan, una por ciclo y una por cadena: tuplas (trabajos,
+    es_ciclo, s, b, entrada, salida, coste interno) con sus opciones (una
+    sola en las cadenas).  Devuelve (unidades, ciclos, cadenas).
+    `ocupadas` son las casillas que no pueden ser buffer (ver `_occupied`);
+    por defecto, los orígenes y destinos de los trabajos.
+    """
+    ciclos, cadenas = decompose_jobs(src, dst)
+    if ciclos and not len(buffers):
+        raise ValueError("Hay ciclos y ninguna celda buffer")
+    if np.any(buffers < 0):
+        raise ValueError("Las celdas buffer deben estar dentro del área de trabajo (col, row ≥ 0)")
+    if ocupadas is None:
+        ocupadas = {tuple(c) for c in src.tolist()} | {tuple(c) for c in dst.tolist()}
+    if any(tuple(int(v) for v in b) in ocupadas for b in buffers.tolist()):
+        raise ValueError("Las celdas buffer deben estar libres y no ser destino de nadie")
+    unidades = [(J, True) + _cycle_options(src[J].astype(np.float64), buffers, model)
+                for J in ciclos]
+    for J in cadenas:                         # se ejecutan del final al principio
+        o = J[::-1]
+        interno = (_t(model, src[o], dst[o]).sum() + _t(model, dst[o[:-1]], src[o[1:]]).sum())
+        unidades.append((J, False, np.zeros(1, np.intp), np.zeros(1, np.intp),
+                         src[o[:1]].astype(np.float64), dst[o[-1:]].astype(np.float64),
+                         np.array([interno])))
+    return unidades, ciclos, cadenas
+
+def _choose_options(unidades, orden, start, model: MachineModel) -> List[int]:
+    """
+    Con el orden de unidades fijado, opción de cada una que minimiza viaje
+    entre unidades + coste interno desde `start` (programación dinámica).
+    """
+    pos, coste, elegido = np.asarray([start], np.float64).reshape(1, 2), np.zeros(1), []
+    for u in orden:
+        ent, sal, interno = unidades[u][4:]
+        total = coste[:, None] + _t(model, pos[:, None, :], ent[None, :, :]) + interno[None, :]
+        arg = np.argmin(total, axis=0)
+        elegido.append(arg)
+        coste, pos = total[arg, np.arange(len(ent))], sal
+    opcion = [0] * len(orden)
+    if not len(orden):
+        return opcion
+    o = int(np.argmin(coste))
+    for k in range(len(orden) - 1, -1, -1):
+        opcion[k] = o
+        o = int(elegido[k][o])
+    return opcion
+
+def _unit_moves(unidad, o: int, buffers, src, dst, rot) -> List[Tuple[tuple, tuple, int]]:
+    """Movimientos de la unidad con su opción `o`, con coordenadas enteras."""
+    J, es_ciclo, s, b = unidad[:4]
+    if es_ciclo:
+        movs = _cycle_moves(J, int(s[o]), buffers[b[o]], src, dst, rot)
+    else:
+        movs = [(tuple(src[j]), tuple(dst[j]), rot[j]) for j in J[::-1]]
+    return [(tuple(int(v) for v in a), tuple(int(v) for v in b), r) for a, b, r in movs]
+
+def plan_cycles(src: np.ndarray, dst: np.ndarray, rot,
+                buffers, start: Tuple[float, float] = HOME,
+                model: MachineModel | None = None,
+                optimize: bool = False, time_budget: float = TIME_BUDGET_S,
+                stats: dict | None = None,
+                ocupadas: set | None = None) -> List[Tuple[tuple, tuple, int]]:
+    """
+    Plan con destinos ocupados para los trabajos src[i] → dst[i] (rotación
+    rot[i]) usando las celdas libres `buffers` [(col, row), …].  Usa el
+    mínimo de movimientos (m + c, ver la cabecera) y elige:
+      1) para cada ciclo, la mejor opción (pieza al buffer, buffer) aislada;
+      2) el orden de ciclos y cadenas como TSP asimétrico entre la salida
+         de una unidad y la entrada de la siguiente (greedy y, con
+         `optimize`, 2-opt / Or-opt durante `time_budget` s);
+      3) con el orden fijado, por programación dinámica la opción de cada
+         ciclo que minimiza viaje entre unidades + coste interno.
+    `ocupadas`: casillas del tablero con pieza o que son destino (ver
+    `_occupied`), que no pueden ser buffer.
+    Devuelve la lista de movimientos en orden.
+    """
+    stats = {} if stats is None else stats
+    model = MachineModel.from_config() if model is None else model
+    src, dst, rot, buffers = _cycle_inputs(src, dst, rot, buffers)
+
+    # 1) unidades: (trabajos, es_ciclo, s, b, entrada, salida, coste interno)
+    unidades, ciclos, cadenas = _cycle_units(src, dst, buffers, model, ocupadas)
+
+    # 2) orden de las unidades con su mejor opción aislada
+    entrada = np.array([u[4][0] for u in unidades]).reshape(-1, 2)
+    salida  = np.array([u[5][0] for u in unidades]).reshape(-1, 2)
+    C = model.travel_matrix(entrada, salida, start)
+    orden = greedy_order(C)
+    if optimize:
+        orden = improve_order(C, orden, time_budget, stats)
 
-def _nearest(current: Tuple[int, int], targets: List[Tuple[int,int]]):
-    """Devuelve índice del objetivo más cercano a current."""
-    cx, cy = current
-    dists = [hypot(tx-cx, ty-cy) for tx,ty in targets]
-    return int(np.argmin(dists))
+    # 3) programación dinámica sobre las opciones, con el orden fijo
+    opcion = _choose_options(unidades, orden, start, model)
+
+    movimientos: List[Tuple[tuple, tuple, int]] = []
+    usos = [0] * len(buffers)
+    for u, o in zip(orden, opcion):
+        if unidades[u][1]:
+            usos[int(unidades[u][3][o])] += 1
+        movimientos += _unit_moves(unidades[u], o, buffers, src, dst, rot)
+
+    stats.update(misplaced=len(src), cycles=len(ciclos), chains=len(cadenas),
+                 min_moves=len(src) + len(ciclos), moves=len(movimientos),
+                 cycle_lengths=sorted((len(J) for J in ciclos), reverse=True),
+                 buffer_uses=usos, plan_s=plan_seconds(movimientos, start, model))
+    return movimientos
+
+def default_buffers(shape: Tuple[int, int]) -> List[Tuple[int, int]]:
+    """Celda buffer por defecto: la columna siguiente al tablero, fila 0."""
+    return [(int(shape[1]), 0)]
 
 # ──────────────────────────────────────────────────────────
 #   GENERADOR DE PLAN
@@ -66,30 +560,197 @@ def _nearest(current: Tuple[int, int], targets: List[Tuple[int,int]]):
 def generate_plan(puzzle_resuelto: np.ndarray,
                   pos_inicial:   np.ndarray,
                   pos_final:     np.ndarray,
-                  rotaciones:    np.ndarray) -> List[dict]:
+                  rotaciones:    np.ndarray,
+                  optimize:      bool = False,
+                  time_budget:   float = TIME_BUDGET_S,
+                  stats:         dict | None = None,
+                  model:         MachineModel | None = None,
+                  buffers:       List[Tuple[int, int]] | None = None,
+                  assume_free:   bool = False) -> List[dict]:
     """
-    Devuelve lista de Move en orden “ruta más corta” greedy.
+    Devuelve lista de Move en orden “ruta más rápida” según `model` (por
+    defecto `MachineModel.from_config()`).
+
+    Por defecto los destinos ocupados se resuelven por ciclos con las
+    celdas libres `buffers` (por defecto `default_buffers`), con el mínimo
+    de movimientos; ver `plan_cycles`.  Con `assume_free` se supone que
+    todos los destinos están libres (comportamiento anterior): greedy y,
+    con `optimize`, TSP asimétrico (`optimize_jobs`).  `optimize` mejora el
+    orden durante como mucho `time_budget` segundos; `stats` recibe la
+    comparación y las cifras del plan, y `planning_s` / `first_move_s`
+    (iguales: aquí no hay movimientos hasta tener el plan entero; ver
+    `iter_plan`).
     """
+    stats = {} if stats is None else stats
+    model = MachineModel.from_config() if model is None else model
+    t0 = time.perf_counter()
     plan: List[Move] = []
     # 1) Construir lista completa de movimientos pendientes
-    pending: List[Tuple[Tuple[int,int], Tuple[int,int], int]] = []
-    for piece_id in np.unique(puzzle_resuelto):
-        sx, sy = _coords(pos_inicial, piece_id)
-        dx, dy = _coords(pos_final,   piece_id)
-        if (sx, sy) != (dx, dy):              # ya está en su sitio? => saltar
-            rot = int(rotaciones[sy, sx])
-            pending.append(((sx, sy), (dx, dy), rot))
-
-    # 2) Greedy — siempre ir al source más cercano
-    cursor = (0, 0)                           # brazo parte del home (0,0)
-    while pending:
-        idx = _nearest(cursor, [src for src,_,_ in pending])
-        src, dst, rot = pending.pop(idx)
-        plan.append(Move(src[0], src[1], dst[0], dst[1], rot))
-        cursor = dst                          # nueva posición del brazo
+    pending = _jobs(puzzle_resuelto, pos_inicial, pos_final, rotaciones)
+
+    if not assume_free:
+        movs = plan_cycles([s for s, _, _ in pending], [d for _, d, _ in pending],
+                           [r for _, _, r in pending],
+                           default_buffers(pos_inicial.shape) if buffers is None else buffers,
+                           HOME, model, optimize, time_budget, stats,
+                           _occupied(puzzle_resuelto, pos_inicial, pos_final))
+        plan = [Move(*src, *dst, rot) for src, dst, rot in movs]
+
+    elif optimize:
+        src = np.array([s for s, _, _ in pending], float).reshape(-1, 2)
+        dst = np.array([d for _, d, _ in pending], float).reshape(-1, 2)
+        order = optimize_jobs(src, dst, HOME, time_budget, stats, model)
+        plan = [Move(*pending[i][0], *pending[i][1], pending[i][2]) for i in order]
 
+    else:
+        # 2) Greedy — siempre ir al source más cercano (cubetas, sin recorrer
+        #    toda la lista en cada paso)
+        cubetas = _Cubetas([src for src, _, _ in pending], model)
+        cursor = HOME                         # brazo parte del home (0,0)
+        for _ in range(len(pending)):
+            idx = cubetas.mas_cercano(cursor)
+            cubetas.quitar(idx)
+            src, dst, rot = pending[idx]
+            plan.append(Move(src[0], src[1], dst[0], dst[1], rot))
+            cursor = dst                      # nueva posición del brazo
+
+    stats["planning_s"] = stats["first_move_s"] = time.perf_counter() - t0
     return [mv.as_dict() for mv in plan]
 
+# ──────────────────────────────────────────────────────────
+#   PLAN EN STREAMING  (el robot arranca antes de acabar)
+# ──────────────────────────────────────────────────────────
+def _refine_tail(C: np.ndarray, resto: np.ndarray, segundos: float, stats: dict):
+    """
+    Un tramo de 2-opt / Or-opt sobre lo que queda por entregar: (resto,
+    ¿cambió?, ¿óptimo local?).  Entregar la cabeza no cambia ningún arco
+    del resto (el nuevo inicio es el final de la cabeza), así que tras un
+    óptimo local ya no hace falta seguir.
+    """
+    if len(resto) < 2 or segundos <= 0:
+        return resto, False, len(resto) < 2
+    s: dict = {}
+    resto = improve_order(C, resto, segundos, s)
+    stats["moves_2opt"] += s["moves_2opt"]
+    stats["moves_oropt"] += s["moves_oropt"]
+    return resto, bool(s["moves_2opt"] or s["moves_oropt"]), s["local_optimum"]
+
+def _iter_free(pending, model: MachineModel, optimize: bool,
+               time_budget: float, refine_s: float, stats: dict):
+    """Movimientos con destinos libres: greedy o tour greedy refinado por tramos."""
+    if not optimize:
+        cubetas = _Cubetas([src for src, _, _ in pending], model)
+        cursor = HOME
+        for _ in range(len(pending)):
+            idx = cubetas.mas_cercano(cursor)
+            cubetas.quitar(idx)
+            yield pending[idx]
+            cursor = pending[idx][1]
+        return
+    n = len(pending)
+    src = np.array([s for s, _, _ in pending], float).reshape(-1, 2)
+    dst = np.array([d for _, d, _ in pending], float).reshape(-1, 2)
+    C = model.travel_matrix(src, dst, HOME)
+    resto, restante = greedy_order(C), time_budget
+    while len(resto):
+        i, resto = int(resto[0]), resto[1:]
+        yield pending[i]
+        C[n, :n] = C[i, :n]                   # el inicio pasa a ser dst[i]
+        t = time.perf_counter()
+        resto, _, optimo = _refine_tail(C, resto, min(refine_s, restante), stats)
+        restante = 0.0 if optimo else restante - (time.perf_counter() - t)
+
+def _iter_cycles(src, dst, rot, buffers, model: MachineModel, optimize: bool,
+                 time_budget: float, refine_s: float, stats: dict,
+                 ocupadas: set | None = None):
+    """
+    Movimientos de `plan_cycles` unidad a unidad.  Tras entregar una unidad
+    se refina el orden de las que quedan desde donde ha acabado el brazo y,
+    si cambia, se vuelven a elegir sus opciones.  Sin `optimize` da el
+    mismo plan que `plan_cycles`.
+    """
+    src, dst, rot, buffers = _cycle_inputs(src, dst, rot, buffers)
+    unidades, ciclos, cadenas = _cycle_units(src, dst, buffers, model, ocupadas)
+    U = len(unidades)
+    entrada = np.array([u[4][0] for u in unidades]).reshape(-1, 2)
+    salida  = np.array([u[5][0] for u in unidades]).reshape(-1, 2)
+    C = model.travel_matrix(entrada, salida, HOME)
+    resto = greedy_order(C)
+    opcion = _choose_options(unidades, resto, HOME, model)
+    restante = time_budget if optimize else 0.0
+    usos = [0] * len(buffers)
+    while len(resto):
+        u, o = int(resto[0]), opcion[0]
+        resto, opcion = resto[1:], opcion[1:]
+        if unidades[u][1]:
+            usos[int(unidades[u][3][o])] += 1
+        yield from _unit_moves(unidades[u], o, buffers, src, dst, rot)
+        if restante > 0 and len(resto) > 1:
+            cursor = unidades[u][5][o]
+            C[U, :U] = _t(model, cursor[None, :], entrada)
+            t = time.perf_counter()
+            resto, cambio, optimo = _refine_tail(C, resto, min(refine_s, restante), stats)
+            if cambio:
+                opcion = _choose_options(unidades, resto, cursor, model)
+            restante = 0.0 if optimo else restante - (time.perf_counter() - t)
+    stats.update(misplaced=len(src), cycles=len(ciclos), chains=len(cadenas),
+                 min_moves=len(src) + len(ciclos),
+                 cycle_lengths=sorted((len(J) for J in ciclos), reverse=True),
+                 buffer_uses=usos)
+
+def iter_plan(puzzle_resuelto: np.ndarray,
+              pos_inicial:   np.ndarray,
+              pos_final:     np.ndarray,
+              rotaciones:    np.ndarray,
+              optimize:      bool = False,
+              time_budget:   float = TIME_BUDGET_S,
+              stats:         dict | None = None,
+              model:         MachineModel | None = None,
+              buffers:       List[Tuple[int, int]] | None = None,
+              assume_free:   bool = False,
+              refine_s:      float = REFINE_S):
+    """
+    Como `generate_plan`, pero genera los movimientos (dicts) en cuanto
+    quedan comprometidos, para enviarlos al robot mientras se planifica.
+
+    El primer movimiento sale del tour greedy, sin búsqueda local.  Con
+    `optimize`, después de cada movimiento entregado se refina durante
+    `refine_s` s el orden de los que faltan (partiendo de donde quedará el
+    brazo), hasta gastar `time_budget` s en total: el tiempo de refinar
+    se solapa con el de ejecutar.  Sin `optimize` el plan es el mismo que
+    el de `generate_plan`.
+
+    Al agotarse, `stats` tiene además `first_move_s` (tiempo hasta el
+    primer movimiento) y `planning_s` (tiempo total dentro del
+    planificador, sin contar lo que tarde quien consume el generador).
+    """
+    stats = {} if stats is None else stats
+    model = MachineModel.from_config() if model is None else model
+    t, dentro = time.perf_counter(), 0.0
+    stats.update(moves_2opt=0, moves_oropt=0)
+    pending = _jobs(puzzle_resuelto, pos_inicial, pos_final, rotaciones)
+    if assume_free:
+        movs = _iter_free(pending, model, optimize, time_budget, refine_s, stats)
+    else:
+        movs = _iter_cycles([s for s, _, _ in pending], [d for _, d, _ in pending],
+                            [r for _, _, r in pending],
+                            default_buffers(pos_inicial.shape) if buffers is None else buffers,
+                            model, optimize, time_budget, refine_s, stats,
+                            _occupied(puzzle_resuelto, pos_inicial, pos_final))
+    hechos: List[Tuple[tuple, tuple, int]] = []
+    for src, dst, rot in movs:
+        dentro += time.perf_counter() - t
+        if not hechos:
+            stats["first_move_s"] = dentro
+        hechos.append((src, dst, rot))
+        yield Move(*src, *dst, rot).as_dict()
+        t = time.perf_counter()
+    dentro += time.perf_counter() - t
+    if not hechos:
+        stats["first_move_s"] = dentro
+    stats.update(planning_s=dentro, moves=len(hechos),
+                 plan_s=plan_seconds(hechos, HOME, model))
+
 # ──────────────────────────────────────────────────────────
 #   UTILIDAD DE LÍNEA DE COMANDOS  (para depurar)
 #   $ python3 planner.py puzzle.json > plan.json
@@ -102,12 +763,55 @@ if __name__ == "__main__":
     ap = argparse.ArgumentParser(description="Genera plan greedy.")
     ap.add_argument("json", help="fichero JSON con matrices",
                     type=Path)
+    ap.add_argument("--optimize", action="store_true",
+                    help="Mejorar el orden greedy con 2-opt / Or-opt")
+    ap.add_argument("--budget", type=float, default=TIME_BUDGET_S,
+                    help="Segundos máximos de búsqueda local")
+    ap.add_argument("--simultaneous-xy", action="store_true",
+                    help="Modelo con X e Y moviéndose a la vez (por defecto, en serie)")
+    ap.add_argument("--buffer", type=int, nargs=2, action="append", metavar=("COL", "ROW"),
+                    help="Celda buffer libre (repetible; por defecto a la derecha del tablero)")
+    ap.add_argument("--assume-free", action="store_true",
+                    help="Suponer libres todos los destinos (sin ciclos ni buffer)")
+    ap.add_argument("--stream", action="store_true",
+                    help="Escribir cada movimiento (una línea JSON) en cuanto está decidido")
+    ap.add_argument("--refine", type=float, default=REFINE_S,
+                    help="Con --stream, segundos de búsqueda local entre movimientos")
     args = ap.parse_args()
 
     data = json.loads(args.json.read_text())
-    plan = generate_plan(np.array(data["puzzle_resuelto"]),
-                         np.array(data["pos_inicial"]),
-                         np.array(data["pos_final"]),
-                         np.array(data["rotaciones"]))
+    stats: dict = {}
+    entrada = (np.array(data["puzzle_resuelto"]), np.array(data["pos_inicial"]),
+               np.array(data["pos_final"]), np.array(data["rotaciones"]),
+               args.optimize, args.budget, stats,
+               MachineModel.from_config(simultaneous_xy=args.simultaneous_xy),
+               args.buffer, args.assume_free)
+    if args.stream:
+        for mv in iter_plan(*entrada, refine_s=args.refine):
+            print(json.dumps(mv), flush=True)
+        print(f"{stats['moves']} movimientos, ≈{stats['plan_s']:.0f} s; 2-opt "
+              f"{stats['moves_2opt']}, Or-opt {stats['moves_oropt']}; primer movimiento "
+              f"a los {stats['first_move_s'] * 1000:.0f} ms, plan completo en "
+              f"{stats['planning_s'] * 1000:.0f} ms", file=sys.stderr)
+        sys.exit(0)
+
+    plan = generate_plan(*entrada)
+    print(f"plan completo (y primer movimiento) en {stats['planning_s'] * 1000:.0f} ms",
+          file=sys.stderr)
+    if not args.assume_free:
+        print(f"{stats['moves']} movimientos (mínimo m + c = {stats['misplaced']} + "
+              f"{stats['cycles']} = {stats['min_moves']}); ciclos {stats['cycle_lengths']}, "
+              f"cadenas {stats['chains']}, usos de buffer {stats['buffer_uses']}, "
+              f"≈{stats['plan_s']:.0f} s", file=sys.stderr)
+    elif args.optimize:                         # resumen por stderr: stdout es el plan
+        print(f"{'tour':<11}{'vacío':>9}{'total':>9}{'vacío s':>10}{'estimado s':>12}",
+              file=sys.stderr)
+        for nombre in ("greedy", "optimized"):
+            print(f"{nombre:<11}{stats[nombre + '_empty']:>9.1f}"
+                  f"{stats[nombre + '_travel']:>9.1f}{stats[nombre + '_empty_s']:>10.1f}"
+                  f"{stats[nombre + '_s']:>12.1f}", file=sys.stderr)
+        print(f"2-opt {stats['moves_2opt']}, Or-opt {stats['moves_oropt']}, "
+              f"{'óptimo local' if stats['local_optimum'] else 'límite de tiempo'} "
+              f"en {stats['optimize_s'] * 1000:.0f} ms", file=sys.stderr)
     json.dump(plan, sys.stdout, indent=2)
     sys.stdout.write("\n")
@@ -1,33 +1,86 @@
 #!/usr/bin/env python3
 # socket_client_pi.py  –  corre a la Raspberry
 
-import json, socket, threading, time
+import json, queue, socket, threading, time
 from control import ControlSystem        # importem el teu mòdul de Control
 
 HOST, PORT = "192.168.1.50", 5000        # IP/port del PC
+STREAM = True                            # demanar el pla moviment a moviment
 
 def send(sock, obj):
     sock.sendall(json.dumps(obj).encode() + b"\n")
 
-def recv(sock):
-    data = b""
-    while not data.endswith(b"\n"):
-        data += sock.recv(4096)
-    return json.loads(data)
+def recv(f):
+    """Un missatge JSON per línia de `f = sock.makefile("rb")` (buffer propi de la connexió)."""
+    line = f.readline()
+    if not line:
+        raise ConnectionError("Connexió tancada")
+    return json.loads(line)
+
+_FI = object()           # marca de final del pla (PLAN_END)
+
+class PlanStream:
+    """
+    Pla que arriba en streaming: s'encua sencer com un sol pla i, en
+    iterar-lo, dona cada moviment en arribar el seu PLAN_MOVE i s'acaba
+    amb el PLAN_END.  Així el controlador no dona el pla per acabat (ni
+    envia FINISHED) fins que el PC no ha enviat l'últim moviment.
+    """
+    def __init__(self):
+        self._moves = queue.Queue()
+
+    def put(self, mv: dict):
+        self._moves.put(mv)
+
+    def end(self):
+        self._moves.put(_FI)
+
+    def fail(self, exc: Exception):
+        """La connexió s'ha perdut a mig pla: qui itera rep l'excepció."""
+        self._moves.put(exc)
+
+    def __iter__(self):
+        while True:
+            mv = self._moves.get()
+            if mv is _FI:
+                return
+            if isinstance(mv, Exception):
+                raise mv
+            yield mv
 
 def listener(ctrl: ControlSystem, sock):
-    """Escolta ordres PLAN del PC i les passa al controlador."""
-    while True:
-        msg = recv(sock)
-        if msg.get("type") == "PLAN":
-            ctrl.queue.put(msg["data"])          # encola el pla
-        else:
-            print("Missatge desconegut:", msg)
+    """Escolta ordres PLAN / PLAN_MOVE / PLAN_END del PC i les passa al controlador."""
+    stream = None                                # pla en streaming en curs
+    with sock.makefile("rb") as f:
+        try:
+            while True:
+                msg = recv(f)
+                if msg.get("type") == "PLAN":
+                    ctrl.queue.put(msg["data"])          # encola el pla
+                elif msg.get("type") == "PLAN_MOVE":
+                    if stream is None:                   # primer moviment: encola el pla
+                        stream = PlanStream()
+                        ctrl.queue.put(stream)
+                    stream.put(msg["data"])              # s'executa en arribar
+                elif msg.get("type") == "PLAN_END":
+                    if stream is None:                   # pla buit
+                        stream = PlanStream()
+                        ctrl.queue.put(stream)
+                    stream.end()
+                    stream = None
+                    print(f"Pla complet: {msg['moves']} moviments (primer als "
+                          f"{msg['first_move_s'] * 1000:.0f} ms, total {msg['planning_s']:.1f} s)")
+                else:
+                    print("Missatge desconegut:", msg)
+        except Exception as e:
+            if stream is not None:
+                stream.fail(e)
+            raise
 
 def main():
     ctrl = ControlSystem()          # ja conté MovementSystem i Feedback
     sock = socket.create_connection((HOST, PORT), timeout=10)
-    send(sock, {"type": "HELLO", "who":"puzzlePi"})
+    send(sock, {"type": "HELLO", "who":"puzzlePi", "stream": STREAM})
     threading.Thread(target=listener, args=(ctrl,sock), daemon=True).start()
 
     try:
@@ -1,41 +1,66 @@
 #!/usr/bin/env python3
 # socket_server_pc.py  –  corre al PC
+#
+# Si la Pi envia HELLO amb "stream": true, el pla s'envia moviment a
+# moviment (PLAN_MOVE, i PLAN_END al final) a mesura que el planificador
+# els decideix; mentre la Pi executa, es continua refinant la resta.
+# Si no, s'envia sencer en un sol missatge PLAN.
 
 import json, socket, threading
 from pathlib import Path
 import numpy as np
 
-from planner import generate_plan
+from planner import generate_plan, iter_plan
 from greedy_solver import solve_puzzle   # el teu “greedy” existent
 
 HOST, PORT = "0.0.0.0", 5000
+STREAM_BUDGET_S = 30.0   # cerca local total mentre s'envien moviments
+STREAM_REFINE_S = 0.5    # cerca local entre moviment i moviment (cada un en triga ~20 s)
 
 def send(sock, obj):
     sock.sendall(json.dumps(obj).encode() + b"\n")
 
-def recv(sock):
-    data = b""
-    while not data.endswith(b"\n"):
-        data += sock.recv(4096)
-    return json.loads(data)
+def recv(f):
+    """Un missatge JSON per línia de `f = conn.makefile("rb")` (buffer propi de la connexió)."""
+    line = f.readline()
+    if not line:
+        raise ConnectionError("Connexió tancada")
+    return json.loads(line)
 
 def handle_client(conn, addr):
     print("Pi connectada:", addr)
-    hello = recv(conn)
+    with conn, conn.makefile("rb") as f:
+        serve(conn, f)
+
+def serve(conn, f):
+    """Una sessió amb la Pi: HELLO, pla i estats fins a FINISHED / ERROR."""
+    hello = recv(f)
     if hello.get("type") != "HELLO":
-        conn.close(); return
+        return
 
     # ➊ – obtenir l’estat inicial del tauler (càmera o fitxer)
     pos_ini = np.loadtxt("pos_inicial.txt", dtype=int)
     # ➋ – executar solver greedy al PC
     puzzle_resol, pos_final, rot = solve_puzzle(pos_ini)
-    # ➌ – generar plan
-    plan = generate_plan(puzzle_resol, pos_ini, pos_final, rot)
-    send(conn, {"type":"PLAN", "data": plan})
+    # ➌ – generar plan (sencer o en streaming)
+    stats = {}
+    if hello.get("stream"):
+        for seq, mv in enumerate(iter_plan(puzzle_resol, pos_ini, pos_final, rot,
+                                           optimize=True, time_budget=STREAM_BUDGET_S,
+                                           stats=stats, refine_s=STREAM_REFINE_S)):
+            send(conn, {"type": "PLAN_MOVE", "seq": seq, "data": mv})
+        send(conn, {"type": "PLAN_END", "moves": stats["moves"],
+                    "first_move_s": stats["first_move_s"],
+                    "planning_s": stats["planning_s"]})
+    else:
+        plan = generate_plan(puzzle_resol, pos_ini, pos_final, rot, stats=stats)
+        send(conn, {"type":"PLAN", "data": plan})
+    print(f"Pla: primer moviment als {stats['first_move_s'] * 1000:.0f} ms, "
+          f"complet als {stats['planning_s'] * 1000:.0f} ms")
 
     # ➍ – rebre estats
     while True:
-        msg = recv(conn)
+        msg = recv(f)
         if msg["status"] == "FINISHED":
             print("Seqüència acabada!"); break
         elif msg["status"].startswith("ERROR"):
@@ -43,8 +68,6 @@ def handle_client(conn, addr):
         else:
             print("Pi:", msg["status"])
 
-    conn.close()
-
 def main():
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         s.bind((HOST, PORT))
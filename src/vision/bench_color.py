@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# bench_color.py
+#
+# Solver sólo con forma frente a forma + franjas de color (color_strips.py):
+#   · en las imágenes de in/ (sin solución conocida): tiempo del tensor y
+#     del solver, pares descartados por color y si cambia el ensamblado
+#   · en puzzles sintéticos (synth_puzzle.py): además, precisión directa y
+#     de vecinos frente a la verdad de referencia
+#
+# Cada configuración es (nombre, color_weight, color_max).
+#
+# Uso CLI:
+#   python bench_color.py --weight 1.0 --color-max 25 --sizes 3 4 5 6 --seeds 5
+# ------------------------------------------------------------------------------
+
+from __future__ import annotations
+import argparse
+import contextlib
+import glob
+import io
+import time
+
+import cv2
+import numpy as np
+
+from normalize_pieces import normalizar_piezas
+from segment_pieces import segmentar_imagen
+from solve_puzzle_borders import describe_pieces, solve_cache
+from synth_puzzle import asignar_verdad, generar_puzzle, precision
+
+
+def _preparar(img: np.ndarray):
+    """Segmenta, normaliza y describe: lo común a todas las configuraciones."""
+    piezas, posiciones = segmentar_imagen(img)
+    seg = {f"piece_{i}.png": p for i, p in enumerate(piezas)}
+    norm, _ = normalizar_piezas(seg, lazy=True)
+    return describe_pieces(norm), posiciones
+
+
+def _resolver(cache: dict, strategy: str, color_weight: float, color_max):
+    stats: dict = {}
+    t0 = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            matrix, score, idx2name = solve_cache(cache, "", stats, strategy,
+                                                  render="none",
+                                                  color_weight=color_weight,
+                                                  color_max=color_max)
+    except RuntimeError:
+        matrix = score = idx2name = None
+    stats["total_s"] = time.perf_counter() - t0
+    return matrix, score, idx2name, stats
+
+
+def run(pattern: str, sizes, seeds: int, configs, strategy: str) -> None:
+    print(f"{'entrada':<26}{'config':<14}{'tensor ms':>10}{'color ms':>10}"
+          f"{'solver ms':>10}{'desc. color':>12}{'score':>10}  resultado")
+
+    # 1) Imágenes de muestra: tiempo y cambios respecto a sólo forma
+    for f in sorted(glob.glob(pattern)):
+        img = cv2.imread(f, cv2.IMREAD_UNCHANGED)
+        if img is None:
+            continue
+        cache, _ = _preparar(img)
+        base = None
+        for nombre, w, cmax in configs:
+            matrix, score, _, st = _resolver(cache, strategy, w, cmax)
+            base = matrix if base is None else base
+            res = ("sin solución" if matrix is None else
+                   "= sólo forma" if matrix == base else "distinto")
+            print(f"{f.split('/')[-1]:<26}{nombre:<14}{st.get('tensor_s', 0) * 1e3:>10.1f}"
+                  f"{st.get('color_s', 0) * 1e3:>10.1f}{st.get('solver_s', 0) * 1e3:>10.1f}"
+                  f"{st.get('pairs_color_pruned', 0):>12}"
+                  f"{score if score is not None else float('nan'):>10.1f}  {res}")
+
+    # 2) Sintéticos: precisión media sobre `seeds` puzzles por tamaño
+    print(f"\n{'n×n':<6}{'config':<14}{'resueltos':>10}{'directa':>9}{'vecinos':>9}"
+          f"{'tensor ms':>11}{'solver ms':>11}")
+    for n in sizes:
+        casos = []
+        for seed in range(seeds):
+            img, verdad = generar_puzzle(n, n, seed, inclinacion=0)
+            cache, posiciones = _preparar(img)
+            celda = asignar_verdad(posiciones, verdad)
+            casos.append((cache, {i: celda[int(info["name"][6:-4])]
+                                  for i, info in cache.items()}))
+        for nombre, w, cmax in configs:
+            ok, acc, t_tensor, t_solver = 0, [], [], []
+            for cache, celda_de in casos:
+                matrix, _, _, st = _resolver(cache, strategy, w, cmax)
+                t_tensor.append(st.get("tensor_s", 0.0))
+                t_solver.append(st.get("solver_s", 0.0))
+                if matrix is None:
+                    acc.append((0.0, 0.0))
+                    continue
+                ok += 1
+                acc.append(precision(matrix, celda_de))
+            d, v = np.mean(acc, axis=0)
+            print(f"{f'{n}×{n}':<6}{nombre:<14}{f'{ok}/{len(casos)}':>10}{d:>9.2f}{v:>9.2f}"
+                  f"{np.mean(t_tensor) * 1e3:>11.1f}{np.mean(t_solver) * 1e3:>11.1f}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark de similitud de color en los bordes.")
+    ap.add_argument("-i", "--input", default="in/puzzle_con_piezas*.png",
+                    help="Patrón glob de las imágenes de muestra")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[3, 4, 5, 6],
+                    help="Lados de los puzzles sintéticos n×n")
+    ap.add_argument("--seeds", type=int, default=5, help="Puzzles sintéticos por tamaño")
+    ap.add_argument("--weight", type=float, default=1.0,
+                    help="color_weight de las configuraciones con color")
+    ap.add_argument("--color-max", type=float, default=25.0,
+                    help="ΔE de corte para la configuración con salida temprana")
+    ap.add_argument("--strategy", choices=["greedy", "beam"], default="greedy")
+    args = ap.parse_args()
+    configs = [("forma", 0.0, None),
+               ("forma+color", args.weight, None),
+               ("+corte ΔE", args.weight, args.color_max)]
+    run(args.input, args.sizes, args.seeds, configs, args.strategy)
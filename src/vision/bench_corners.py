@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# bench_corners.py
+#
+# Compara `detectar_esquinas_max_distancia` (combinaciones de 4 vértices,
+# O(k^4)) con `detectar_esquinas_hull` (casco convexo) en:
+#   · las PNG reales de pieces/
+#   · contornos sintéticos: piezas reales escaladas, densificadas a 1 px y
+#     con rizado periódico, para forzar decenas de vértices en approxPolyDP.
+#
+# Uso CLI:
+#   python bench_corners.py -i pieces --scales 4 8 16 --ripples 12 20 30
+# ------------------------------------------------------------------------------
+
+from __future__ import annotations
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from solve_puzzle_borders import (detectar_esquinas_hull,
+                                  detectar_esquinas_max_distancia,
+                                  load_piece_contours)
+
+
+def _timeit(fn, contour, repeat: int):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(contour)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def _same(a: np.ndarray, b: np.ndarray) -> bool:
+    return {tuple(p) for p in a.tolist()} == {tuple(p) for p in b.tolist()}
+
+
+def _num_vertices(contour: np.ndarray) -> int:
+    cnt = contour.reshape(-1, 1, 2).astype(np.int32)
+    return len(cv2.approxPolyDP(cnt, 0.01 * cv2.arcLength(cnt, True), True))
+
+
+def synthetic_contour(contour: np.ndarray, scale: float, ripples: int,
+                      amp: float = 0.10) -> np.ndarray:
+    """Escala el contorno, lo densifica a ~1 px y le añade `ripples` ondas."""
+    c = (contour.astype(np.float64) - contour.mean(0)) * scale
+    closed = np.vstack([c, c[:1]])
+    seg = np.linalg.norm(np.diff(closed, axis=0), axis=1)
+    cum = np.concatenate(([0.0], np.cumsum(seg)))
+    s = np.arange(0.0, cum[-1], 1.0)
+    dense = np.column_stack([np.interp(s, cum, closed[:, 0]),
+                             np.interp(s, cum, closed[:, 1])])
+    dense *= 1.0 + amp * np.sin(2 * np.pi * ripples * s / cum[-1])[:, None]
+    return np.round(dense - dense.min(0)).astype(np.int32)
+
+
+def run(pieces_dir: str, scales, ripples, repeat: int, max_k: int) -> None:
+    pieces = load_piece_contours(pieces_dir)
+    if not pieces:
+        raise FileNotFoundError(f"❌ No hay PNG en {pieces_dir}")
+
+    rows = [(name, cnt) for name, _, cnt, _ in pieces]
+    base = pieces[0][2]
+    rows += [(f"sint x{s:g} r{r}", synthetic_contour(base, s, r))
+             for s in scales for r in ripples]
+
+    print(f"{'contorno':<22}{'pts':>7}{'k':>5}{'comb (ms)':>12}"
+          f"{'hull (ms)':>12}{'×':>9}  igual")
+    t_old = t_new = 0.0
+    for name, cnt in rows:
+        k = _num_vertices(cnt)
+        tn, new = _timeit(detectar_esquinas_hull, cnt, repeat)
+        if k <= max_k:
+            to, old = _timeit(detectar_esquinas_max_distancia, cnt, 1)
+            same = "sí" if _same(old, new) else "NO"
+            t_old, t_new = t_old + to, t_new + tn
+            print(f"{name:<22}{len(cnt):>7}{k:>5}{to * 1e3:>12.2f}"
+                  f"{tn * 1e3:>12.2f}{to / tn:>9.1f}  {same}")
+        else:
+            print(f"{name:<22}{len(cnt):>7}{k:>5}{'(omitido)':>12}"
+                  f"{tn * 1e3:>12.2f}{'—':>9}  —")
+    print(f"\nTotal comparado: combinaciones {t_old:.3f} s · hull {t_new:.3f} s")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark de detección de esquinas.")
+    ap.add_argument("-i", "--input", default="pieces",
+                    help="Directorio con PNG de piezas")
+    ap.add_argument("--scales", type=float, nargs="+", default=[4, 8, 16],
+                    help="Factores de escalado de los contornos sintéticos")
+    ap.add_argument("--ripples", type=int, nargs="+", default=[12, 20, 30],
+                    help="Número de ondas añadidas al contorno sintético")
+    ap.add_argument("--repeat", type=int, default=5,
+                    help="Repeticiones del detector rápido (se toma el mínimo)")
+    ap.add_argument("--max-k", type=int, default=70,
+                    help="No ejecutar el detector O(k^4) por encima de k vértices")
+    args = ap.parse_args()
+    run(args.input, args.scales, args.ripples, args.repeat, args.max_k)
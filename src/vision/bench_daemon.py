@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# bench_daemon.py
+#
+# Latencia en frío frente a en caliente del pipeline de visión:
+#   · frío          → proceso nuevo que importa cv2/numpy/shapely y resuelve
+#                     (lo mismo que hace main.py, sin escribir ficheros)
+#   · cliente       → proceso nuevo de solver_client.py contra el servicio
+#   · petición      → sólo la petición al servicio (sin arrancar Python)
+# El servicio se lanza dos veces: sin caché de etapas y con ella.
+#
+# Uso CLI:
+#   python bench_daemon.py [-i in/puzzle_con_piezas.png] [--runs 10]
+# ------------------------------------------------------------------------------
+
+from __future__ import annotations
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from solver_client import request, solve
+
+BASE_DIR = Path(__file__).resolve().parent
+
+COLD_SNIPPET = (
+    "import json, sys, contextlib, io\n"
+    "from pipeline import resultado_json, run_pipeline\n"
+    "with contextlib.redirect_stdout(io.StringIO()):\n"
+    "    res = run_pipeline(sys.argv[1])\n"
+    "print(json.dumps(resultado_json(res)))\n"
+)
+
+
+def _medir(fn, runs: int):
+    tiempos = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(tiempos), min(tiempos)
+
+
+def _run(cmd):
+    subprocess.run(cmd, cwd=BASE_DIR, check=True, stdout=subprocess.DEVNULL)
+
+
+def _con_servicio(sock: str, extra, image: str, runs: int):
+    proc = subprocess.Popen([sys.executable, "solver_daemon.py", "--unix", sock, *extra],
+                            cwd=BASE_DIR, stdout=subprocess.DEVNULL)
+    try:
+        t0 = time.perf_counter()
+        while True:
+            try:
+                request({"type": "PING"}, unix=sock, timeout=1.0)
+                break
+            except OSError:
+                if proc.poll() is not None or time.perf_counter() - t0 > 30:
+                    raise RuntimeError("El servicio no arrancó")
+                time.sleep(0.05)
+        arranque = (time.perf_counter() - t0) * 1000
+        cliente = _medir(lambda: _run([sys.executable, "solver_client.py", image,
+                                       "--unix", sock]), runs)
+        peticion = _medir(lambda: solve(image, unix=sock), runs)
+        request({"type": "SHUTDOWN"}, unix=sock)
+    finally:
+        proc.wait(timeout=10)
+    return arranque, cliente, peticion
+
+
+def run(image: str, runs: int) -> None:
+    image = str(Path(image).resolve())
+    print(f"Imagen: {image}   ({runs} repeticiones, mediana / mínimo en ms)\n")
+
+    frio = _medir(lambda: _run([sys.executable, "-c", COLD_SNIPPET, image]), runs)
+    print(f"{'frío (proceso nuevo)':<36}{frio[0]:>9.1f} / {frio[1]:.1f}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sock = os.path.join(tmp, "solver.sock")
+        for nombre, extra in (("servicio sin caché", ["--no-cache"]),
+                              ("servicio con caché de etapas", [])):
+            arranque, cliente, peticion = _con_servicio(sock, extra, image, runs)
+            print(f"\n{nombre}  (arranque + calentamiento {arranque:.0f} ms)")
+            print(f"{'  cliente (proceso nuevo)':<36}{cliente[0]:>9.1f} / {cliente[1]:.1f}"
+                  f"   ×{frio[0] / cliente[0]:.1f}")
+            print(f"{'  petición (conexión abierta)':<36}{peticion[0]:>9.1f} / {peticion[1]:.1f}"
+                  f"   ×{frio[0] / peticion[0]:.1f}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark frío / caliente del solver.")
+    ap.add_argument("-i", "--input", default=str(BASE_DIR / "in" / "puzzle_con_piezas.png"),
+                    help="Imagen del tablero")
+    ap.add_argument("--runs", type=int, default=10, help="Repeticiones por medida")
+    args = ap.parse_args()
+    run(args.input, args.runs)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# bench_scaling.py
+#
+# Escalado del pipeline completo sobre puzzles sintéticos (synth_puzzle.py)
+# de 2×2 a 20×20.  Para cada tamaño mide por separado cada etapa:
+#   segmentar → normalizar → descriptores → tensor → solver → composición
+# y compara la solución con la verdad de referencia del generador
+# (precisión directa y de vecinos, ver `synth_puzzle.precision`).  La
+# columna "rectos" es la fracción de piezas con tantos lados rectos como les
+# corresponden: separa los fallos de segmentación / normalización de los del
+# solver.
+#
+# Los resultados se guardan en JSON (--out) junto con el commit y las
+# versiones de las librerías; con --compare se muestran las diferencias
+# frente a una ejecución anterior.
+#
+# Uso CLI:
+#   python bench_scaling.py --sizes 2 3 4 5 6 8 10 --out base.json
+#   python bench_scaling.py --out nuevo.json --compare base.json
+# ------------------------------------------------------------------------------
+
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import json
+import platform
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from normalize_pieces import normalizar_piezas
+from segment_pieces import segmentar_imagen
+from edge_index import TOPK_DEFAULT
+from solve_puzzle_borders import describe_pieces, solve_cache
+from synth_puzzle import asignar_verdad, generar_puzzle, precision
+
+TAMANOS = [2, 3, 4, 5, 6, 8, 10, 15, 20]
+ETAPAS  = ["segment", "normalize", "descriptors", "tensor", "solver", "compose"]
+
+
+def _meta(args) -> dict:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                             text=True, cwd=Path(__file__).parent).stdout.strip()
+    except OSError:
+        rev = ""
+    return {"git": rev or None, "python": platform.python_version(),
+            "numpy": np.__version__, "opencv": cv2.__version__,
+            "seed": args.seed, "tilt": args.tilt, "lado": args.lado,
+            "strategy": args.strategy, "topk": args.topk, "repeat": args.repeat,
+            "fecha": time.strftime("%Y-%m-%d %H:%M:%S")}
+
+
+def medir(n: int, seed: int, tilt: float, lado: int, strategy: str,
+          beam_width: int, out_png: Path, topk: int = TOPK_DEFAULT) -> dict:
+    """Ejecuta una vez el pipeline sobre un puzzle n×n y devuelve sus métricas."""
+    img, verdad = generar_puzzle(n, n, seed, lado, tilt)
+    t: dict = {}
+    res = {"size": n, "pieces": n * n, "image_px": list(img.shape[1::-1]), "timings": t}
+
+    t0 = time.perf_counter()
+    piezas, posiciones = segmentar_imagen(img)
+    t["segment"] = time.perf_counter() - t0
+    res["segmented"] = len(piezas)
+
+    seg = {f"piece_{i}.png": p for i, p in enumerate(piezas)}
+    t0 = time.perf_counter()
+    norm, _ = normalizar_piezas(seg, lazy=True)
+    t["normalize"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    cache = describe_pieces(norm)
+    t["descriptors"] = time.perf_counter() - t0
+
+    # piezas con tantos lados rectos como les corresponden por su celda: si
+    # falla, el error viene de segmentación / normalización, no del solver
+    celda = asignar_verdad(posiciones, verdad)
+    celda_de = {idx: celda[int(info["name"][6:-4])] for idx, info in cache.items()}
+    rectos = lambda r, c: (r == 0) + (r == n - 1) + (c == 0) + (c == n - 1)
+    res["straight_ok"] = float(np.mean([len(cache[i]["straight"]) == rectos(*celda_de[i])
+                                        for i in cache]))
+
+    stats: dict = {}
+    t0 = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            matrix, score, idx2name = solve_cache(cache, out_png, stats, strategy,
+                                                  beam_width, render="full", topk=topk)
+    except (RuntimeError, ValueError) as e:
+        total = time.perf_counter() - t0
+        t["tensor"] = stats.get("tensor_s")
+        t["solver"] = total - stats.get("tensor_s", 0.0)
+        res.update(error=str(e), score=None, direct=0.0, neighbour=0.0)
+        return res
+    total = time.perf_counter() - t0
+    t["tensor"], t["solver"] = stats["tensor_s"], stats["solver_s"]
+    t["compose"] = total - stats["tensor_s"] - stats["solver_s"]
+
+    directa, vecinos = precision(matrix, celda_de)
+    res.update(error=None, score=score, direct=directa, neighbour=vecinos,
+               prune_rate=stats.get("prune_rate"))
+    return res
+
+
+def _mejor(runs):
+    """Combina repeticiones: mínimo por etapa, resto de la primera."""
+    res = dict(runs[0])
+    res["timings"] = {k: min((r["timings"][k] for r in runs
+                              if r["timings"].get(k) is not None), default=None)
+                      for k in runs[0]["timings"]}
+    return res
+
+
+def _fmt_ms(v) -> str:
+    return f"{v * 1e3:9.1f}" if v is not None else f"{'—':>9}"
+
+
+def mostrar(resultados) -> None:
+    print(f"\n{'n×n':>7}{'piezas':>11}" + "".join(f"{e[:9]:>10}" for e in ETAPAS)
+          + f"{'total':>10}{'rectos':>8}{'directa':>9}{'vecinos':>9}  error")
+    for r in resultados:
+        t = r["timings"]
+        total = sum(v for v in t.values() if v is not None)
+        print(f"{str(r['size']) + '×' + str(r['size']):>7}"
+              + f"{str(r['segmented']) + '/' + str(r['pieces']):>11}"
+              + "".join(f" {_fmt_ms(t.get(e))}" for e in ETAPAS)
+              + f" {_fmt_ms(total)}{r['straight_ok']:>8.2f}{r['direct']:>9.2f}"
+              + f"{r['neighbour']:>9.2f}  {r['error'] or ''}")
+    print("(tiempos en ms)")
+
+
+def comparar(resultados, previo: dict) -> None:
+    antes = {r["size"]: r for r in previo["results"]}
+    print(f"\n📊 Frente a {previo['meta'].get('git') or '?'} "
+          f"({previo['meta'].get('fecha', '?')}): Δ% por etapa, Δ precisión")
+    print(f"{'n×n':>7}" + "".join(f"{e[:9]:>10}" for e in ETAPAS)
+          + f"{'Δdirecta':>10}{'Δvecinos':>10}")
+    for r in resultados:
+        a = antes.get(r["size"])
+        if a is None:
+            continue
+        celdas = []
+        for e in ETAPAS:
+            nuevo, viejo = r["timings"].get(e), a["timings"].get(e)
+            celdas.append(f"{(nuevo / viejo - 1) * 100:+9.0f}%" if nuevo and viejo
+                          else f"{'—':>10}")
+        print(f"{str(r['size']) + '×' + str(r['size']):>7}" + "".join(celdas)
+              + f"{r['direct'] - a['direct']:>+10.2f}{r['neighbour'] - a['neighbour']:>+10.2f}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark de escalado sobre puzzles sintéticos.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=TAMANOS,
+                    help="Lados de los puzzles n×n a generar")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--tilt", type=float, default=0.0,
+                    help="Inclinación máxima de las piezas (ver synth_puzzle.py); "
+                         "con 0 sólo hay giros rectos y se mide el solver")
+    ap.add_argument("--lado", type=int, default=100, help="Lado de la celda en px")
+    ap.add_argument("--strategy", choices=["greedy", "beam", "topk"], default="greedy")
+    ap.add_argument("--beam-width", type=int, default=8)
+    ap.add_argument("--topk", type=int, default=TOPK_DEFAULT)
+    ap.add_argument("--repeat", type=int, default=1,
+                    help="Repeticiones por tamaño (se toma el mínimo de cada etapa)")
+    ap.add_argument("--out", default=None, help="JSON donde guardar los resultados")
+    ap.add_argument("--compare", default=None, help="JSON de una ejecución anterior")
+    args = ap.parse_args()
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            runs = [medir(n, args.seed, args.tilt, args.lado, args.strategy,
+                          args.beam_width, Path(tmp) / "solucion.png", args.topk)
+                    for _ in range(args.repeat)]
+            resultados.append(_mejor(runs))
+            r = resultados[-1]
+            print(f"✔︎ {n}×{n}: directa {r['direct']:.2f}, vecinos {r['neighbour']:.2f}"
+                  + (f"  ⚠️  {r['error']}" if r["error"] else ""))
+
+    mostrar(resultados)
+    salida = {"meta": _meta(args), "results": resultados}
+    if args.out:
+        Path(args.out).write_text(json.dumps(salida, indent=2))
+        print(f"\n💾 Resultados guardados en {args.out}")
+    if args.compare:
+        comparar(resultados, json.loads(Path(args.compare).read_text()))
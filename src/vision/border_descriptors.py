@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# border_descriptors.py
+#
+# Motor vectorizado (solo NumPy) de descriptores de borde.  Sustituye en el
+# camino crítico del solver a `resample_border`, `calcular_curvatura`,
+# `fourier_descriptors` e `is_straight` de solve_puzzle_borders.py, que
+# trabajan punto a punto con shapely.
+#
+# Todos los bordes de todas las piezas se procesan en una única llamada:
+# los polígonos se concatenan, se remuestrean por longitud de arco acumulada
+# con `searchsorted` y se devuelven arrays de forma fija.
+#
+# Tolerancia frente a las funciones originales (comprobada sobre pieces/):
+#   · puntos remuestreados  ≤ 1e-3 px
+#   · curvatura             ≤ 1e-3 rad
+#   · Fourier normalizado   ≤ 1e-4
+#   · is_straight           idéntico
+# ------------------------------------------------------------------------------
+
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Sequence, Tuple
+
+import numpy as np
+
+NUM_SAMPLES = 100
+VENTANA     = 5
+NUM_FOURIER = 20
+
+
+@dataclass
+class BorderDescriptors:
+    points:    np.ndarray   # (B, num, 2)        float32
+    curvature: np.ndarray   # (B, num - 2·ventana) float32
+    fourier:   np.ndarray   # (B, num_fourier)   float32
+    valid:     np.ndarray   # (B,) bool → el borde tenía al menos 2 puntos
+
+    def reversed(self, ventana: int = VENTANA) -> "BorderDescriptors":
+        """Descriptores de los mismos bordes recorridos en sentido contrario."""
+        pts = self.points[:, ::-1]
+        return BorderDescriptors(pts, _curvature(pts, ventana),
+                                 _fourier(pts, self.fourier.shape[1]), self.valid)
+
+
+# ─────────── CONCATENACIÓN ───────────
+def _concat(borders: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray,
+                                                     np.ndarray, np.ndarray]:
+    """
+    Une todos los bordes en un único array de puntos.  Los bordes con menos
+    de 2 puntos se sustituyen por un segmento degenerado en el origen.
+    Devuelve (pts, inicio, fin, valid); `fin` es el índice del último punto.
+    """
+    arrs, valid = [], np.zeros(len(borders), bool)
+    for i, b in enumerate(borders):
+        b = np.asarray(b, np.float64).reshape(-1, 2)
+        if len(b) >= 2:
+            valid[i] = True
+        else:
+            b = np.zeros((2, 2))
+        arrs.append(b)
+    lens  = np.array([len(a) for a in arrs])
+    end   = np.cumsum(lens) - 1
+    start = end - lens + 1
+    return np.concatenate(arrs), start, end, valid
+
+
+# ─────────── DESCRIPTORES ───────────
+def resample(borders: Sequence[np.ndarray], num: int = NUM_SAMPLES
+             ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Remuestrea cada borde en `num` puntos equiespaciados por longitud de arco.
+    Devuelve (puntos (B, num, 2) float32, valid (B,)).
+    """
+    if len(borders) == 0:
+        return np.empty((0, num, 2), np.float32), np.empty(0, bool)
+    pts, start, end, valid = _concat(borders)
+
+    seg = np.linalg.norm(np.diff(pts, axis=0), axis=1)
+    seg[end[:-1]] = 0.0                           # salto entre bordes
+    cum = np.concatenate(([0.0], np.cumsum(seg)))
+
+    length  = cum[end] - cum[start]
+    targets = cum[start, None] + np.linspace(0.0, 1.0, num)[None, :] * length[:, None]
+
+    idx = np.searchsorted(cum, targets, side="right") - 1
+    idx = np.clip(idx, start[:, None], (end - 1)[:, None])
+    d   = seg[idx]
+    frac = np.divide(targets - cum[idx], d, out=np.zeros_like(d), where=d > 0)
+    frac = np.clip(frac, 0.0, 1.0)[..., None]
+
+    out = pts[idx] + frac * (pts[idx + 1] - pts[idx])
+    return out.astype(np.float32), valid
+
+
+def _curvature(points: np.ndarray, ventana: int = VENTANA) -> np.ndarray:
+    p = points.astype(np.float64)
+    n = p.shape[1]
+    v1 = p[:, ventana:n - ventana] - p[:, :n - 2 * ventana]
+    v2 = p[:, 2 * ventana:] - p[:, ventana:n - ventana]
+    n1, n2 = np.linalg.norm(v1, axis=2), np.linalg.norm(v2, axis=2)
+    ok  = (n1 >= 1e-6) & (n2 >= 1e-6)
+    cos = np.divide((v1 * v2).sum(2), n1 * n2, out=np.ones_like(n1), where=ok)
+    return np.where(ok, np.arccos(np.clip(cos, -1.0, 1.0)), 0.0).astype(np.float32)
+
+
+def _fourier(points: np.ndarray, num: int = NUM_FOURIER) -> np.ndarray:
+    c = points[:, :, 0].astype(np.float64) + 1j * points[:, :, 1]
+    mags = np.abs(np.fft.fft(c, axis=1)[:, 1:num + 1])
+    first = mags[:, :1]
+    mags = np.divide(mags, first, out=mags.copy(), where=first > 0)
+    return mags.astype(np.float32)
+
+
+def describe_borders(borders: Sequence[np.ndarray],
+                     num: int = NUM_SAMPLES,
+                     ventana: int = VENTANA,
+                     num_fourier: int = NUM_FOURIER) -> BorderDescriptors:
+    """
+    Calcula en bloque los descriptores de todos los `borders` (listas de
+    puntos Nx2).  Equivale a aplicar `resample_border`, `calcular_curvatura`
+    y `fourier_descriptors` a cada borde por separado.
+    """
+    pts, valid = resample(borders, num)
+    return BorderDescriptors(pts, _curvature(pts, ventana),
+                             _fourier(pts, num_fourier), valid)
+
+
+# ─────────── RECTITUD ───────────
+def are_straight(borders: Sequence[np.ndarray], max_dev: float) -> np.ndarray:
+    """
+    Versión en bloque de `is_straight`: proyecta todos los puntos interiores
+    sobre la cuerda de su borde y comprueba la desviación máxima.
+    """
+    if len(borders) == 0:
+        return np.empty(0, bool)
+    pts, start, end, valid = _concat(borders)
+
+    p0, p1 = pts[start], pts[end]
+    chord  = np.linalg.norm(p1 - p0, axis=1)
+    u = np.divide(p1 - p0, chord[:, None], out=np.zeros_like(p0),
+                  where=chord[:, None] >= 1e-3)
+
+    owner = np.repeat(np.arange(len(start)), end - start + 1)
+    rel   = pts - p0[owner]
+    dev   = np.abs(rel[:, 0] * u[owner, 1] - rel[:, 1] * u[owner, 0])
+    dev[start] = dev[end] = 0.0                   # solo puntos interiores
+
+    return valid & (chord >= 1e-3) & (np.maximum.reduceat(dev, start) <= max_dev)
+
+
+# ─────────── TIPO DE BORDE ───────────
+FLAT, TAB, BLANK = 0, 1, -1
+
+def classify_edges(borders: Sequence[np.ndarray], centres: np.ndarray,
+                   flat_tol: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Clasifica cada borde como saliente (TAB), entrante (BLANK) o recto (FLAT).
+    `centres[i]` es el centro de la pieza del borde i; la profundidad es la
+    desviación máxima respecto a la cuerda, positiva hacia fuera de la pieza.
+    Devuelve (tipo int8, profundidad, longitud de la cuerda).
+    """
+    if len(borders) == 0:
+        return np.empty(0, np.int8), np.empty(0), np.empty(0)
+    pts, start, end, valid = _concat(borders)
+
+    p0, p1 = pts[start], pts[end]
+    chord  = np.linalg.norm(p1 - p0, axis=1)
+    u = np.divide(p1 - p0, chord[:, None], out=np.zeros_like(p0),
+                  where=chord[:, None] >= 1e-3)
+
+    # lado de la cuerda en el que queda el centro → el contrario es "fuera"
+    rc   = np.asarray(centres, np.float64) - p0
+    sign = -np.sign(rc[:, 0] * u[:, 1] - rc[:, 1] * u[:, 0])
+    sign[sign == 0] = 1.0
+
+    owner = np.repeat(np.arange(len(start)), end - start + 1)
+    rel   = pts - p0[owner]
+    dev   = (rel[:, 0] * u[owner, 1] - rel[:, 1] * u[owner, 0]) * sign[owner]
+    hi, lo = np.maximum.reduceat(dev, start), np.minimum.reduceat(dev, start)
+    depth  = np.where(hi >= -lo, hi, lo)
+
+    kind = np.where(depth > 0, TAB, BLANK).astype(np.int8)
+    kind[(np.abs(depth) <= flat_tol) | ~valid | (chord < 1e-3)] = FLAT
+    return kind, depth, chord
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# color_strips.py
+#
+# Descriptor de color de cada borde: una franja estrecha de píxeles justo
+# por dentro del contorno, convertida a LAB y remuestreada a longitud fija.
+# Dos lados que encajan tienen, recorridos en sentido contrario, franjas de
+# color parecidas; la distancia media ΔE entre ellas complementa a la forma
+# (curvatura + Fourier) en el tensor de costes del solver.
+#
+# Todas las piezas se muestrean en un solo lote: los puntos de cada borde se
+# desplazan hacia el interior según su normal, se leen con interpolación
+# bilineal (para piezas diferidas, `PiezaOrientada`, directamente del recorte
+# original, deshaciendo su transformación) y se pasan a LAB en NumPy (cvtColor a Lab
+# tarda ~160 ms en la primera llamada de cada proceso por sus tablas).
+# Las muestras que caen fuera de la máscara alfa (esquinas) se ignoran.
+# ------------------------------------------------------------------------------
+
+from __future__ import annotations
+from typing import Sequence
+
+import numpy as np
+
+from border_descriptors import resample
+
+COLOR_SAMPLES = 24              # puntos por franja
+COLOR_DEPTHS  = (3.0, 5.0, 7.0)  # px hacia dentro del contorno que se promedian
+
+_RGB2XYZ = np.array([[0.412453, 0.357580, 0.180423],
+                     [0.212671, 0.715160, 0.072169],
+                     [0.019334, 0.119193, 0.950227]])
+_BLANCO  = np.array([0.950456, 1.0, 1.088754])        # D65, como OpenCV
+
+
+def bgr_to_lab(bgr: np.ndarray) -> np.ndarray:
+    """BGR 0‥255 (…, 3) → CIE L*a*b* (L 0‥100), equivalente a COLOR_BGR2Lab."""
+    rgb = np.asarray(bgr, np.float64)[..., ::-1] / 255.0
+    lin = np.where(rgb > 0.04045, ((rgb + 0.055) / 1.055) ** 2.4, rgb / 12.92)
+    xyz = lin @ _RGB2XYZ.T / _BLANCO
+    f = np.where(xyz > 0.008856, np.cbrt(xyz), 7.787 * xyz + 16.0 / 116.0)
+    L = np.where(xyz[..., 1] > 0.008856, 116.0 * f[..., 1] - 16.0, 903.3 * xyz[..., 1])
+    return np.stack([L, 500.0 * (f[..., 0] - f[..., 1]),
+                     200.0 * (f[..., 1] - f[..., 2])], -1).astype(np.float32)
+
+
+def _normales(points: np.ndarray, centres: np.ndarray) -> np.ndarray:
+    """Normal unitaria de cada punto (B, S, 2), orientada hacia el centro."""
+    t = np.gradient(points, axis=1)
+    n = np.stack([-t[..., 1], t[..., 0]], -1)
+    n /= np.maximum(np.linalg.norm(n, axis=-1, keepdims=True), 1e-6)
+    hacia = centres[:, None, :] - points
+    signo = np.sign((n * hacia).sum(-1).mean(1))
+    signo[signo == 0] = 1.0
+    return n * signo[:, None, None]
+
+
+def _muestrear(img, xy: np.ndarray) -> np.ndarray:
+    """
+    BGRA (K, 4) float32 en los puntos `xy` (K, 2) de la pieza normalizada:
+    color bilineal y alfa del vecino más próximo.  Se lee con índices sobre
+    las vistas, sin copiar el recorte.
+    """
+    if hasattr(img, "M"):                       # PiezaOrientada: leer del recorte
+        Minv = np.linalg.inv(img.M)
+        xy = xy @ Minv[:2, :2].T + Minv[:2, 2]
+        bgr, alpha = img.bgr, img.alpha
+    elif img.shape[2] == 4:
+        bgr, alpha = img[:, :, :3], img[:, :, 3]
+    else:
+        bgr, alpha = img, None
+    h, w = bgr.shape[:2]
+    x = np.clip(xy[:, 0], 0, w - 1)
+    y = np.clip(xy[:, 1], 0, h - 1)
+    x0 = np.minimum(x.astype(np.intp), w - 2).clip(0)
+    y0 = np.minimum(y.astype(np.intp), h - 2).clip(0)
+    fx, fy = (x - x0)[:, None], (y - y0)[:, None]
+    x1, y1 = np.minimum(x0 + 1, w - 1), np.minimum(y0 + 1, h - 1)
+    col = ((bgr[y0, x0] * (1 - fx) + bgr[y0, x1] * fx) * (1 - fy) +
+           (bgr[y1, x0] * (1 - fx) + bgr[y1, x1] * fx) * fy)
+    fuera = (xy[:, 0] < 0) | (xy[:, 0] > w - 1) | (xy[:, 1] < 0) | (xy[:, 1] > h - 1)
+    a = (np.full(len(x), 255.0) if alpha is None else
+         alpha[np.rint(y).astype(np.intp), np.rint(x).astype(np.intp)].astype(np.float64))
+    a[fuera] = 0.0
+    return np.column_stack([col, a]).astype(np.float32)
+
+
+def color_strips(images: Sequence, borders: Sequence[np.ndarray],
+                 centres: np.ndarray, samples: int = COLOR_SAMPLES,
+                 depths: Sequence[float] = COLOR_DEPTHS) -> np.ndarray:
+    """
+    Franjas LAB de los bordes.  `borders` tiene 4 bordes por imagen (en el
+    orden de `images`) y `centres[p]` es el centro de la pieza p.
+    Devuelve (4·N, samples, 3) float32; los puntos sin ninguna muestra
+    dentro de la pieza (y los bordes vacíos) quedan a NaN.
+    """
+    n = len(images)
+    pts, valid = resample(borders, samples)
+    pts = pts.astype(np.float64)
+    c = np.repeat(np.asarray(centres, np.float64), 4, axis=0)
+    nrm = _normales(pts, c)
+    d = np.asarray(depths, np.float64)
+    xy = pts[:, :, None, :] + d[None, None, :, None] * nrm[:, :, None, :]  # (B,S,D,2)
+
+    bgra = np.empty((4 * n, samples, len(d), 4), np.float32)
+    for p, img in enumerate(images):
+        bgra[4 * p:4 * p + 4] = _muestrear(img, xy[4 * p:4 * p + 4].reshape(-1, 2)
+                                           ).reshape(4, samples, len(d), 4)
+    dentro = bgra[..., 3:] > 127
+    cuenta = dentro.sum(2)
+    media = (bgra[..., :3] * dentro).sum(2) / np.maximum(cuenta, 1)
+    lab = bgr_to_lab(media)
+    lab[(cuenta[..., 0] == 0) | ~valid[:, None]] = np.nan
+    return lab
+
+
+def strip_costs(lab: np.ndarray, i: np.ndarray, j: np.ndarray,
+                chunk: int = 1 << 16) -> np.ndarray:
+    """
+    ΔE medio entre la franja del borde i[k] y la del borde j[k] recorrida en
+    sentido contrario (como se tocan dos lados encajados).  Los puntos sin
+    color toman el color medio de su franja.
+    """
+    media = np.nanmean(np.where(np.isnan(lab).all(1, keepdims=True), 0.0, lab),
+                       axis=1, keepdims=True)
+    lab = np.where(np.isnan(lab), media, lab).astype(np.float32)
+    rev = np.ascontiguousarray(lab[:, ::-1])
+    out = np.empty(len(i), np.float32)
+    for s in range(0, len(i), chunk):
+        d = lab[i[s:s + chunk]] - rev[j[s:s + chunk]]
+        out[s:s + chunk] = np.sqrt(np.einsum("psc,psc->ps", d, d)).mean(-1)
+    return out
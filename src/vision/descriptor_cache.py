@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# descriptor_cache.py
+#
+# Caché persistente en disco de los descriptores de cada pieza (bordes,
+# esquinas y lados rectos).  La clave es el SHA-256 de los bytes del PNG más
+# los parámetros de extracción (STRIPE_SAMPLES, MAX_DEVIATION_PX, …), así que
+# cambiar la imagen o los parámetros invalida la entrada automáticamente.
+#
+# Cada pieza se guarda en un .npz comprimido.  El directorio tiene un tamaño
+# máximo: al superarlo se borran las entradas usadas hace más tiempo (LRU por
+# mtime, que se actualiza en cada acierto) hasta bajar a LOW_WATER del
+# máximo.  El tamaño total se lleva en memoria (se mide una vez al abrir la
+# caché), así que escribir no recorre el directorio salvo al desalojar.
+# Los temporales (`*.npz.tmp`) no casan con el patrón del LRU: nunca se
+# borra un fichero que otro proceso aún está escribiendo.
+# ------------------------------------------------------------------------------
+
+from __future__ import annotations
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+CACHE_VERSION     = 1
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / ".cache" / "descriptors"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+LOW_WATER         = 0.9          # al desalojar se baja a esta fracción del máximo
+SIDES = ["top", "right", "bottom", "left"]
+
+
+def dir_bytes(root: Path, pattern: str = "*") -> int:
+    """Suma de tamaños de los ficheros de `root` que casan con `pattern`."""
+    total = 0
+    for f in Path(root).glob(pattern):
+        try:
+            total += f.stat().st_size
+        except FileNotFoundError:
+            continue
+    return total
+
+
+def file_bytes(path: Path) -> int:
+    """Tamaño de `path`, 0 si no existe."""
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def evict_lru(root: Path, max_bytes: int, pattern: str = "*") -> Tuple[int, int]:
+    """
+    Borra los ficheros menos usados de `root` hasta no superar `max_bytes`.
+    Devuelve (ficheros borrados, bytes que quedan).
+    """
+    files = []
+    for f in Path(root).glob(pattern):
+        try:
+            st = f.stat()
+        except FileNotFoundError:
+            continue
+        files.append((st.st_mtime, st.st_size, f))
+
+    total, removed = sum(size for _, size, _ in files), 0
+    for _, size, f in sorted(files, key=lambda t: t[0]):
+        if total <= max_bytes:
+            break
+        f.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    return removed, total
+
+
+class DescriptorCache:
+    """Almacén `.npz` direccionado por contenido para los descriptores de pieza."""
+
+    def __init__(self, root: str | Path = DEFAULT_CACHE_DIR,
+                 params: dict | None = None,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._bytes = dir_bytes(self.root, "*.npz")  # tamaño actual, en memoria
+        self._salt = json.dumps({"version": CACHE_VERSION, **(params or {})},
+                                sort_keys=True).encode()
+        self.hits = self.misses = 0
+
+    def key(self, png_bytes: bytes) -> str:
+        return hashlib.sha256(self._salt + png_bytes).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.npz"
+
+    def get(self, key: str) -> Dict | None:
+        path = self._path(key)
+        try:
+            with np.load(path) as z:
+                entry = {
+                    "borders":  {s: z[s] for s in SIDES},
+                    "corners":  z["corners"],
+                    "straight": [s for s, ok in zip(SIDES, z["straight"]) if ok],
+                }
+        except (FileNotFoundError, OSError, KeyError, ValueError):
+            self.misses += 1
+            return None
+        os.utime(path)                              # marca de uso para el LRU
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, borders: Dict[str, np.ndarray],
+            corners: np.ndarray, straight: List[str]) -> None:
+        path = self._path(key)
+        tmp = self.root / f"{key}.{os.getpid()}.npz.tmp"
+        with tmp.open("wb") as f:                   # con fichero: savez no añade .npz
+            np.savez_compressed(
+                f,
+                corners=np.asarray(corners, np.float32).reshape(-1, 2),
+                straight=np.array([s in straight for s in SIDES]),
+                **{s: np.asarray(borders[s], np.int32).reshape(-1, 2) for s in SIDES},
+            )
+        self._bytes += file_bytes(tmp) - file_bytes(path)
+        os.replace(tmp, path)
+        if self._bytes > self.max_bytes:
+            self._bytes = evict_lru(self.root, int(self.max_bytes * LOW_WATER), "*.npz")[1]
+
+    def clear(self) -> None:
+        for f in self.root.glob("*.npz"):
+            f.unlink(missing_ok=True)
+        self._bytes = 0
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# edge_index.py
+#
+# Índice de vecinos más próximos entre bordes para puzzles grandes.  En lugar
+# del tensor completo N×4×N×4 (todos los pares de lados, (4N)² métricas), se
+# guardan para cada lado los `k` lados más compatibles y el solver sólo mira
+# esos candidatos; el coste exacto de cualquier otro par se calcula cuando
+# hace falta.
+#
+# La búsqueda es fuerza bruta por bloques en float32: el descriptor de cada
+# lado es [curvatura | Fourier] concatenados y la distancia aproximada es la
+# euclídea sobre ese vector, que se obtiene con un producto de matrices
+# (|a|² + |b|² − 2·a·b).  Como el coste real es la suma de las dos normas
+# (ver `_pair_costs`), se piden SOBREMUESTREO·k candidatos aproximados y se
+# reordenan con el coste exacto.  Los pares que descarta el prefiltro de
+# tipo / longitud sólo entran si un lado tiene menos de k compatibles, y
+# entonces valen `pruned_cost`, como en el tensor de costes: un lado mal
+# clasificado aún puede encontrar a su vecino real.
+# ------------------------------------------------------------------------------
+
+from __future__ import annotations
+from typing import Tuple
+
+import numpy as np
+
+TOPK_DEFAULT  = 8
+SOBREMUESTREO = 2       # candidatos aproximados por cada uno que se conserva
+BLOQUE        = 1024    # lados consultados por bloque (memoria ≈ BLOQUE·4N·4 B)
+
+
+class EdgeIndex:
+    """
+    Top-k de lados compatibles con cada lado.  Los lados se numeran como en
+    el tensor de costes: `4·pieza + lado_original`.
+
+    `cost(i, j)` equivale a `cost_tensor.reshape(4N, 4N)[i, j]`: fila `i`
+    recorrida en sentido directo, columna `j` invertida.
+
+    Si se da `grupo` (etiqueta entera por fila), la lista se guarda por
+    separado para cada grupo: `vecinos[g, j]` son las `k` filas del grupo
+    `g` de menor coste para la columna `j` (−1 si hay menos de k
+    compatibles), ordenadas, y `costes[g, j]` sus costes exactos.  El solver
+    lo usa para no gastar candidatos en piezas de otra categoría.
+
+    `fiable` (por lado) marca los lados cuyo tipo y longitud pueden usarse
+    para descartar pares; los pares con un lado no fiable nunca se descartan.
+    """
+
+    def __init__(self, cu: np.ndarray, fd: np.ndarray,
+                 rcu: np.ndarray, rfd: np.ndarray,
+                 owner: np.ndarray, valid: np.ndarray,
+                 kind: np.ndarray | None = None,
+                 length: np.ndarray | None = None,
+                 grupo: np.ndarray | None = None,
+                 length_tol: float = 0.25,
+                 pruned_cost: float = 1e3,
+                 k: int = TOPK_DEFAULT,
+                 bloque: int = BLOQUE,
+                 fiable: np.ndarray | None = None):
+        self.cu, self.fd, self.rcu, self.rfd = cu, fd, rcu, rfd
+        self.owner, self.valid = owner, valid
+        self.kind, self.length = kind, length
+        self.fiable = np.ones(len(owner), bool) if fiable is None else np.asarray(fiable)
+        self.grupo = np.zeros(len(owner), np.intp) if grupo is None else np.asarray(grupo)
+        self.length_tol, self.pruned_cost = length_tol, pruned_cost
+        self.k = k
+        self._construir(bloque)
+
+    # ─────────── COSTE EXACTO ───────────
+    def _compatibles(self, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+        """Pares que pasan el prefiltro (saliente / entrante y longitud)."""
+        if self.kind is None:
+            return np.ones(np.broadcast(i, j).shape, bool)
+        li, lj = self.length[i], self.length[j]
+        return (((self.kind[i] * self.kind[j] == -1) &
+                 (np.abs(li - lj) <= self.length_tol * np.maximum(li, lj)))
+                | ~self.fiable[i] | ~self.fiable[j])
+
+    def cost(self, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+        """Coste exacto de los pares (i[t], j[t]) con la semántica del tensor."""
+        i, j = np.asarray(i, np.intp), np.asarray(j, np.intp)
+        dc, df = self.cu[i] - self.rcu[j], self.fd[i] - self.rfd[j]
+        out = np.sqrt((dc * dc).sum(-1)) + np.sqrt((df * df).sum(-1))
+        out = np.where(self._compatibles(i, j), out, self.pruned_cost)
+        cand = self.valid[i] & self.valid[j] & (self.owner[i] != self.owner[j])
+        return np.where(cand, out, np.inf).astype(np.float32)
+
+    # ─────────── CONSTRUCCIÓN ───────────
+    def _construir(self, bloque: int) -> None:
+        B = len(self.owner)
+        base = np.hstack([self.cu, self.fd]).astype(np.float32)
+        qry  = np.hstack([self.rcu, self.rfd]).astype(np.float32)
+        n_base = (base * base).sum(1)
+        G = int(self.grupo.max()) + 1 if B else 1
+
+        self.comparados = self.descartados = 0   # pares compatibles / fuera por prefiltro o pieza
+        self.vecinos = np.full((G, B, self.k), -1, np.intp)
+        self.costes  = np.full((G, B, self.k), np.inf, np.float32)
+        cols = np.flatnonzero(self.valid)
+        for g in range(G):
+            filas = np.flatnonzero((self.grupo == g) & self.valid)
+            if len(filas) and len(cols):
+                self._bloques(g, cols, filas, base, qry, n_base, bloque)
+
+    def _mejores(self, d: np.ndarray, filas: np.ndarray, j: np.ndarray,
+                 k_aprox: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Las k filas de menor coste exacto entre las `k_aprox` de menor
+        distancia aproximada `d` (inf = excluida), desempatando por `d`.
+        """
+        sel = np.argpartition(d, k_aprox - 1, axis=1)[:, :k_aprox]
+        da = np.take_along_axis(d, sel, 1)
+        o = np.argsort(da, axis=1, kind="stable")
+        sel, da = np.take_along_axis(sel, o, 1), np.take_along_axis(da, o, 1)
+        cand = filas[sel]
+        exacto = self.cost(cand, j[:, None])
+        exacto[~np.isfinite(da)] = np.inf
+        orden = np.argsort(exacto, axis=1, kind="stable")[:, :self.k]
+        c = np.take_along_axis(exacto, orden, 1)
+        v = np.take_along_axis(cand, orden, 1)
+        v[~np.isfinite(c)] = -1
+        return v, c
+
+    def _bloques(self, g: int, cols: np.ndarray, filas: np.ndarray,
+                 base: np.ndarray, qry: np.ndarray, n_base: np.ndarray,
+                 bloque: int) -> None:
+        """Top-k de las filas `filas` (grupo `g`) para cada columna de `cols`."""
+        R, nR, oR = base[filas].T.copy(), n_base[filas], self.owner[filas]
+        k_aprox = min(len(filas), SOBREMUESTREO * self.k)
+        for s in range(0, len(cols), bloque):
+            j = cols[s:s + bloque]
+            d = nR[None, :] - 2.0 * (qry[j] @ R)     # + |q|², constante por columna
+            propia = oR[None, :] == self.owner[j, None]
+            ok = self._compatibles(filas[None, :], j[:, None]) & ~propia
+            n_ok = int(ok.sum())
+            self.comparados += n_ok
+            self.descartados += d.size - n_ok
+
+            v, c = self._mejores(np.where(ok, d, np.inf), filas, j, k_aprox)
+            # menos de k compatibles: se completa con los descartados por el
+            # prefiltro (a `pruned_cost`), como en el tensor
+            falta = np.flatnonzero(~np.isfinite(c).all(1) | (c.shape[1] < self.k))
+            if len(falta):
+                d2 = np.where(ok | propia, np.inf, d)[falta]
+                v2, c2 = self._mejores(d2, filas, j[falta], min(len(filas), self.k))
+                vv, cc = np.hstack([v[falta], v2]), np.hstack([c[falta], c2])
+                orden = np.argsort(cc, axis=1, kind="stable")[:, :self.k]
+                self.vecinos[g, j[falta], :orden.shape[1]] = np.take_along_axis(vv, orden, 1)
+                self.costes[g, j[falta], :orden.shape[1]] = np.take_along_axis(cc, orden, 1)
+            resto = np.ones(len(j), bool)
+            resto[falta] = False
+            self.vecinos[g, j[resto], :v.shape[1]] = v[resto]
+            self.costes[g, j[resto], :c.shape[1]] = c[resto]
+
+    def candidatos(self, j: int, g: int = 0) -> np.ndarray:
+        """Filas (lados) del grupo `g` candidatas para la columna `j`, de mejor a peor."""
+        if g >= len(self.vecinos):
+            return np.empty(0, np.intp)
+        v = self.vecinos[g, j]
+        return v[v >= 0]
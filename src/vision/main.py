@@ -3,8 +3,8 @@
 main.py – Orquestador complet del pipeline de puzzling
 =====================================================
 
-Fluxe:
-    1) Segmentar → obté llista de PNG i centres (posicions inicials)
+Fluxe (tot en memòria, veure pipeline.py):
+    1) Segmentar → obté les peces i centres (posicions inicials)
     2) Normalitzar orientació
     3) Resoldre el puzzle (greedy borders)
     4) Combinar angles (normalització + solver)
@@ -12,19 +12,35 @@ Fluxe:
          • solution_greedy.json   → resultat complet (matriu, score, etc.)
          • piezas_info.json       → només {rotacions, pos_inicial}
 
+Amb --debug també es guarden les etapes intermèdies (out_piezas/, pieces/)
+i la imatge solution_greedy.png.
+
+La sortida de cada etapa es memoritza a .cache/stages/ indexada pel hash de
+la imatge i dels paràmetres: si només canvia un paràmetre del solver no es
+repeteixen segmentació ni normalització.  --no-cache la desactiva.
+
+Amb --profile es mesura cada etapa (temps de paret i de CPU, RSS, pic de
+memòria Python amb --profile-mem i comptadors: peces, comparacions fetes i
+descartades, …) i es guarda a profile.json; --chrome-trace escriu a més
+un fitxer d'esdeveniments per a chrome://tracing o Perfetto.  Sense
+--profile la instrumentació no fa res (veure profiler.py).
+
 Usage:
-    $ python main.py
+    $ python main.py [--debug] [--jobs N] [--pyramid 0.25] [--no-cache]
+                     [--profile [JSON]] [--profile-mem] [--chrome-trace FITXER]
 """
 from __future__ import annotations
 
+import argparse
 from pathlib import Path
 import json
+from contextlib import nullcontext
 from pprint import pformat
 
 # ─── Mòduls propis ───────────────────────────────────────────
-from segment_pieces import segmentar            # 1) Segmentar
-from normalize_pieces import normalizar         # 2) Normalitzar
-from solve_puzzle_borders import solve_greedy   # 3) Solver
+from pipeline import resultado_json, run_pipeline   # 1) 2) 3) 4) en memòria
+from profiler import Perfil
+from stage_cache import DEFAULT_CACHE_DIR as STAGE_CACHE_DIR
 
 # ─── Paths bàsics (relatius al mateix script) ───────────────
 BASE_DIR = Path(__file__).resolve().parent
@@ -34,60 +50,45 @@ NORM_DIR       = BASE_DIR / "pieces"
 SOLUTION_PNG   = BASE_DIR / "solution_greedy.png"
 FULL_JSON_PATH = BASE_DIR / "solution_greedy.json"   # JSON complet
 INFO_JSON_PATH = BASE_DIR / "piezas_info.json"       # JSON simplificat
-
-# Assegurem carpetes d'eixida
-SEG_DIR.mkdir(exist_ok=True)
-NORM_DIR.mkdir(exist_ok=True)
+PROFILE_JSON   = BASE_DIR / "profile.json"           # traça de --profile
 
 # ─────────────────────────────────────────────────────────────
 
-def main() -> None:
-    # 1) Segmentació ----------------------------------------------------
-    print("\n🧩 1. Segmentando piezas …")
-    rutas_png, posiciones = segmentar(str(IN_IMG), str(SEG_DIR))
+def main(debug: bool = False, jobs: int = 1, pyramid: float | None = None,
+         use_cache: bool = True, profile: str | Path | None = None,
+         profile_mem: bool = False, chrome_trace: str | Path | None = None) -> None:
+    # 0) Instrumentació (només amb --profile) ----------------------------
+    perfil = Perfil(memoria=profile_mem) if profile or chrome_trace else None
+
+    # 1) 2) 3) 4) Pipeline en memòria -----------------------------------
+    print("\n🧩 1-3. Segmentando, normalizando y resolviendo …")
+    with perfil.activar() if perfil else nullcontext():
+        res = run_pipeline(IN_IMG,
+                           seg_dir=SEG_DIR if debug else None,
+                           norm_dir=NORM_DIR if debug else None,
+                           solution_png=SOLUTION_PNG if debug else None,
+                           norm_workers=jobs,
+                           seg_pyramid=pyramid,
+                           stage_cache_dir=STAGE_CACHE_DIR if use_cache else None)
+    posiciones = res["positions"]
+    total_rot  = res["rotations_total"]
     print("   Posiciones (centros) de las piezas:")
     print(pformat(posiciones, indent=4))
 
-    # 2) Normalització --------------------------------------------------
-    print("\n🔄 2. Normalizando orientación …")
-    rot_norm = normalizar(str(SEG_DIR), str(NORM_DIR))  # {filename: angle}
-
-    # 3) Solver ---------------------------------------------------------
-    print("\n🤖 3. Resolviendo puzzle Greedy …")
-    matrix, score, idx2name = solve_greedy(str(NORM_DIR))  # idx2name: idx→filename
-
-    # 4) Combinar angles ------------------------------------------------
-    total_rot: dict[str, float] = {}
-    for row in matrix:
-        for idx, rot_greedy in row:
-            fname = idx2name[idx]
-            ang_norm = rot_norm.get(fname, 0.0)
-            total_rot[fname] = (ang_norm + rot_greedy) % 360
-
     # 4.1) Construir diccionaris sol·licitats ---------------------------
-    #    rotacions:    {id: rot_total °}
-    #    pos_inicial:  {id: (xc, yc)}  (ja està com 'posiciones')
-    rotacions: dict[int, float] = {idx: total_rot[idx2name[idx]] for idx in idx2name}
-    pos_inicial: dict[int, tuple[int, int]] = posiciones  # ja en format id→(x,y)
+    #    complet:  matriu, posicions, rotacions i score
+    #    info:     rotacions {id: rot_total °} i pos_inicial {id: (xc, yc)}
+    complet, info = resultado_json(res)
 
     # 5) Guardar JSON complet ------------------------------------------
     print(f"\n💾  Guardando matriz, posiciones y rotaciones en {FULL_JSON_PATH}")
     with FULL_JSON_PATH.open('w') as f:
-        json.dump({
-            "matrix": matrix,
-            "positions": posiciones,
-            "rotations_normalize": rot_norm,
-            "rotations_total": total_rot,
-            "score": score,
-        }, f, indent=2)
+        json.dump(complet, f, indent=2)
 
     # 5.1) Guardar JSON simplificat ------------------------------------
     print(f"💾  Guardando rotacions i posicions inicials en {INFO_JSON_PATH}")
     with INFO_JSON_PATH.open('w') as f:
-        json.dump({
-            "rotacions": rotacions,
-            "pos_inicial": pos_inicial,
-        }, f, indent=2)
+        json.dump(info, f, indent=2)
 
     # Resum per consola -------------------------------------------------
     print("\n✅  Proceso terminado.")
@@ -95,6 +96,53 @@ def main() -> None:
     for k in sorted(total_rot):
         print(f"   • {k:<20} → {total_rot[k]:6.2f}°")
 
+    t = res["timings"]
+    print("\n⏱️  Latencia imagen → piezas_info.json: "
+          f"{t['total'] * 1000:.1f} ms  (" +
+          ", ".join(f"{k} {v * 1000:.1f}" for k, v in t.items() if k != "total") +
+          ")")
+
+    tn = res["normalize_timings"]
+    if tn:
+        lento = max(tn, key=tn.get)
+        print(f"⏱️  Normalización: {len(tn)} piezas · suma {sum(tn.values()) * 1000:.1f} ms · "
+              f"media {sum(tn.values()) / len(tn) * 1000:.1f} ms · "
+              f"máx {tn[lento] * 1000:.1f} ms ({lento})")
+
+    sc = res["stage_cache"]
+    if sc is not None:
+        etapes = ", ".join(f"{k} {sc[k]}" for k in ("segment", "normalize", "solve") if k in sc)
+        print(f"🗄️  Caché de etapas: {sc['hits']} aciertos, {sc['misses']} fallos"
+              f"  ({etapes or 'sin consultas'})")
+
+    # Perfil per etapes -------------------------------------------------
+    if perfil is not None:
+        print("\n🔬 Perfil por etapas:")
+        print(perfil.resumen())
+        if profile:
+            perfil.guardar(profile)
+            print(f"💾  Traza del perfil en {profile}")
+        if chrome_trace:
+            perfil.guardar_chrome(chrome_trace)
+            print(f"💾  Traza para chrome://tracing en {chrome_trace}")
+
 
 if __name__ == "__main__":
-    main()
+    ap = argparse.ArgumentParser(description="Pipeline complet de visió de puzzleBot")
+    ap.add_argument("--debug", action="store_true",
+                    help="Guardar out_piezas/, pieces/ i solution_greedy.png")
+    ap.add_argument("-j", "--jobs", type=int, default=1,
+                    help="Peces a normalitzar en paral·lel (0 = tots els nuclis)")
+    ap.add_argument("--pyramid", type=float, default=None, metavar="ESCALA",
+                    help="Segmentar sobre la imatge reduïda per ESCALA i refinar per ROI")
+    ap.add_argument("--no-cache", action="store_true",
+                    help="No llegir ni escriure la memòria cau d'etapes")
+    ap.add_argument("--profile", nargs="?", const=PROFILE_JSON, default=None, metavar="JSON",
+                    help=f"Mesurar cada etapa i guardar la traça (per defecte {PROFILE_JSON.name})")
+    ap.add_argument("--profile-mem", action="store_true",
+                    help="Amb --profile, pic de memòria Python per etapa (tracemalloc, més lent)")
+    ap.add_argument("--chrome-trace", default=None, metavar="FITXER",
+                    help="Guardar també la traça en format d'esdeveniments de Chrome")
+    args = ap.parse_args()
+    main(args.debug, args.jobs, args.pyramid, not args.no_cache,
+         args.profile, args.profile_mem, args.chrome_trace)
@@ -7,15 +7,23 @@
 # funcionamiento por línea de comandos.
 #
 # Uso CLI:
-#   python normalize_pieces.py -i out_piezas -o pieces
+#   python normalize_pieces.py -i out_piezas -o pieces [--jobs 4]
 #
 # La función normalizar() devuelve un dict {nombre_png: angulo_aplicado}
+# `normalizar_piezas()` hace lo mismo en memoria sobre {nombre: imagen}.
+#
+# La orientación se calcula sólo sobre el contorno (`orientar`); los píxeles
+# se generan con un único warpAffine limitado al recorte de la pieza, que
+# puede incluir también el giro de 90° del solver (`PiezaOrientada.render`).
 
 from __future__ import annotations
 import os
 import glob
+import time
 import argparse
 import json
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, Tuple
 
@@ -24,11 +32,66 @@ import numpy as np
 
 
 # ────────────────────────────────────────────────
-def normalize_image(img: np.ndarray) -> Tuple[np.ndarray, float]:
+MARGEN_PX = 2          # píxeles de contexto alrededor del recorte (interpolación)
+
+def _rot90_affine(w: int, h: int, k: int) -> Tuple[np.ndarray, int, int]:
+    """Matriz 3×3 equivalente a `np.rot90(img, k)` sobre una imagen w×h."""
+    A = np.eye(3)
+    for _ in range(k % 4):
+        A = np.array([[0.0, 1.0, 0.0], [-1.0, 0.0, w - 1.0], [0.0, 0.0, 1.0]]) @ A
+        w, h = h, w
+    return A, w, h
+
+
+@dataclass
+class PiezaOrientada:
     """
-    Rota la pieza para alinearla verticalmente (múltiplos de 90°) y recorta
-    la zona transparente sobrante.
-    Devuelve (imagen_normalizada, ángulo_aplicado_en_grados).
+    Pieza normalizada de forma diferida: la orientación se calcula sólo con
+    el contorno y los píxeles no se tocan hasta que alguien llama a
+    `render()`, que aplica en un único warpAffine la rotación de
+    normalización, el giro de 90° del solver y el escalado, leyendo sólo
+    el recorte de la pieza.
+    """
+    bgr:     np.ndarray    # recorte BGR de la imagen original (vista, sin copia)
+    alpha:   np.ndarray    # recorte del canal alfa
+    M:       np.ndarray    # 3×3: recorte original → pieza normalizada
+    size:    Tuple[int, int]  # (ancho, alto) de la pieza normalizada
+    angle:   float
+    contour: np.ndarray    # contorno N×2 int32 en coordenadas normalizadas
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        return self.size[1], self.size[0], 4
+
+    def fingerprint(self) -> bytes:
+        """Bytes que identifican la pieza (para claves de caché)."""
+        return (np.ascontiguousarray(self.bgr).tobytes()
+                + np.ascontiguousarray(self.alpha).tobytes() + self.M.tobytes())
+
+    def render(self, rot: int = 0, scale: float = 1.0) -> np.ndarray:
+        """Imagen BGRA girada `rot` grados (como `np.rot90`) y escalada."""
+        R, w, h = _rot90_affine(*self.size, rot // 90)
+        A = R @ self.M
+        if scale != 1.0:
+            ws, hs = max(1, round(w * scale)), max(1, round(h * scale))
+            sx, sy = ws / w, hs / h                 # centros de píxel como cv2.resize
+            A = np.array([[sx, 0.0, 0.5 * sx - 0.5],
+                          [0.0, sy, 0.5 * sy - 0.5],
+                          [0.0, 0.0, 1.0]]) @ A
+            w, h = ws, hs
+        interp = cv2.INTER_CUBIC if scale >= 1.0 else cv2.INTER_LINEAR
+        bgr = cv2.warpAffine(self.bgr, A[:2], (w, h), flags=interp,
+                             borderValue=(255, 255, 255))
+        alpha = cv2.warpAffine(self.alpha, A[:2], (w, h), flags=cv2.INTER_NEAREST,
+                               borderValue=0)
+        return cv2.merge([bgr, alpha])
+
+
+def orientar(img: np.ndarray) -> PiezaOrientada | None:
+    """
+    Calcula la orientación de la pieza sólo a partir de su contorno
+    (minAreaRect) y la transformación recorte → pieza normalizada, sin
+    rotar ningún píxel.  Devuelve None si la imagen no tiene pieza.
     """
     # — separar canal alfa —
     if img.shape[2] == 4:
@@ -39,9 +102,9 @@ def normalize_image(img: np.ndarray) -> Tuple[np.ndarray, float]:
 
     # — máscara binaria —
     _, mask = cv2.threshold(alpha, 10, 255, cv2.THRESH_BINARY)
-    cnts, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    cnts, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
     if not cnts:
-        return img, 0.0
+        return None
 
     cnt = max(cnts, key=cv2.contourArea)
     rect = cv2.minAreaRect(cnt)
@@ -51,64 +114,130 @@ def normalize_image(img: np.ndarray) -> Tuple[np.ndarray, float]:
     if rect[1][0] < rect[1][1]:
         angle += 90
 
-    # — evitar recortes durante la rotación —
-    h, w = bgr.shape[:2]
-    diag = int(np.sqrt(h**2 + w**2))
-    pad_y, pad_x = (diag - h) // 2, (diag - w) // 2
-    bgr_pad = cv2.copyMakeBorder(bgr, pad_y, pad_y, pad_x, pad_x,
-                                 cv2.BORDER_CONSTANT, value=(255, 255, 255))
-    alpha_pad = cv2.copyMakeBorder(alpha, pad_y, pad_y, pad_x, pad_x,
-                                   cv2.BORDER_CONSTANT, value=0)
-
-    # — rotar —
-    center = (bgr_pad.shape[1] // 2, bgr_pad.shape[0] // 2)
-    M = cv2.getRotationMatrix2D(center, angle, 1.0)
-    bgr_rot = cv2.warpAffine(bgr_pad, M, (bgr_pad.shape[1], bgr_pad.shape[0]),
-                             flags=cv2.INTER_CUBIC, borderValue=(255, 255, 255))
-    alpha_rot = cv2.warpAffine(alpha_pad, M, (alpha_pad.shape[1], alpha_pad.shape[0]),
-                               flags=cv2.INTER_NEAREST, borderValue=0)
-
-    # — recortar a la pieza —
-    ys, xs = np.where(alpha_rot > 10)
-    if ys.size == 0 or xs.size == 0:
-        merged = cv2.merge([bgr_rot, alpha_rot])
-    else:
-        y0, y1, x0, x1 = ys.min(), ys.max(), xs.min(), xs.max()
-        merged = cv2.merge([bgr_rot[y0:y1+1, x0:x1+1],
-                            alpha_rot[y0:y1+1, x0:x1+1]])
+    # — recorte de la región de la pieza —
+    x, y, w, h = cv2.boundingRect(cnt)
+    x0, y0 = max(0, x - MARGEN_PX), max(0, y - MARGEN_PX)
+    x1 = min(img.shape[1], x + w + MARGEN_PX)
+    y1 = min(img.shape[0], y + h + MARGEN_PX)
+    pts = cnt[:, 0, :].astype(np.float64) - (x0, y0)
+
+    # — rotar el contorno y ajustar el origen a su caja —
+    M = np.vstack([cv2.getRotationMatrix2D(((x1 - x0) / 2, (y1 - y0) / 2), angle, 1.0),
+                   [0.0, 0.0, 1.0]])
+    rot = pts @ M[:2, :2].T + M[:2, 2]
+    lo, hi = np.round(rot.min(0)), np.round(rot.max(0))
+    M[:2, 2] -= lo
+    size = (int(hi[0] - lo[0]) + 1, int(hi[1] - lo[1]) + 1)
 
-    return merged, angle
+    # — contorno normalizado: sólo se deforma el alfa del recorte (1 canal,
+    #   vecino más próximo), igual que lo vería el solver sobre la imagen —
+    a = cv2.warpAffine(alpha[y0:y1, x0:x1], M[:2], size, flags=cv2.INTER_NEAREST,
+                       borderValue=0)
+    cnts, _ = cv2.findContours((a > 0).astype(np.uint8), cv2.RETR_EXTERNAL,
+                               cv2.CHAIN_APPROX_NONE)
+    contour = cnts[0][:, 0, :] if cnts else np.empty((0, 2), np.int32)
+
+    return PiezaOrientada(bgr[y0:y1, x0:x1], alpha[y0:y1, x0:x1], M, size,
+                          float(angle), contour)
+
+
+def normalize_image(img: np.ndarray) -> Tuple[np.ndarray, float]:
+    """
+    Rota la pieza para alinearla verticalmente (múltiplos de 90°) y recorta
+    la zona transparente sobrante.
+    Devuelve (imagen_normalizada, ángulo_aplicado_en_grados).
+    """
+    pieza = orientar(img)
+    if pieza is None:
+        return img, 0.0
+    return pieza.render(), pieza.angle
 
 
 # ────────────────────────────────────────────────
-def normalizar(in_dir: str = "out_piezas", out_dir: str = "pieces") -> Dict[str, float]:
+def _map(fn, items, workers: int):
+    """map() en orden; con workers != 1 usa un pool de hilos (0 = todos los núcleos)."""
+    if workers == 1:
+        return list(map(fn, items))
+    with ThreadPoolExecutor(workers or os.cpu_count()) as ex:
+        return list(ex.map(fn, items))
+
+
+def _normalize_timed(img: np.ndarray, lazy: bool = False):
+    t0 = time.perf_counter()
+    pieza = orientar(img) if lazy else None
+    if pieza is not None:
+        norm, ang = pieza, pieza.angle
+    else:
+        norm, ang = normalize_image(img)
+    return norm, ang, time.perf_counter() - t0
+
+
+def normalizar_piezas(piezas: Dict[str, np.ndarray], workers: int = 1,
+                      timings: Dict[str, float] | None = None,
+                      lazy: bool = False
+                      ) -> Tuple[Dict[str, np.ndarray | PiezaOrientada], Dict[str, float]]:
+    """
+    Normaliza en memoria las piezas {nombre: imagen RGBA}.
+    Devuelve ({nombre: imagen_normalizada}, {nombre: ángulo_aplicado}) en el
+    mismo orden de entrada.  Las piezas son independientes: con `workers`
+    distinto de 1 se normalizan en paralelo (OpenCV libera el GIL).  Si se
+    pasa `timings`, se rellena con los segundos de cada pieza.  Con `lazy`
+    se devuelven `PiezaOrientada` (sólo contorno y transformación) en lugar
+    de imágenes rotadas.
+    """
+    normalizadas: Dict[str, np.ndarray | PiezaOrientada] = {}
+    rotaciones: Dict[str, float] = {}
+    fn = (lambda img: _normalize_timed(img, True)) if lazy else _normalize_timed
+    for nombre, (norm, ang, dt) in zip(piezas, _map(fn, piezas.values(), workers)):
+        normalizadas[nombre], rotaciones[nombre] = norm, ang
+        if timings is not None:
+            timings[nombre] = dt
+    return normalizadas, rotaciones
+
+
+def normalizar(in_dir: str = "out_piezas", out_dir: str = "pieces",
+               workers: int = 1) -> Dict[str, float]:
     """
     Normaliza todas las PNG de `in_dir` y las guarda en `out_dir`.
-    Devuelve un dict {nombre_archivo: ángulo_aplicado}.
+    Devuelve un dict {nombre_archivo: ángulo_aplicado}.  Con `workers`
+    distinto de 1 cada pieza (lectura, rotación y escritura) se procesa en
+    un pool de hilos; el orden del resultado no cambia.
     """
     in_path = Path(in_dir)
     out_path = Path(out_dir)
     out_path.mkdir(exist_ok=True)
 
-    rotaciones: Dict[str, float] = {}
-
-    for fichero in sorted(glob.glob(str(in_path / "*.png"))):
+    def procesar(fichero: str):
+        t0 = time.perf_counter()
         img = cv2.imread(fichero, cv2.IMREAD_UNCHANGED)
         if img is None:
+            return None
+        norm, ang = normalize_image(img)
+        destino = out_path / os.path.basename(fichero)
+        cv2.imwrite(str(destino), norm)
+        return ang, destino, time.perf_counter() - t0
+
+    ficheros = sorted(glob.glob(str(in_path / "*.png")))
+    rotaciones: Dict[str, float] = {}
+    tiempos: Dict[str, float] = {}
+    for fichero, res in zip(ficheros, _map(procesar, ficheros, workers)):
+        if res is None:
             print(f"⚠️  No se pudo leer {fichero}")
             continue
-
-        norm, ang = normalize_image(img)
+        ang, destino, dt = res
         nombre = os.path.basename(fichero)
-        destino = out_path / nombre
-        cv2.imwrite(str(destino), norm)
-        rotaciones[nombre] = ang
-        print(f"✔︎ {nombre:20} → rot {ang:6.2f}°   guardado en {destino}")
+        rotaciones[nombre], tiempos[nombre] = ang, dt
+        print(f"✔︎ {nombre:20} → rot {ang:6.2f}°   guardado en {destino}   ({dt * 1000:.1f} ms)")
 
     # Resumen
     print("\nResumen de rotaciones:")
     for n, a in rotaciones.items():
         print(f"  · {n:<20} {a:6.2f}°")
+    if tiempos:
+        lento = max(tiempos, key=tiempos.get)
+        print(f"\n⏱️  {len(tiempos)} piezas · suma {sum(tiempos.values()) * 1000:.1f} ms · "
+              f"media {np.mean(list(tiempos.values())) * 1000:.1f} ms · "
+              f"máx {tiempos[lento] * 1000:.1f} ms ({lento})")
 
     return rotaciones
 
@@ -124,12 +253,14 @@ def _parse_args():
                    help="Carpeta donde guardar las piezas normalizadas")
     p.add_argument("--save-json", action="store_true",
                    help="Guardar fichero rotations.json con los ángulos")
+    p.add_argument("-j", "--jobs", type=int, default=1,
+                   help="Piezas a normalizar en paralelo (0 = todos los núcleos)")
     return p.parse_args()
 
 
 if __name__ == "__main__":
     args = _parse_args()
-    rot = normalizar(args.input, args.output)
+    rot = normalizar(args.input, args.output, args.jobs)
 
     if args.save_json:
         json_path = Path(args.output) / "rotations.json"
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# pipeline.py
+#
+# Pipeline de visión en memoria: segmentar → normalizar → resolver sin pasar
+# por PNG intermedios.  Las piezas (RGBA, la máscara va en el canal alfa) y
+# los centros se entregan entre etapas como arrays; sólo se escribe en disco
+# si se piden las carpetas de depuración.  La normalización es diferida: el
+# solver trabaja con el contorno orientado y los píxeles sólo se rotan (una
+# vez, junto con el giro del solver) si se pide la imagen del ensamblado.
+#
+# Uso:
+#   from pipeline import run_pipeline
+#   res = run_pipeline("in/puzzle_con_piezas.png")
+#   res["matrix"], res["score"], res["rotations_total"], res["timings"]
+# ------------------------------------------------------------------------------
+
+from __future__ import annotations
+import time
+from pathlib import Path
+from typing import Dict, Tuple
+
+import cv2
+import numpy as np
+
+import profiler
+from segment_pieces import segmentar_imagen
+from normalize_pieces import PiezaOrientada, normalizar_piezas
+from solve_puzzle_borders import solve_greedy
+from stage_cache import StageCache
+
+
+def _dump(piezas: Dict[str, np.ndarray | PiezaOrientada], out_dir: Path) -> None:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for nombre, img in piezas.items():
+        if isinstance(img, PiezaOrientada):
+            img = img.render()
+        cv2.imwrite(str(out_dir / nombre), img)
+
+
+def run_pipeline(img: str | Path | np.ndarray,
+                 seg_dir: str | Path | None = None,
+                 norm_dir: str | Path | None = None,
+                 solution_png: str | Path | None = None,
+                 norm_workers: int = 1,
+                 seg_pyramid: float | None = None,
+                 stage_cache_dir: str | Path | None = None,
+                 **solver_kw) -> dict:
+    """
+    Ejecuta el pipeline completo sobre `img` (ruta o imagen BGR ya cargada).
+
+    `seg_dir`, `norm_dir` y `solution_png` son opcionales: si se indican se
+    guardan ahí las piezas segmentadas, las normalizadas y el ensamblado.
+    `norm_workers` normaliza las piezas en paralelo, `seg_pyramid` activa la
+    segmentación piramidal con esa escala y `solver_kw` se pasa tal cual a
+    `solve_greedy` (strategy, workers, …).
+
+    Con `stage_cache_dir` la salida de cada etapa se guarda en una
+    `StageCache` indexada por el hash de sus entradas y parámetros: si sólo
+    cambia un parámetro del solver, segmentación y normalización no se
+    repiten (ni se lee la imagen si el resultado final ya está en caché).
+
+    Devuelve un dict con matrix, score, positions, rotations_normalize,
+    rotations_total, idx2name, solver_stats, timings (segundos por etapa),
+    normalize_timings (segundos por pieza) y stage_cache (aciertos, fallos
+    y estado de cada etapa, o None sin caché).
+    """
+    timings: Dict[str, float] = {}
+    t_start = t0 = time.perf_counter()
+    solver_kw.setdefault("render", "full" if solution_png else "none")
+    store = StageCache(stage_cache_dir) if stage_cache_dir is not None else None
+    hechas: Dict[str, object] = {}
+    data: bytes | None = None                   # bytes del fichero, si ya se han leído
+
+    # Claves de etapa: dependen sólo de las entradas y los parámetros, así
+    # que se calculan antes de ejecutar nada.
+    keys: Dict[str, str | None] = {"segment": None, "normalize": None, "solve": None}
+    if store:
+        with profiler.etapa("hash"):
+            if isinstance(img, np.ndarray):
+                data = f"{img.shape}{img.dtype}".encode() + np.ascontiguousarray(img).tobytes()
+            else:
+                data = Path(img).read_bytes()
+            keys["segment"] = store.key("segment", data, {"pyramid": seg_pyramid})
+            keys["normalize"] = store.key("normalize", keys["segment"])
+            # con imagen de salida el solver siempre se ejecuta (hay que pintarla)
+            if solution_png is None:
+                keys["solve"] = store.key("solve", keys["normalize"],
+                                          {k: v for k, v in solver_kw.items() if k != "cache_dir"})
+        timings["hash"] = time.perf_counter() - t0
+
+    def etapa(nombre: str, calcular, *deps):
+        """Devuelve la salida de la etapa: de memoria, de la caché o calculada."""
+        if nombre in hechas:
+            return hechas[nombre]
+        t0 = time.perf_counter()
+        valor = None
+        if store and keys[nombre]:
+            with profiler.etapa("stage_cache.get", etapa=nombre):
+                valor = store.get(nombre, keys[nombre])
+        if valor is None:
+            args = [d() for d in deps]              # etapas previas, fuera del tiempo
+            t0 = time.perf_counter()
+            with profiler.etapa(nombre):
+                valor = calcular(*args)
+            if store and keys[nombre]:
+                with profiler.etapa("stage_cache.put", etapa=nombre):
+                    store.put(keys[nombre], valor)
+        timings[nombre] = time.perf_counter() - t0
+        hechas[nombre] = valor
+        return valor
+
+    def cargar():
+        if isinstance(img, np.ndarray):
+            return img
+        t0 = time.perf_counter()
+        with profiler.etapa("load"):
+            if data:                            # ya leídos para el hash: sólo decodificar
+                im = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED)
+            else:
+                im = cv2.imread(str(img), cv2.IMREAD_UNCHANGED)
+        if im is None:
+            raise FileNotFoundError(f"No se pudo leer la imagen: {img}")
+        timings["load"] = time.perf_counter() - t0
+        return im
+
+    # 1) Segmentación ----------------------------------------------------
+    def segmentar(im):
+        piezas, posiciones = segmentar_imagen(im, seg_pyramid)
+        profiler.contar("pieces", len(piezas))
+        # mismo orden que `sorted(glob(...))` sobre los PNG que se escribían antes
+        return dict(sorted((f"piece_{i}.png", p) for i, p in enumerate(piezas))), posiciones
+
+    seg_stage = lambda: etapa("segment", segmentar, cargar)
+
+    # 2) Normalización ---------------------------------------------------
+    def normalizar(seg_out):
+        seg, posiciones = seg_out
+        norm_timings: Dict[str, float] = {}
+        norm, rot_norm = normalizar_piezas(seg, norm_workers, norm_timings, lazy=True)
+        profiler.contar("pieces_normalized", len(norm))
+        return norm, rot_norm, posiciones, norm_timings
+
+    norm_stage = lambda: etapa("normalize", normalizar, seg_stage)
+
+    # 3) Solver ----------------------------------------------------------
+    def resolver(norm_out):
+        norm, rot_norm, posiciones, norm_timings = norm_out
+        solver_stats: dict = {}
+        matrix, score, idx2name = solve_greedy(norm, solution_png or "solution_greedy.png",
+                                               stats=solver_stats, **solver_kw)
+        return matrix, score, idx2name, solver_stats, rot_norm, posiciones, norm_timings
+
+    (matrix, score, idx2name, solver_stats,
+     rot_norm, posiciones, norm_timings) = etapa("solve", resolver, norm_stage)
+
+    # 4) Combinar angles -------------------------------------------------
+    total_rot: Dict[str, float] = {}
+    for row in matrix:
+        for idx, rot_greedy in row:
+            fname = idx2name[idx]
+            total_rot[fname] = (rot_norm.get(fname, 0.0) + rot_greedy) % 360
+
+    # Depuración: volcar etapas intermedias ------------------------------
+    if seg_dir is not None:
+        seg, _ = seg_stage()
+    if norm_dir is not None:
+        norm = norm_stage()[0]
+    if seg_dir is not None or norm_dir is not None:
+        t0 = time.perf_counter()
+        with profiler.etapa("debug_dump"):
+            if seg_dir is not None:
+                _dump(seg, Path(seg_dir))
+            if norm_dir is not None:
+                _dump(norm, Path(norm_dir))
+        timings["debug_dump"] = time.perf_counter() - t0
+
+    timings["total"] = time.perf_counter() - t_start
+    return {
+        "matrix": matrix,
+        "score": score,
+        "positions": posiciones,
+        "rotations_normalize": rot_norm,
+        "rotations_total": total_rot,
+        "idx2name": idx2name,
+        "solver_stats": solver_stats,
+        "timings": timings,
+        "normalize_timings": norm_timings,
+        "stage_cache": ({"hits": store.hits, "misses": store.misses, **store.estado}
+                        if store else None),
+    }
+
+
+def resultado_json(res: dict) -> Tuple[dict, dict]:
+    """
+    Los dos JSON que escribe main.py a partir de la salida de `run_pipeline`:
+    (solution_greedy.json completo, piezas_info.json simplificado).
+    """
+    total_rot, idx2name = res["rotations_total"], res["idx2name"]
+    completo = {
+        "matrix": res["matrix"],
+        "positions": res["positions"],
+        "rotations_normalize": res["rotations_normalize"],
+        "rotations_total": total_rot,
+        "score": res["score"],
+    }
+    info = {
+        "rotacions": {idx: total_rot[idx2name[idx]] for idx in idx2name},
+        "pos_inicial": res["positions"],
+    }
+    return completo, info
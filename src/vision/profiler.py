@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# profiler.py
+#
+# Instrumentación por etapas del pipeline de visión.  Los módulos marcan sus
+# etapas con `with profiler.etapa("solver"):` y sus contadores con
+# `profiler.contar("comparisons", n)`; si no hay ningún `Perfil` activo,
+# `etapa` devuelve un contexto nulo compartido y `contar` retorna en seguida,
+# así que el coste con el perfil apagado es una consulta a una global.
+#
+# Por etapa se guarda: tiempo de pared y de CPU, RSS al salir y su pico
+# (getrusage), pico del heap de Python (tracemalloc, sólo con `memoria`)
+# y los contadores que se registren dentro.  Las etapas se anidan; los
+# contadores se acumulan en la etapa más interna y en el total.
+#
+# Salidas: JSON propio (`guardar`) y, opcionalmente, el formato de eventos
+# de Chrome (`guardar_chrome`, se abre en chrome://tracing o Perfetto).
+# Lo que ocurra en procesos hijos (normalización / solver en paralelo con
+# procesos) sólo cuenta como tiempo de pared de la etapa que los lanza.
+#
+# Uso:
+#   perfil = Perfil(memoria=True)
+#   with perfil.activar():
+#       run_pipeline(...)
+#   perfil.guardar("profile.json"); perfil.guardar_chrome("trace.json")
+# ------------------------------------------------------------------------------
+
+from __future__ import annotations
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import List
+
+try:
+    import resource
+except ImportError:                 # Windows: sin getrusage
+    resource = None
+
+_ACTIVO: "Perfil | None" = None
+_NULO = contextlib.nullcontext()
+
+
+def _rss_mb() -> float | None:
+    """RSS actual del proceso en MB (Linux: /proc/self/statm)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _rss_pico_mb() -> float | None:
+    """Pico de RSS del proceso desde su inicio, en MB."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 2**20 if sys.platform == "darwin" else pico / 2**10   # bytes / KB
+
+
+class Perfil:
+    """
+    Registro de etapas y contadores de una ejecución.  Con `memoria` se
+    activa tracemalloc mientras el perfil está activo (más lento: sólo
+    para mirar la memoria, no los tiempos).
+    """
+
+    def __init__(self, memoria: bool = False):
+        self.memoria = memoria
+        self.etapas: List[dict] = []
+        self.contadores: Counter = Counter()
+        self._pila: List[dict] = []
+        self._t0 = time.perf_counter()
+
+    # ─────────── ACTIVACIÓN ───────────
+    @contextlib.contextmanager
+    def activar(self):
+        """Hace de este perfil el destino de `etapa` y `contar` del módulo."""
+        global _ACTIVO
+        previo, _ACTIVO = _ACTIVO, self
+        propio = self.memoria and not tracemalloc.is_tracing()
+        if propio:
+            tracemalloc.start()
+        self._t0 = time.perf_counter()
+        try:
+            yield self
+        finally:
+            if propio:
+                tracemalloc.stop()
+            _ACTIVO = previo
+
+    # ─────────── ETAPAS ───────────
+    @contextlib.contextmanager
+    def etapa(self, nombre: str, **args):
+        mem = self.memoria and tracemalloc.is_tracing()
+        if mem:
+            if self._pila:          # el pico del padre hasta aquí no se pierde
+                padre = self._pila[-1]
+                padre["py_peak"] = max(padre["py_peak"], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        reg = {"name": nombre, "parent": self._pila[-1]["name"] if self._pila else None,
+               "depth": len(self._pila), "args": args, "counts": Counter(),
+               "tid": threading.get_ident(), "py_peak": 0,
+               "rss_peak_start_mb": _rss_pico_mb()}
+        self._pila.append(reg)
+        c0, t0 = time.process_time(), time.perf_counter()
+        try:
+            yield reg
+        finally:
+            t1, c1 = time.perf_counter(), time.process_time()
+            self._pila.pop()
+            reg.update(start_s=t0 - self._t0, wall_s=t1 - t0, cpu_s=c1 - c0,
+                       rss_mb=_rss_mb(), rss_peak_mb=_rss_pico_mb())
+            if mem:
+                reg["py_peak"] = max(reg["py_peak"], tracemalloc.get_traced_memory()[1])
+                reg["py_peak_mb"] = reg["py_peak"] / 2**20
+                if self._pila:
+                    padre = self._pila[-1]
+                    padre["py_peak"] = max(padre["py_peak"], reg["py_peak"])
+            del reg["py_peak"]
+            self.etapas.append(reg)
+
+    def contar(self, nombre: str, n: int = 1) -> None:
+        self.contadores[nombre] += n
+        if self._pila:
+            self._pila[-1]["counts"][nombre] += n
+
+    # ─────────── SALIDAS ───────────
+    def a_dict(self) -> dict:
+        etapas = sorted(self.etapas, key=lambda e: e["start_s"])
+        return {
+            "meta": {"python": sys.version.split()[0], "pid": os.getpid(),
+                     "tracemalloc": self.memoria,
+                     "fecha": time.strftime("%Y-%m-%d %H:%M:%S")},
+            "total_s": time.perf_counter() - self._t0,
+            "rss_peak_mb": _rss_pico_mb(),
+            "counts": dict(self.contadores),
+            "stages": [{k: (dict(v) if k == "counts" else v) for k, v in e.items()
+                        if k not in ("tid", "rss_peak_start_mb")} |
+                       {"rss_peak_growth_mb": (e["rss_peak_mb"] - e["rss_peak_start_mb"]
+                                               if e["rss_peak_mb"] is not None else None)}
+                       for e in etapas],
+        }
+
+    def guardar(self, path: str | Path) -> None:
+        Path(path).write_text(json.dumps(self.a_dict(), indent=2))
+
+    def chrome_trace(self) -> dict:
+        """Eventos completos ("X") por etapa y un contador de RSS al cerrar cada una."""
+        pid, eventos = os.getpid(), []
+        for e in sorted(self.etapas, key=lambda e: e["start_s"]):
+            args = {**e["args"], **e["counts"], "cpu_ms": e["cpu_s"] * 1e3}
+            if "py_peak_mb" in e:
+                args["py_peak_mb"] = e["py_peak_mb"]
+            eventos.append({"name": e["name"], "cat": "vision", "ph": "X",
+                            "ts": e["start_s"] * 1e6, "dur": e["wall_s"] * 1e6,
+                            "pid": pid, "tid": e["tid"], "args": args})
+            if e["rss_mb"] is not None:
+                eventos.append({"name": "rss_mb", "ph": "C", "pid": pid,
+                                "ts": (e["start_s"] + e["wall_s"]) * 1e6,
+                                "args": {"rss": e["rss_mb"]}})
+        return {"traceEvents": eventos, "displayTimeUnit": "ms"}
+
+    def guardar_chrome(self, path: str | Path) -> None:
+        Path(path).write_text(json.dumps(self.chrome_trace()))
+
+    def resumen(self) -> str:
+        """Tabla de etapas (indentadas por anidamiento) y contadores."""
+        filas = [f"   {'etapa':<28}{'pared ms':>10}{'CPU ms':>10}{'RSS MB':>9}"
+                 + (f"{'py pico MB':>12}" if self.memoria else "")]
+        for e in sorted(self.etapas, key=lambda e: e["start_s"]):
+            rss = f"{e['rss_mb']:9.1f}" if e["rss_mb"] is not None else f"{'—':>9}"
+            fila = (f"   {'  ' * e['depth'] + e['name']:<28}{e['wall_s'] * 1e3:>10.1f}"
+                    f"{e['cpu_s'] * 1e3:>10.1f}{rss}")
+            if self.memoria:
+                fila += f"{e.get('py_peak_mb', 0.0):>12.1f}"
+            filas.append(fila)
+        if self.contadores:
+            filas.append("   " + ", ".join(f"{k}={v}" for k, v in sorted(self.contadores.items())))
+        return "\n".join(filas)
+
+
+# ─────────── API DE MÓDULO (sin coste si no hay perfil activo) ───────────
+def etapa(nombre: str, **args):
+    """Contexto que mide la etapa `nombre` en el perfil activo (o no hace nada)."""
+    p = _ACTIVO
+    return _NULO if p is None else p.etapa(nombre, **args)
+
+
+def contar(nombre: str, n: int = 1) -> None:
+    """Suma `n` al contador `nombre` del perfil activo, si lo hay."""
+    p = _ACTIVO
+    if p is not None:
+        p.contar(nombre, n)
+
+
+def activo() -> Perfil | None:
+    return _ACTIVO
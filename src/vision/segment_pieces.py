@@ -7,21 +7,239 @@
 #
 # Uso CLI:
 #   python segment_pieces.py -i in/puzzle_con_piezas.png -o out_piezas --save-debug
+#   python segment_pieces.py -i foto_12mp.png --pyramid 0.25
 #
 # La función `segmentar()` devuelve una lista con las rutas de los PNG generados.
+# `segmentar_imagen()` hace lo mismo en memoria: recibe la imagen ya cargada
+# y devuelve las piezas RGBA sin escribir nada en disco.
+#
+# Modo pirámide (`escala_piramide`): las piezas se detectan con
+# `connectedComponentsWithStats` sobre la imagen reducida (los blobs de ruido
+# se descartan por área con sus estadísticas) y la máscara sólo se recalcula
+# a resolución completa dentro de la ROI de cada una.  Los dos modos
+# descartan el ruido con el mismo criterio (AREA_MIN_PX y AREA_REL_MIN).
 
 from __future__ import annotations
 import os
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Tuple
 
 import cv2
 import numpy as np
 import argparse
 
 
+AREA_MIN_PX  = 400     # área mínima de una pieza (px a resolución completa)
+AREA_REL_MIN = 0.2     # … y fracción mínima del área mediana de las piezas
+
+
+def _area_pieza(mask: np.ndarray, cont: np.ndarray) -> int:
+    """Píxeles de `mask` dentro del contorno `cont` (relleno), en su bbox."""
+    x, y, w, h = cv2.boundingRect(cont)
+    relleno = np.zeros((h, w), np.uint8)
+    cv2.drawContours(relleno, [cont], -1, 255, cv2.FILLED, offset=(-x, -y))
+    return cv2.countNonZero(cv2.bitwise_and(mask[y:y + h, x:x + w], relleno))
+
+
 # ──────────────────────────────────────────────────────────────
-def segmentar(img_path: str, out_dir: str = "out_piezas", save_debug: bool = False) -> List[str]:
+def _segmentar(img: np.ndarray):
+    """Devuelve (piezas RGBA, posiciones {i: (xc, yc)}, contornos)."""
+    # ─── 1. Crear máscara binaria ─────────────────────────────
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    _, mask = cv2.threshold(gray, 10, 255, cv2.THRESH_BINARY)
+
+    kernel = np.ones((3, 3), np.uint8)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+    mask = cv2.dilate(mask, kernel, iterations=1)
+
+    # ─── 2. Encontrar contornos ───────────────────────────────
+    contornos, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    # descartar ruido con el mismo criterio que el modo pirámide: área
+    # mínima absoluta y relativa a la mediana de las que la superan
+    areas = [_area_pieza(mask, c) for c in contornos]
+    contornos = [c for c, a in zip(contornos, areas) if a >= AREA_MIN_PX]
+    areas = [a for a in areas if a >= AREA_MIN_PX]
+    if areas:
+        mediana = np.median(areas)
+        contornos = [c for c, a in zip(contornos, areas) if a >= AREA_REL_MIN * mediana]
+
+    # ─── 3. Extraer piezas + recopilar posiciones ─────────────
+    piezas: List[np.ndarray] = []
+    posiciones: Dict[int, Tuple[int, int]] = {}
+
+    for i, cont in enumerate(contornos):
+        x, y, w, h = cv2.boundingRect(cont)
+        pieza = img[y : y + h, x : x + w]
+        pieza_mask = mask[y : y + h, x : x + w]
+
+        pieza_rgba = cv2.cvtColor(pieza, cv2.COLOR_BGR2BGRA)
+        pieza_rgba[:, :, 3] = pieza_mask
+        piezas.append(pieza_rgba)
+
+        # Centro de la pieza (coordenadas en la imagen original)
+        xc = int(x + w / 2)
+        yc = int(y + h / 2)
+        posiciones[i] = (xc, yc)
+    return piezas, posiciones, contornos
+
+
+# ─────────── MODO PIRÁMIDE ───────────
+_KERNEL = np.ones((3, 3), np.uint8)
+
+
+def _mascara(gray: np.ndarray) -> np.ndarray:
+    _, mask = cv2.threshold(gray, 10, 255, cv2.THRESH_BINARY)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, _KERNEL)
+    return cv2.dilate(mask, _KERNEL, iterations=1)
+
+
+def _refinar_roi(img: np.ndarray, roi: Tuple[int, int, int, int],
+                 halladas: Dict[Tuple[int, int, int, int], tuple]) -> None:
+    """
+    Segmenta a resolución completa la ROI (x0, y0, x1, y1) de `img` y añade
+    a `halladas` {bbox: (orden, área, máscara)} las piezas enteras que
+    contiene.  Las que toca el borde interior de la ROI se ignoran.
+    """
+    H, W = img.shape[:2]
+    x0, y0, x1, y1 = roi
+    mask = _mascara(cv2.cvtColor(img[y0:y1, x0:x1], cv2.COLOR_BGR2GRAY))
+    # en la ROI basta con los contornos externos (mucho más baratos que
+    # otra pasada de componentes conexas a resolución completa)
+    conts, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    for cont in conts:
+        x, y, w, h = cv2.boundingRect(cont)
+        # cortada por el borde interior de la ROI → la recoge otra ROI
+        if ((x == 0 and x0 > 0) or (y == 0 and y0 > 0) or
+                (x + w == x1 - x0 and x1 < W) or (y + h == y1 - y0 and y1 < H)):
+            continue
+        bbox = (x0 + x, y0 + y, w, h)
+        if bbox in halladas:
+            continue
+        relleno = np.zeros((h, w), np.uint8)
+        cv2.drawContours(relleno, [cont], -1, 255, cv2.FILLED, offset=(-x, -y))
+        pieza_mask = cv2.bitwise_and(mask[y:y + h, x:x + w], relleno)
+        area = cv2.countNonZero(pieza_mask)
+        if area < AREA_MIN_PX:
+            continue
+        # el contorno empieza en su primer píxel en orden de barrido:
+        # ordenar por él reproduce el orden de findContours global
+        orden = (y0 + int(cont[0, 0, 1]), x0 + int(cont[0, 0, 0]))
+        halladas[bbox] = (orden, area, pieza_mask)
+
+
+def _recortar(img: np.ndarray, bbox: Tuple[int, int, int, int],
+              mask: np.ndarray) -> np.ndarray:
+    x, y, w, h = bbox
+    pieza_rgba = cv2.cvtColor(img[y:y + h, x:x + w], cv2.COLOR_BGR2BGRA)
+    pieza_rgba[:, :, 3] = mask
+    return pieza_rgba
+
+
+def piezas_en_roi(img: np.ndarray, roi: Tuple[int, int, int, int]
+                  ) -> Dict[Tuple[int, int, int, int], np.ndarray]:
+    """
+    Piezas RGBA {bbox (x, y, w, h): pieza} que caben enteras en la ROI
+    (x0, y0, x1, y1) de `img`, en coordenadas de la imagen completa.
+    """
+    halladas: Dict[Tuple[int, int, int, int], tuple] = {}
+    _refinar_roi(img, roi, halladas)
+    return {bbox: _recortar(img, bbox, mask) for bbox, (_, _, mask) in halladas.items()}
+
+
+def _halladas_piramide(img: np.ndarray, escala: float
+                       ) -> Dict[Tuple[int, int, int, int], tuple]:
+    """
+    Detecta las piezas sobre la imagen reducida por `escala` y refina la
+    máscara a resolución completa sólo dentro de la ROI de cada una.
+    Devuelve {bbox: (orden, área, máscara)}.
+    """
+    H, W = img.shape[:2]
+
+    # ─── 1. Detección en baja resolución ──────────────────────
+    # vecino más próximo: sólo hace falta localizar las piezas, la máscara
+    # exacta se calcula después en cada ROI
+    small = cv2.resize(img, None, fx=escala, fy=escala, interpolation=cv2.INTER_NEAREST)
+    _, mask_s = cv2.threshold(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), 10, 255,
+                              cv2.THRESH_BINARY)
+    mask_s = cv2.dilate(mask_s, _KERNEL, iterations=1)
+    n, _, stats_s, _ = cv2.connectedComponentsWithStats(mask_s, connectivity=8)
+
+    margen = int(np.ceil(1 / escala)) + 4
+    area_min_s = AREA_MIN_PX * escala * escala
+
+    # ─── 2. Refinado por ROI a resolución completa ────────────
+    halladas: Dict[Tuple[int, int, int, int], tuple] = {}
+    for xs, ys, ws, hs, area in stats_s[1:]:
+        if area < area_min_s:
+            continue
+        x0 = max(0, int(xs / escala) - margen)
+        y0 = max(0, int(ys / escala) - margen)
+        x1 = min(W, int(np.ceil((xs + ws) / escala)) + margen)
+        y1 = min(H, int(np.ceil((ys + hs) / escala)) + margen)
+
+        _refinar_roi(img, (x0, y0, x1, y1), halladas)
+
+    if halladas:
+        mediana = np.median([a for _, a, _ in halladas.values()])
+        halladas = {b: v for b, v in halladas.items() if v[1] >= AREA_REL_MIN * mediana}
+
+    return halladas
+
+
+def piezas_en_imagen(img: np.ndarray, escala: float = 0.25
+                     ) -> Dict[Tuple[int, int, int, int], np.ndarray]:
+    """
+    Piezas RGBA {bbox: pieza} de toda la imagen con el modo pirámide, en el
+    orden de `segmentar_imagen` (la i-ésima es `piece_{i}.png`).
+    """
+    halladas = _halladas_piramide(img, escala)
+    return {bbox: _recortar(img, bbox, mask) for bbox, (_, _, mask) in
+            sorted(halladas.items(), key=lambda kv: kv[1][0], reverse=True)}
+
+
+def _segmentar_piramide(img: np.ndarray, escala: float = 0.25,
+                        con_contornos: bool = False):
+    """
+    Como `_segmentar`, pero detectando las piezas sobre la imagen reducida
+    por `escala` y refinando la máscara a resolución completa sólo dentro de
+    la ROI de cada una.  Las piezas salen en el mismo orden que daría
+    `findContours` sobre la imagen completa.
+    """
+    halladas = _halladas_piramide(img, escala)
+
+    # ─── 3. Extraer piezas + recopilar posiciones ─────────────
+    piezas: List[np.ndarray] = []
+    posiciones: Dict[int, Tuple[int, int]] = {}
+    contornos: List[np.ndarray] = []
+    for i, ((x, y, w, h), (_, _, pieza_mask)) in enumerate(
+            sorted(halladas.items(), key=lambda kv: kv[1][0], reverse=True)):
+        piezas.append(_recortar(img, (x, y, w, h), pieza_mask))
+        posiciones[i] = (int(x + w / 2), int(y + h / 2))
+        if con_contornos:
+            cs, _ = cv2.findContours(pieza_mask, cv2.RETR_EXTERNAL,
+                                     cv2.CHAIN_APPROX_SIMPLE, offset=(x, y))
+            contornos.extend(cs)
+    return piezas, posiciones, contornos
+
+
+def segmentar_imagen(img: np.ndarray, escala_piramide: float | None = None
+                     ) -> Tuple[List[np.ndarray], Dict[int, Tuple[int, int]]]:
+    """
+    Versión en memoria de `segmentar`: recibe la imagen BGR ya cargada y
+    devuelve (lista de piezas RGBA, {i: (xc, yc)}).  La pieza i corresponde
+    al fichero `piece_{i}.png` que escribiría `segmentar`.  Con
+    `escala_piramide` (p. ej. 0.25) se usa el modo pirámide.
+    """
+    if escala_piramide:
+        piezas, posiciones, _ = _segmentar_piramide(img, escala_piramide)
+    else:
+        piezas, posiciones, _ = _segmentar(img)
+    return piezas, posiciones
+
+
+def segmentar(img_path: str, out_dir: str = "out_piezas", save_debug: bool = False,
+              escala_piramide: float | None = None) -> List[str]:
     """
     Segmenta la imagen `img_path` (piezas sobre fondo negro), guarda cada pieza
     en `out_dir` y devuelve la lista completa de rutas PNG creadas.
@@ -35,24 +253,22 @@ def segmentar(img_path: str, out_dir: str = "out_piezas", save_debug: bool = Fal
     save_debug : bool
         Si es True, se guarda también una imagen 'contornos_detectados.png'
         con los contornos dibujados (útil para depurar sin abrir ventanas).
+    escala_piramide : float | None
+        Si se indica, detecta las piezas sobre la imagen reducida por este
+        factor y refina cada una a resolución completa en su ROI.
     """
     # ─── 1. Cargar imagen ─────────────────────────────────────
     img = cv2.imread(img_path, cv2.IMREAD_UNCHANGED)
     if img is None:
         raise FileNotFoundError(f"No se pudo leer la imagen: {img_path}")
 
-    # ─── 2. Crear máscara binaria ─────────────────────────────
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    _, mask = cv2.threshold(gray, 10, 255, cv2.THRESH_BINARY)
-
-    kernel = np.ones((3, 3), np.uint8)
-    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
-    mask = cv2.dilate(mask, kernel, iterations=1)
-
-    # ─── 3. Encontrar contornos ───────────────────────────────
-    contornos, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if escala_piramide:
+        piezas, posiciones, contornos = _segmentar_piramide(img, escala_piramide,
+                                                            con_contornos=save_debug)
+    else:
+        piezas, posiciones, contornos = _segmentar(img)
 
-    # ─── 4. Guardar imagen con contornos (opcional) ───────────
+    # ─── 2. Guardar imagen con contornos (opcional) ───────────
     if save_debug:
         debug = img.copy()
         cv2.drawContours(debug, contornos, -1, (0, 255, 0), 2)
@@ -60,27 +276,13 @@ def segmentar(img_path: str, out_dir: str = "out_piezas", save_debug: bool = Fal
         debug_path.parent.mkdir(exist_ok=True)
         cv2.imwrite(str(debug_path), debug)
 
-    # ─── 5. Extraer piezas + recopilar posiciones ─────────────
+    # ─── 3. Guardar piezas ────────────────────────────────────
     os.makedirs(out_dir, exist_ok=True)
     rutas: List[str] = []
-    posiciones: Dict[int, Tuple[int, int]] = {}
-
-    for i, cont in enumerate(contornos):
-        x, y, w, h = cv2.boundingRect(cont)
-        pieza = img[y : y + h, x : x + w]
-        pieza_mask = mask[y : y + h, x : x + w]
-
-        pieza_rgba = cv2.cvtColor(pieza, cv2.COLOR_BGR2BGRA)
-        pieza_rgba[:, :, 3] = pieza_mask
-
+    for i, pieza_rgba in enumerate(piezas):
         fname = Path(out_dir) / f"piece_{i}.png"
         cv2.imwrite(str(fname), pieza_rgba)
         rutas.append(str(fname))
-
-        # Centro de la pieza (coordenadas en la imagen original)
-        xc = int(x + w / 2)
-        yc = int(y + h / 2)
-        posiciones[i] = (xc, yc)
     return rutas, posiciones
 
 # ───────────────────────── CLI ───────────────────────────────
@@ -99,6 +301,13 @@ if __name__ == "__main__":
         action="store_true",
         help="Guardar imagen con los contornos detectados",
     )
+    parser.add_argument(
+        "--pyramid",
+        type=float,
+        default=None,
+        metavar="ESCALA",
+        help="Detectar sobre la imagen reducida por ESCALA (p. ej. 0.25) y refinar por ROI",
+    )
 
     args = parser.parse_args()
-    segmentar(args.input, args.output, args.save_debug)
+    segmentar(args.input, args.output, args.save_debug, args.pyramid)
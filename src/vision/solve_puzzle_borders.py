@@ -9,8 +9,12 @@
 
 from __future__ import annotations
 import os
+import time
 import itertools
+import tracemalloc
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 from glob import glob
 from math import sqrt
 from pathlib import Path
@@ -21,9 +25,21 @@ import numpy as np
 from shapely.geometry import LineString, Polygon
 from numpy.fft import fft
 
+import profiler
+from border_descriptors import FLAT, are_straight, classify_edges, describe_borders
+from color_strips import color_strips, strip_costs
+from descriptor_cache import DEFAULT_CACHE_DIR, DescriptorCache
+from edge_index import TOPK_DEFAULT, EdgeIndex
+
 # ────────── CONSTANTES Y MAPAS ──────────
 STRIPE_SAMPLES   = 100
 MAX_DEVIATION_PX = 3.0
+MAX_CORNER_CANDIDATES = 16
+EDGE_LENGTH_TOL  = 0.25     # diferencia relativa máxima de longitud entre lados
+PRUNED_COST      = 1e3      # coste de un par descartado por el prefiltro
+TYPE_DEPTH_MIN   = 2 * MAX_DEVIATION_PX  # profundidad mínima para fiarse del tipo de un lado
+SHAPE_WEIGHT     = 1.0      # peso de la forma (curvatura + Fourier) en el coste
+COLOR_WEIGHT     = 0.0      # peso del ΔE de las franjas de color (0 = sólo forma)
 SIDES = ["top", "right", "bottom", "left"]
 ROT_MAP = {
     0:   SIDES,
@@ -36,32 +52,121 @@ DIR_OFFSET = {"top": (-1, 0), "right": (0, 1), "bottom": (1, 0), "left": (0, -1)
 
 # ─────────── UTILIDADES ───────────
 def rotate_image(img: np.ndarray, rot: int) -> np.ndarray:
+    if hasattr(img, "render"):                  # pieza diferida: un único warp
+        return img.render(rot)
     return np.rot90(img, k=rot // 90)
 
 def original_side_for(rot: int, global_side: str) -> str:
     return SIDES[ROT_MAP[rot].index(global_side)]
 
+ROTS     = (0, 90, 180, 270)
+SIDE_IDX = {s: i for i, s in enumerate(SIDES)}
+# ORIG_SIDE[rot // 90, lado_global] → índice del lado original que queda ahí
+ORIG_SIDE = np.array([[SIDE_IDX[original_side_for(rot, g)] for g in SIDES]
+                      for rot in ROTS], np.intp)
+
 # ────────── CARGA & EXTRACCIÓN ──────────
+def _piece_contour(img: np.ndarray) -> np.ndarray | None:
+    if hasattr(img, "contour"):                 # pieza diferida: sin píxeles
+        return img.contour
+    if img.shape[2] == 4:
+        alpha = img[:, :, 3]
+        mask = (alpha > 0).astype(np.uint8) * 255
+    else:
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        _, mask = cv2.threshold(gray, 1, 255, cv2.THRESH_BINARY)
+
+    cnts, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+    return cnts[0][:, 0, :] if cnts else None
+
+
 def load_piece_contours(folder: str):
     pieces = []
     for p in sorted(glob(os.path.join(folder, "*.png"))):
         img = cv2.imread(p, cv2.IMREAD_UNCHANGED)
         if img is None:
             continue
+        cnt = _piece_contour(img)
+        if cnt is None:
+            continue
+        pieces.append((Path(p).name, Polygon(cnt), cnt, img))
+    return pieces
+
 
-        if img.shape[2] == 4:
-            alpha = img[:, :, 3]
-            mask = (alpha > 0).astype(np.uint8) * 255
+def descriptor_params() -> dict:
+    """Parámetros que afectan a los descriptores (forman parte de la clave de caché)."""
+    return {"stripe_samples": STRIPE_SAMPLES, "max_deviation_px": MAX_DEVIATION_PX,
+            "max_corner_candidates": MAX_CORNER_CANDIDATES}
+
+
+def describe_pieces(images: Dict[str, np.ndarray],
+                    store: DescriptorCache | None = None,
+                    raw: Dict[str, bytes] | None = None) -> Dict[int, dict]:
+    """
+    Construye la caché del solver {idx: {"img", "borders", "straight", "name"}}
+    a partir de las piezas {nombre: imagen} ya cargadas en memoria.  Con
+    `store`, las piezas ya descritas con los mismos parámetros se leen del
+    disco sin repetir contornos, esquinas ni clasificación de lados rectos.
+    La clave es el hash de `raw[nombre]` (bytes del PNG) si se da, o del
+    propio array en su defecto.  Las imágenes pueden ser también piezas
+    diferidas (`normalize_pieces.PiezaOrientada`): se describen con su
+    contorno y sus píxeles sólo se generan al componer el ensamblado.
+    """
+    cache: Dict[int, dict] = {}
+    misses: List[Tuple[int, str | None, np.ndarray]] = []
+    for name, img in images.items():
+        key = hit = None
+        if store:
+            if raw and name in raw:
+                data = raw[name]
+            elif hasattr(img, "fingerprint"):
+                data = img.fingerprint()
+            else:
+                data = f"{img.shape}{img.dtype}".encode() + np.ascontiguousarray(img).tobytes()
+            key = store.key(data)
+            hit = store.get(key)
+        if hit is None:
+            cnt = _piece_contour(img)
+            if cnt is None:
+                continue
+            borders, corners = extract_borders_from_contour(cnt)
+            misses.append((len(cache), key, corners))
         else:
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            _, mask = cv2.threshold(gray, 1, 255, cv2.THRESH_BINARY)
+            borders = {s: LineString(b) if len(b) >= 2 else LineString([])
+                       for s, b in hit["borders"].items()}
+
+        cache[len(cache)] = {
+            "img": img,
+            "borders": borders,
+            "straight": [] if hit is None else hit["straight"],
+            "name": name,
+        }
+
+    # Lados rectos de todas las piezas nuevas en un solo lote
+    flags = are_straight([np.asarray(cache[i]["borders"][s].coords)
+                          for i, _, _ in misses for s in SIDES],
+                         MAX_DEVIATION_PX).reshape(-1, 4)
+    for (idx, key, corners), f in zip(misses, flags):
+        info = cache[idx]
+        info["straight"] = [s for s, ok in zip(SIDES, f) if ok]
+        if store:
+            store.put(key, {s: np.asarray(b.coords) for s, b in info["borders"].items()},
+                      corners, info["straight"])
+    return cache
+
 
-        cnts, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
-        if not cnts:
+def load_piece_descriptors(folder: str, store: DescriptorCache | None = None
+                           ) -> Dict[int, dict]:
+    """Como `describe_pieces`, leyendo las PNG de `folder` (clave = bytes del PNG)."""
+    images: Dict[str, np.ndarray] = {}
+    raw: Dict[str, bytes] = {}
+    for p in sorted(glob(os.path.join(folder, "*.png"))):
+        data = Path(p).read_bytes()
+        img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED)
+        if img is None:
             continue
-        cnt = cnts[0][:, 0, :]
-        pieces.append((Path(p).name, Polygon(cnt), cnt, img))
-    return pieces
+        images[Path(p).name], raw[Path(p).name] = img, data
+    return describe_pieces(images, store, raw)
 
 
 def detectar_esquinas_max_distancia(contour: np.ndarray) -> np.ndarray:
@@ -75,9 +180,46 @@ def detectar_esquinas_max_distancia(contour: np.ndarray) -> np.ndarray:
     return np.array(best, np.float32) if best is not None else np.empty((0, 2), np.float32)
 
 
+_COMBOS4: Dict[int, np.ndarray] = {}
+
+def detectar_esquinas_hull(contour: np.ndarray) -> np.ndarray:
+    """
+    Mismo criterio que `detectar_esquinas_max_distancia` (4 vértices de
+    `approxPolyDP` con suma máxima de distancias mutuas) en O(n log n).
+
+    La suma de distancias es convexa en cada punto, así que el máximo se
+    alcanza en vértices del casco convexo: sólo se prueban esos, todos a la
+    vez con una matriz de distancias.  Si el casco tiene más de
+    MAX_CORNER_CANDIDATES vértices se simplifica antes.
+    """
+    cnt    = contour.reshape(-1, 1, 2).astype(np.int32)
+    eps    = 0.01 * cv2.arcLength(cnt, True)
+    approx = cv2.approxPolyDP(cnt, eps, True)
+    if len(approx) < 4:
+        return np.empty((0, 2), np.float32)
+
+    hull = approx[np.sort(cv2.convexHull(approx, returnPoints=False)[:, 0])]
+    if len(hull) < 4:
+        hull = approx
+    while len(hull) > MAX_CORNER_CANDIDATES:
+        eps *= 1.5
+        simpler = cv2.approxPolyDP(hull, eps, True)
+        hull = simpler if len(simpler) >= 4 else hull[:MAX_CORNER_CANDIDATES]
+    pts = hull[:, 0, :].astype(np.float64)
+
+    k = len(pts)
+    if k not in _COMBOS4:
+        _COMBOS4[k] = np.array(list(itertools.combinations(range(k), 4)), np.intp)
+    combos = _COMBOS4[k]
+    D = np.linalg.norm(pts[:, None] - pts[None, :], axis=2)
+    total = sum(D[combos[:, i], combos[:, j]]
+                for i, j in itertools.combinations(range(4), 2))
+    return pts[combos[np.argmax(total)]].astype(np.float32)
+
+
 def extract_borders_from_contour(contour: np.ndarray):
     pts = contour.reshape(-1, 2)
-    corners = detectar_esquinas_max_distancia(pts)
+    corners = detectar_esquinas_hull(pts)
 
     if len(corners) != 4:
         return {s: LineString([]) for s in SIDES}, corners
@@ -111,7 +253,9 @@ def is_straight(border: LineString, max_dev: float = MAX_DEVIATION_PX) -> bool:
 
 
 def classify_straight_sides(borders: dict) -> List[str]:
-    return [s for s, br in borders.items() if is_straight(br)]
+    flags = are_straight([np.asarray(br.coords) for br in borders.values()],
+                         MAX_DEVIATION_PX)
+    return [s for s, ok in zip(borders, flags) if ok]
 
 # ─────────── MÉTRICAS DE SIMILARIDAD ───────────
 def calcular_curvatura(coords: np.ndarray, ventana: int = 5) -> np.ndarray:
@@ -147,148 +291,771 @@ def comparar_bordes(b1: LineString, b2: LineString) -> Tuple[float, float]:
     fd1, fd2 = fourier_descriptors(r1), fourier_descriptors(r2)
     return float(np.linalg.norm(cu1 - cu2[:len(cu1)])), float(np.linalg.norm(fd1 - fd2))
 
+# ─────────── TENSOR DE COMPATIBILIDAD ───────────
+def _pair_costs(cu_a: np.ndarray, cu_b: np.ndarray, fd_a: np.ndarray,
+                fd_b: np.ndarray, i: np.ndarray, j: np.ndarray,
+                chunk: int = 1 << 16) -> np.ndarray:
+    """Curvatura + Fourier sólo para los pares (i[k], j[k]), por bloques."""
+    out = np.empty(len(i), np.float32)
+    for s in range(0, len(i), chunk):
+        ii, jj = i[s:s + chunk], j[s:s + chunk]
+        out[s:s + chunk] = (np.linalg.norm(cu_a[ii] - cu_b[jj], axis=1) +
+                            np.linalg.norm(fd_a[ii] - fd_b[jj], axis=1))
+    return out
+
+
+def _piece_centres(coords: List[np.ndarray]) -> np.ndarray:
+    """Centro de cada pieza: media de los extremos de sus 4 bordes."""
+    centres = np.zeros((len(coords) // 4, 2))
+    for p in range(len(centres)):
+        ends = [c[0] for c in coords[4 * p:4 * p + 4] if len(c)]
+        if ends:
+            centres[p] = np.mean(ends, axis=0)
+    return centres
+
+
+def classify_piece_edges(cache: dict) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Clasifica una sola vez cada borde como TAB / BLANK / FLAT y guarda en
+    `cache[p]["edges"]` el tipo, la profundidad con signo y la longitud.
+    Devuelve los tres arrays aplanados (N·4,) en orden (pieza, lado).
+    """
+    n = len(cache)
+    coords = [np.asarray(cache[p]["borders"][s].coords) for p in range(n) for s in SIDES]
+    centres = _piece_centres(coords)
+
+    kind, depth, length = classify_edges(coords, np.repeat(centres, 4, axis=0),
+                                         MAX_DEVIATION_PX)
+    for p in range(n):
+        cache[p]["edges"] = {"type": kind[4 * p:4 * p + 4],
+                             "depth": depth[4 * p:4 * p + 4],
+                             "length": length[4 * p:4 * p + 4]}
+    return kind, depth, length
+
+
+def trusted_edges(kind: np.ndarray, depth: np.ndarray, length: np.ndarray) -> np.ndarray:
+    """
+    (N·4,) True si el prefiltro puede fiarse del tipo y la longitud del lado.
+    No se fía de ningún lado de una pieza cuyas longitudes difieren más de
+    EDGE_LENGTH_TOL (esquinas mal detectadas: los lados se cortan por otro
+    sitio y saliente / entrante pueden intercambiarse), ni de un lado no
+    recto con profundidad menor que TYPE_DEPTH_MIN.
+    """
+    lados = length.reshape(-1, 4)
+    pieza_ok = lados.max(1) - lados.min(1) <= EDGE_LENGTH_TOL * lados.max(1)
+    return np.repeat(pieza_ok, 4) & ((kind == FLAT) | (np.abs(depth) >= TYPE_DEPTH_MIN))
+
+
+def build_cost_tensor(cache: dict, prefilter: bool = True,
+                      stats: dict | None = None,
+                      color_weight: float = COLOR_WEIGHT,
+                      color_max: float | None = None,
+                      shape_weight: float = SHAPE_WEIGHT) -> np.ndarray:
+    """
+    Precalcula, una sola vez por resolución, el coste de encaje entre cada
+    par (pieza, lado original).  `cost[p, sp, q, sq]` equivale a sumar las dos
+    métricas de `comparar_bordes(borders_p[sp], borders_q[sq])`; los
+    descriptores de todos los bordes se calculan en una sola pasada.
+
+    Con `prefilter`, antes de cualquier métrica se descartan los pares que no
+    pueden encajar (saliente con saliente, lados rectos, longitudes que
+    difieren más de EDGE_LENGTH_TOL); esos pares valen PRUNED_COST.  Los
+    lados en los que no se puede confiar (`trusted_edges`) no se descartan.
+
+    Con `color_weight` o `color_max` se añade el ΔE medio entre las franjas
+    de color de los dos lados (color_strips.py): el coste pasa a ser
+    `shape_weight·forma + color_weight·ΔE`, y los pares con ΔE mayor que
+    `color_max` se descartan antes de calcular la forma.
+
+    Devuelve un array float32 N×4×N×4.  Los pares de una pieza consigo misma
+    y los bordes vacíos valen +inf.
+    """
+    stats = {} if stats is None else stats
+    n = len(cache)
+    coords = [np.asarray(cache[p]["borders"][s].coords) for p in range(n) for s in SIDES]
+    desc = describe_borders(coords, num=STRIPE_SAMPLES)
+    rev = desc.reversed()
+
+    valid = desc.valid
+    other = np.repeat(np.arange(n), 4)
+    cand  = valid[:, None] & valid[None, :] & (other[:, None] != other[None, :])
+    keep  = cand
+    if prefilter:
+        kind, depth, length = classify_piece_edges(cache)
+        fiable = trusted_edges(kind, depth, length)
+        longest = np.maximum(length[:, None], length[None, :])
+        keep = cand & (((kind[:, None] * kind[None, :] == -1) &
+                        (np.abs(length[:, None] - length[None, :]) <= EDGE_LENGTH_TOL * longest))
+                       | ~fiable[:, None] | ~fiable[None, :])
+
+    # comparar_bordes invierte el segundo borde → fila: directo, columna: invertido
+    i, j = np.nonzero(keep)
+    color = 0.0
+    if color_weight or color_max is not None:
+        t0 = time.perf_counter()
+        lab = color_strips([cache[p]["img"] for p in range(n)], coords,
+                           _piece_centres(coords))
+        color = strip_costs(lab, i, j)
+        if color_max is not None:              # salida temprana: sin métrica de forma
+            near = color <= color_max
+            stats["pairs_color_pruned"] = int((~near).sum())
+            i, j, color = i[near], j[near], color[near]
+        stats["color_s"] = time.perf_counter() - t0
+
+    cost = np.full((4 * n, 4 * n), PRUNED_COST, np.float32)
+    cost[i, j] = shape_weight * _pair_costs(desc.curvature, rev.curvature,
+                                            desc.fourier, rev.fourier, i, j)
+    if color_weight:
+        cost[i, j] += color_weight * color
+    cost[~cand] = np.inf
+
+    total = int(cand.sum())
+    stats["pairs_total"]  = total
+    stats["pairs_pruned"] = total - len(i)
+    stats["prune_rate"]   = (total - len(i)) / total if total else 0.0
+    return cost.reshape(n, 4, n, 4)
+
 # ─────────── COLOCACIÓN ───────────
+def cell_category(r: int, c: int, side: int) -> frozenset:
+    """Lados globales que deben ser rectos en la celda (r, c)."""
+    req = set()
+    if r == 0:        req.add("top")
+    if r == side - 1: req.add("bottom")
+    if c == 0:        req.add("left")
+    if c == side - 1: req.add("right")
+    return frozenset(req)
+
+
+def build_candidate_buckets(cache: dict) -> Dict[frozenset, np.ndarray]:
+    """
+    Agrupa cada (pieza, rot // 90) según el conjunto de lados rectos que
+    presenta en coordenadas globales.  Una celda sólo admite los candidatos
+    del cubo de su categoría (esquina / borde / interior), así que el solver
+    no tiene que recorrer todas las piezas × 4 rotaciones.
+    """
+    buckets = defaultdict(list)
+    for idx in sorted(cache):
+        straight0 = cache[idx]["straight"]
+        for k, rot in enumerate(ROTS):
+            g = frozenset(ROT_MAP[rot][SIDES.index(s)] for s in straight0)
+            buckets[g].append((idx, k))
+    return defaultdict(lambda: np.empty((0, 2), np.intp),
+                       {g: np.array(v, np.intp) for g, v in buckets.items()})
+
+
+def _cell_candidates(cache: dict, side: int) -> Dict[Tuple[int, int], np.ndarray]:
+    """Celda → array (p, rot // 90) de candidatos factibles (vista del cubo)."""
+    buckets = build_candidate_buckets(cache)
+    return {(r, c): buckets[cell_category(r, c, side)]
+            for r in range(side) for c in range(side)}
+
+
 def build_allowed_positions(cache: dict, side: int) -> dict:
-    allowed = {}
-    for idx, info in cache.items():
-        straight0 = info["straight"]
-        perms = set()
-
-        for rot in (0, 90, 180, 270):
-            g = {ROT_MAP[rot][SIDES.index(s)] for s in straight0}
-
-            for r in range(side):
-                for c in range(side):
-                    corner = (r in (0, side - 1) and c in (0, side - 1))
-                    border = (not corner and (r in (0, side - 1) or c in (0, side - 1)))
-
-                    if corner:
-                        req = {"top" if r == 0 else "bottom",
-                               "left" if c == 0 else "right"}
-                        if len(g) == 2 and g == req:
-                            perms.add((r, c, rot))
-
-                    elif border:
-                        if len(g) == 1:
-                            req = ("top"    if r == 0 else
-                                   "bottom" if r == side - 1 else
-                                   "left"   if c == 0 else "right")
-                            if next(iter(g)) == req:
-                                perms.add((r, c, rot))
-                    else:  # interior
-                        if len(g) == 0:
-                            perms.add((r, c, rot))
-        allowed[idx] = perms
+    """Pieza → {(fila, col, rot)} permitidas según sus lados rectos."""
+    allowed = {idx: set() for idx in cache}
+    for (r, c), cands in _cell_candidates(cache, side).items():
+        for p, k in cands:
+            allowed[int(p)].add((r, c, ROTS[k]))
     return allowed
 
 
-def solver_greedy(cache: dict) -> Tuple[dict, float]:
+def solver_greedy(cache: dict, cost: np.ndarray, seed: tuple | None = None,
+                  cands: dict | None = None) -> Tuple[dict, float]:
+    """
+    Coloca una pieza por celda eligiendo siempre la de menor coste.
+    `seed = (pieza, fila, col, rot)` fija la esquina de partida; el tablero se
+    recorre en orden raster alejándose de ella.
+
+    El estado es una rejilla int16 de ids de pieza (-1 = libre), una rejilla
+    de rotaciones y una máscara de piezas usadas; los candidatos de cada
+    celda salen de su cubo de categoría.
+    """
     n, side = len(cache), int(round(sqrt(len(cache))))
-    allowed = build_allowed_positions(cache, side)
+    if cands is None:
+        cands = _cell_candidates(cache, side)
 
     neighbours = {
-        (r, c): [(r + dr, c + dc, sd) for sd, (dr, dc) in DIR_OFFSET.items()
+        (r, c): [(r + dr, c + dc, SIDE_IDX[sd], SIDE_IDX[OPPOSITE[sd]])
+                 for sd, (dr, dc) in DIR_OFFSET.items()
                  if 0 <= r + dr < side and 0 <= c + dc < side]
         for r in range(side) for c in range(side)
     }
 
-    corners = [i for i, d in cache.items() if len(d["straight"]) == 2]
-    start = min(corners, key=lambda i: len(allowed[i]))
-    r0, c0, rot0 = sorted(allowed[start])[0]
+    if seed is None:
+        first = cands[(0, 0)]
+        if not len(first):
+            raise RuntimeError("No hay candidato para la celda (0, 0)")
+        (start, k0), r0, c0 = first[0], 0, 0
+    else:
+        start, r0, c0, rot0 = seed
+        k0 = rot0 // 90
+
+    grid = np.full((side, side), -1, np.int16)
+    rots = np.zeros((side, side), np.int8)
+    used = np.zeros(n, bool)
+    grid[r0, c0], rots[r0, c0], used[start] = start, k0, True
+    score = 0.0
+
+    rows = range(side) if r0 == 0 else range(side - 1, -1, -1)
+    cols = range(side) if c0 == 0 else range(side - 1, -1, -1)
+
+    for r in rows:
+        for c in cols:
+            if grid[r, c] >= 0:
+                continue
+
+            P, K = cands[(r, c)].T
+            free = ~used[P]
+            P, K = P[free], K[free]
+
+            tot = np.zeros(len(P))
+            for rn, cn, sd, opp in neighbours[(r, c)]:
+                q = grid[rn, cn]
+                if q < 0:
+                    continue
+                tot += cost[P, ORIG_SIDE[K, sd], q, ORIG_SIDE[rots[rn, cn], opp]]
+
+            if not len(P) or not np.isfinite(tot.min()):
+                raise RuntimeError(f"No hay candidato para la celda {(r, c)}")
+
+            i = int(np.argmin(tot))
+            grid[r, c], rots[r, c], used[P[i]] = P[i], K[i], True
+            score += float(tot[i])
+
+    places = {int(grid[r, c]): (r, c, ROTS[rots[r, c]])
+              for r in range(side) for c in range(side)}
+    return places, score
 
-    places, used, score = {start: (r0, c0, rot0)}, {(r0, c0)}, 0.0
+# ─────────── SOLVER PARALELO (SEMILLAS) ───────────
+_SHARED: dict = {}
+
+def _init_seed_worker(shm_name: str, shape: tuple, cache: dict, cands: dict):
+    """Cada proceso se engancha una sola vez al tensor en memoria compartida."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _SHARED.update(shm=shm, cache=cache, cands=cands,
+                   cost=np.ndarray(shape, np.float32, buffer=shm.buf))
+
+
+def _solve_seed(seed: tuple):
+    t0 = time.perf_counter()
+    try:
+        places, score = solver_greedy(_SHARED["cache"], _SHARED["cost"],
+                                      seed, _SHARED["cands"])
+    except RuntimeError:
+        places, score = None, float("inf")
+    return seed, places, score, time.perf_counter() - t0, os.getpid()
+
+
+def solver_parallel(cache: dict, cost: np.ndarray, workers: int | None = None,
+                    stats: dict | None = None) -> Tuple[dict, float]:
+    """
+    Lanza `solver_greedy` desde cada semilla (pieza esquina, celda esquina,
+    rotación) en un ProcessPoolExecutor y devuelve el ensamblado de menor
+    score.  El tensor de costes se comparte por memoria compartida: sólo se
+    serializan las semillas.
+    """
+    stats = {} if stats is None else stats
+    side = int(round(sqrt(len(cache))))
+    cands = _cell_candidates(cache, side)
+    corner_cells = sorted({(0, 0), (0, side - 1), (side - 1, 0), (side - 1, side - 1)})
+    seeds = sorted((int(p), r, c, ROTS[k]) for r, c in corner_cells
+                   for p, k in cands[(r, c)])
+    if not seeds:
+        raise RuntimeError("No hay ninguna pieza esquina para sembrar el solver")
+
+    lite = {idx: {"straight": d["straight"]} for idx, d in cache.items()}
+    shm = shared_memory.SharedMemory(create=True, size=max(cost.nbytes, 1))
+    try:
+        np.ndarray(cost.shape, np.float32, buffer=shm.buf)[:] = cost
+        with ProcessPoolExecutor(workers, initializer=_init_seed_worker,
+                                 initargs=(shm.name, cost.shape, lite, cands)) as ex:
+            results = list(ex.map(_solve_seed, seeds))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    per_worker: Dict[int, dict] = {}
+    for _, _, _, dt, pid in results:
+        w = per_worker.setdefault(pid, {"seeds": 0, "time_s": 0.0})
+        w["seeds"] += 1
+        w["time_s"] += dt
+    stats["seeds"] = len(seeds)
+    stats["workers"] = per_worker
+    for pid, w in sorted(per_worker.items()):
+        print(f"👷 Worker {pid}: {w['seeds']:3d} semillas en {w['time_s']:.3f} s")
+
+    seed, places, score, _, _ = min(results, key=lambda res: res[2])
+    if places is None:
+        raise RuntimeError("Ninguna semilla ha producido un ensamblado completo")
+    stats["best_seed"] = seed
+    return places, score
+
+# ─────────── BEAM SEARCH / BRANCH & BOUND ───────────
+def _raster_lower_bound(cands: dict, cost: np.ndarray, side: int) -> np.ndarray:
+    """
+    Cota admisible del coste que falta por sumar.  `h[k]` es, para las celdas
+    k, k+1, … en orden raster, la suma de sus mínimos posibles: cada lado
+    que mira a un vecino ya colocado (arriba / izquierda) cuesta al menos el
+    mínimo de ese lado original contra cualquier otro.
+    """
+    side_min = cost.reshape(cost.shape[0], 4, -1).min(axis=2)
+    side_min = np.where(np.isfinite(side_min), side_min, 0.0)
+    top, left = SIDE_IDX["top"], SIDE_IDX["left"]
+
+    per_cell = []
+    for r in range(side):
+        for c in range(side):
+            P, K = cands[(r, c)].T
+            lb = np.zeros(len(P))
+            if r > 0:
+                lb += side_min[P, ORIG_SIDE[K, top]]
+            if c > 0:
+                lb += side_min[P, ORIG_SIDE[K, left]]
+            per_cell.append(lb.min() if lb.size else 0.0)
+    return np.concatenate((np.cumsum(per_cell[::-1])[::-1], [0.0]))
+
+
+def _beam(cands: dict, cost: np.ndarray, h: np.ndarray, side: int, n: int,
+          width: int, bound: float = float("inf"),
+          deadline: float | None = None, start: tuple | None = None,
+          stats: dict | None = None):
+    """
+    Rellena el tablero en orden raster manteniendo los `width` mejores
+    ensamblados parciales.  Se descartan los hijos cuyo coste + cota
+    supera `bound` (mejor solución completa conocida).
+
+    Devuelve (score, pid, rot) del mejor ensamblado completo, None si no se
+    completa ninguno, o ("deadline", estado) si vence el plazo.
+    """
+    stats = {} if stats is None else stats
+    top, left = SIDE_IDX["top"], SIDE_IDX["left"]
+    bottom, right = SIDE_IDX["bottom"], SIDE_IDX["right"]
+
+    if start is None:
+        start = (0.0, np.full(side * side, -1, np.intp),
+                 np.zeros(side * side, np.intp), np.zeros(n, bool))
+    beam = [start]
+
+    for k in range(int(start[3].sum()), side * side):
+        if deadline is not None and time.perf_counter() > deadline:
+            return "deadline", beam[0]
+        r, c = divmod(k, side)
+        P, K = cands[(r, c)].T
+
+        parents, children, scores = [], [], []
+        for b, (g, pid, rot, used) in enumerate(beam):
+            ok = ~used[P]
+            tot = np.full(len(P), g)
+            if r > 0:
+                q, kq = pid[k - side], rot[k - side]
+                tot += cost[P, ORIG_SIDE[K, top], q, ORIG_SIDE[kq, bottom]]
+            if c > 0:
+                q, kq = pid[k - 1], rot[k - 1]
+                tot += cost[P, ORIG_SIDE[K, left], q, ORIG_SIDE[kq, right]]
+            ok &= tot + h[k + 1] < bound
+            stats["beam_expanded"] = stats.get("beam_expanded", 0) + len(P)
+            stats["beam_pruned"]   = stats.get("beam_pruned", 0) + int((~ok).sum())
+            sel = np.flatnonzero(ok)
+            parents.append(np.full(len(sel), b))
+            children.append(sel)
+            scores.append(tot[sel])
+
+        parents, children = np.concatenate(parents), np.concatenate(children)
+        scores = np.concatenate(scores)
+        if scores.size == 0:
+            return None
+        keep = np.argsort(scores, kind="stable")[:width]
+
+        new_beam = []
+        for i in keep:
+            _, pid, rot, used = beam[parents[i]]
+            p, kk = P[children[i]], K[children[i]]
+            pid, rot, used = pid.copy(), rot.copy(), used.copy()
+            pid[k], rot[k], used[p] = p, kk, True
+            new_beam.append((float(scores[i]), pid, rot, used))
+        beam = new_beam
+
+    g, pid, rot, _ = beam[0]
+    return g, pid, rot
+
+
+def solver_beam(cache: dict, cost: np.ndarray, beam_width: int = 8,
+                deadline: float | None = None,
+                stats: dict | None = None) -> Tuple[dict, float]:
+    """
+    Beam search con poda branch-and-bound sobre las mismas restricciones que
+    `solver_greedy` (cubos de candidatos por categoría de celda).  Primero se obtiene una
+    solución voraz que sirve de cota; después se conservan los `beam_width`
+    mejores parciales.  Si se pasa `deadline` (segundos) y vence, se completa
+    vorazmente el mejor parcial y se devuelve el mejor ensamblado completo
+    encontrado hasta entonces.
+    """
+    stats = {} if stats is None else stats
+    n, side = len(cache), int(round(sqrt(len(cache))))
+    cands = _cell_candidates(cache, side)
+    h = _raster_lower_bound(cands, cost, side)
+    t_end = None if deadline is None else time.perf_counter() + deadline
+
+    best = _beam(cands, cost, h, side, n, 1, stats=stats)
+    bound = best[0] if best else float("inf")
+
+    res = _beam(cands, cost, h, side, n, beam_width, bound, t_end, stats=stats)
+    stats["deadline_hit"] = bool(res and res[0] == "deadline")
+    if stats["deadline_hit"]:
+        res = _beam(cands, cost, h, side, n, 1, bound, start=res[1], stats=stats)
+    if res and (best is None or res[0] < best[0]):
+        best = res
+
+    if best is None:
+        raise RuntimeError("No hay ensamblado completo compatible con las restricciones")
+
+    score, pid, rot = best
+    places = {int(pid[k]): (k // side, k % side, int(rot[k]) * 90)
+              for k in range(side * side)}
+    return places, float(score)
+
+# ─────────── ÍNDICE TOP-K (PUZZLES GRANDES) ───────────
+# ROT_FOR[lado_original, lado_global] → rot // 90 que lleva ese lado ahí
+ROT_FOR = np.empty((4, 4), np.intp)
+for _k in range(4):
+    ROT_FOR[ORIG_SIDE[_k], np.arange(4)] = _k
+
+
+def _rel_mask(mask: int, lado: int) -> int:
+    """Máscara de lados rectos girada para que `lado` quede en el bit 0."""
+    return ((mask >> lado) | (mask << (4 - lado))) & 0xF
+
+
+def build_edge_index(cache: dict, k: int = TOPK_DEFAULT,
+                     stats: dict | None = None, prefilter: bool = True) -> EdgeIndex:
+    """
+    Alternativa a `build_cost_tensor` para puzzles grandes: mismos
+    descriptores y prefiltro, pero sólo se guardan los `k` lados más
+    compatibles con cada lado (ver edge_index.py).  Las listas se separan
+    por la disposición de lados rectos de la pieza vista desde el lado que
+    encaja (`_rel_mask`), que es lo que decide en qué celdas puede ir.
+    """
+    stats = {} if stats is None else stats
+    n = len(cache)
+    desc = describe_borders([np.asarray(cache[p]["borders"][s].coords)
+                             for p in range(n) for s in SIDES],
+                            num=STRIPE_SAMPLES)
+    rev = desc.reversed()
+    kind, depth, length = classify_piece_edges(cache) if prefilter else (None, None, None)
+    masks = [sum(1 << SIDE_IDX[s] for s in cache[p]["straight"]) for p in range(n)]
+    grupo = np.array([_rel_mask(masks[p], sp) for p in range(n) for sp in range(4)], np.intp)
+    index = EdgeIndex(desc.curvature, desc.fourier, rev.curvature, rev.fourier,
+                      np.repeat(np.arange(n), 4), desc.valid, kind, length, grupo,
+                      EDGE_LENGTH_TOL, PRUNED_COST, k,
+                      fiable=trusted_edges(kind, depth, length) if prefilter else None)
+    stats["topk"] = k
+    stats["pairs_compared"] = index.comparados
+    stats["pairs_pruned"] = index.descartados
+    return index
+
+
+def solver_topk(cache: dict, index: EdgeIndex,
+                stats: dict | None = None) -> Tuple[dict, float]:
+    """
+    Greedy en orden raster como `solver_greedy`, pero los candidatos de cada
+    celda son sólo los `k` lados más compatibles con sus vecinos ya
+    colocados (unión de las listas del índice para la categoría de la
+    celda).  El coste de cada candidato con todos sus vecinos se calcula
+    exacto en el momento.  Si ningún candidato del índice sigue libre, la
+    celda se resuelve con el cubo completo como en `solver_greedy`.
+
+    Cada celda cuesta O(k) en lugar de O(N): el solver queda en O(N·k).
+    """
+    stats = {} if stats is None else stats
+    n, side = len(cache), int(round(sqrt(len(cache))))
+    cands = _cell_candidates(cache, side)
+    cell_mask = {(r, c): sum(1 << SIDE_IDX[s] for s in cell_category(r, c, side))
+                 for r in range(side) for c in range(side)}
+
+    first = cands[(0, 0)]
+    if not len(first):
+        raise RuntimeError("No hay candidato para la celda (0, 0)")
+    start, k0 = first[0]
+
+    grid = np.full((side, side), -1, np.intp)
+    rots = np.zeros((side, side), np.intp)
+    used = np.zeros(n, bool)
+    grid[0, 0], rots[0, 0], used[start] = start, k0, True
+    score = 0.0
+    stats["topk_fallbacks"] = 0
+    top, left = SIDE_IDX["top"], SIDE_IDX["left"]
+    bottom, right = SIDE_IDX["bottom"], SIDE_IDX["right"]
 
     for r in range(side):
         for c in range(side):
-            if (r, c) in used:
+            if grid[r, c] >= 0:
                 continue
+            vecinos = []                              # (lado global, columna del índice)
+            if r > 0:
+                q = grid[r - 1, c]
+                vecinos.append((top, 4 * q + ORIG_SIDE[rots[r - 1, c], bottom]))
+            if c > 0:
+                q = grid[r, c - 1]
+                vecinos.append((left, 4 * q + ORIG_SIDE[rots[r, c - 1], right]))
 
-            best = (None, None, float("inf"))
-            for p in cache:
-                if p in places:
-                    continue
-                for rot in (0, 90, 180, 270):
-                    if (r, c, rot) not in allowed[p]:
-                        continue
-
-                    tot = 0.0
-                    for rn, cn, sd in neighbours[(r, c)]:
-                        if (rn, cn) not in used:
-                            continue
-                        q = next(idx for idx, pos in places.items() if pos[:2] == (rn, cn))
-                        dc, df = comparar_bordes(
-                            cache[p]["borders"][original_side_for(rot, sd)],
-                            cache[q]["borders"][original_side_for(places[q][2], OPPOSITE[sd])]
-                        )
-                        tot += dc + df
-
-                    if tot < best[2]:
-                        best = (p, rot, tot)
-
-            if best[0] is None:
+            # candidatos como códigos 4·pieza + rot // 90, sin repetidos
+            m = cell_mask[(r, c)]
+            pk = np.unique(np.concatenate(
+                [(f // 4) * 4 + ROT_FOR[f % 4, sd]
+                 for sd, j in vecinos for f in [index.candidatos(j, _rel_mask(m, sd))]]
+                or [[]]).astype(np.intp))
+            P, K = pk // 4, pk % 4
+            free = ~used[P]
+            P, K = P[free], K[free]
+            if not len(P):
+                stats["topk_fallbacks"] += 1
+                P, K = cands[(r, c)].T
+                free = ~used[P]
+                P, K = P[free], K[free]
+
+            tot = np.zeros(len(P))
+            for sd, j in vecinos:
+                tot += index.cost(4 * P + ORIG_SIDE[K, sd], j)
+
+            if not len(P) or not np.isfinite(tot.min()):
                 raise RuntimeError(f"No hay candidato para la celda {(r, c)}")
 
-            places[best[0]] = (r, c, best[1])
-            used.add((r, c))
-            score += best[2]
+            i = int(np.argmin(tot))
+            grid[r, c], rots[r, c], used[P[i]] = P[i], K[i], True
+            score += float(tot[i])
 
+    places = {int(grid[r, c]): (r, c, ROTS[rots[r, c]])
+              for r in range(side) for c in range(side)}
     return places, score
 
 # ─────────── COMPOSICIÓN FINAL ───────────
-def compose_and_output(cache: dict, places: dict,
-                       out: Path, score: float) -> List[List[Tuple[int, int]]]:
+RENDER_MODES = ("none", "thumbnail", "full")
+TILE_ROWS    = 256
+
+def _blend_into(dst: np.ndarray, img: np.ndarray) -> None:
+    """
+    Pega `img` (BGR o BGRA uint8) sobre `dst` in situ.  La mezcla alfa se hace
+    en punto fijo uint16 y por franjas de TILE_ROWS filas, así que nunca se
+    reserva más que una franja de temporales.  Trunca como la mezcla en
+    float64 anterior; sólo difiere (en 1) donde el float caía justo por
+    debajo del entero exacto: 12 397 de las 256³ ternas (alfa, fondo, pieza).
+    """
+    if img.shape[2] != 4:
+        dst[:] = img[:, :, :3]
+        return
+    for y in range(0, img.shape[0], TILE_ROWS):
+        src  = img[y:y + TILE_ROWS]
+        tile = dst[y:y + TILE_ROWS]
+        a   = src[:, :, 3:4].astype(np.uint16)
+        acc = tile.astype(np.uint16)
+        acc *= 255 - a
+        acc += src[:, :, :3] * a
+        acc //= 255
+        tile[:] = acc
+
+
+def compose_and_output(cache: dict, places: dict, out: Path, score: float,
+                       render: str = "full", thumb_scale: float = 0.25,
+                       stats: dict | None = None) -> List[List[Tuple[int, int]]]:
+    """
+    Construye la matriz (idx, rot) y, según `render`, guarda el ensamblado:
+    "none" no genera imagen, "thumbnail" escribe directamente una vista
+    reducida por `thumb_scale` y "full" la imagen a resolución completa
+    (informa del pico de memoria de la composición).
+    """
+    if render not in RENDER_MODES:
+        raise ValueError(f"Modo de render desconocido: {render}")
+    stats = {} if stats is None else stats
     n, side = len(cache), int(round(sqrt(len(cache))))
     matrix = [[None] * side for _ in range(side)]
     for idx, (r, c, rot) in places.items():
         matrix[r][c] = (idx, rot)
 
-    col_w, row_h = defaultdict(int), defaultdict(int)
-    for idx, (r, c, rot) in places.items():
-        h, w = rotate_image(cache[idx]["img"], rot).shape[:2]
-        row_h[r], col_w[c] = max(row_h[r], h), max(col_w[c], w)
+    if render == "none":
+        print(f"\n🧮  Ensamblado calculado (sin imagen)   score_total={score:.4f}")
+        return matrix
 
-    x_off = np.concatenate(([0], np.cumsum([col_w[c] for c in range(side - 1)])))
-    y_off = np.concatenate(([0], np.cumsum([row_h[r] for r in range(side - 1)])))
-    canvas = np.full((sum(row_h.values()), sum(col_w.values()), 3), 255, np.uint8)
+    scale = thumb_scale if render == "thumbnail" else 1.0
 
-    for idx, (r, c, rot) in places.items():
-        img = rotate_image(cache[idx]["img"], rot)
-        y0, x0 = y_off[r], x_off[c]
-        roi = canvas[y0:y0 + img.shape[0], x0:x0 + img.shape[1]]
-
-        if img.shape[2] == 4:
-            alpha = img[:, :, 3:4] / 255.0
-            canvas[y0:y0 + img.shape[0], x0:x0 + img.shape[1]] = (
-                (1 - alpha) * roi + alpha * img[:, :, :3]
-            ).astype(np.uint8)
-        else:
-            canvas[y0:y0 + img.shape[0], x0:x0 + img.shape[1]] = img[:, :, :3]
+    def piece(idx: int, rot: int) -> np.ndarray:
+        src = cache[idx]["img"]
+        if hasattr(src, "render"):              # giro y escala en el mismo warp
+            return src.render(rot, scale)
+        img = rotate_image(src, rot)
+        if scale == 1.0:
+            return img
+        h, w = img.shape[:2]
+        return cv2.resize(np.ascontiguousarray(img),
+                          (max(1, round(w * scale)), max(1, round(h * scale))),
+                          interpolation=cv2.INTER_AREA)
+
+    def size(idx: int, rot: int) -> Tuple[int, int]:
+        h, w = cache[idx]["img"].shape[:2]
+        h, w = (w, h) if rot in (90, 270) else (h, w)
+        return max(1, round(h * scale)), max(1, round(w * scale))
 
-    cv2.imwrite(str(out), cv2.cvtColor(canvas, cv2.COLOR_RGB2BGR))
-    print(f"\n🖼️  Guardado ensamblado final → {out}   score_total={score:.4f}")
+    tracing = render == "full" and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    try:
+        col_w, row_h = defaultdict(int), defaultdict(int)
+        for idx, (r, c, rot) in places.items():
+            h, w = size(idx, rot)
+            row_h[r], col_w[c] = max(row_h[r], h), max(col_w[c], w)
+
+        x_off = np.concatenate(([0], np.cumsum([col_w[c] for c in range(side - 1)])))
+        y_off = np.concatenate(([0], np.cumsum([row_h[r] for r in range(side - 1)])))
+        canvas = np.full((sum(row_h.values()), sum(col_w.values()), 3), 255, np.uint8)
+
+        for idx, (r, c, rot) in places.items():
+            img = piece(idx, rot)
+            y0, x0 = y_off[r], x_off[c]
+            _blend_into(canvas[y0:y0 + img.shape[0], x0:x0 + img.shape[1]], img)
+
+        cv2.cvtColor(canvas, cv2.COLOR_RGB2BGR, dst=canvas)
+        cv2.imwrite(str(out), canvas)
+        peak = tracemalloc.get_traced_memory()[1] if tracing else 0
+    finally:
+        if tracing:
+            tracemalloc.stop()
+
+    msg = ""
+    if tracing:
+        stats["render_peak_mb"] = peak / 2**20
+        msg = f"   pico_mem={stats['render_peak_mb']:.1f} MB"
+    stats["render_shape"] = canvas.shape[:2]
+    print(f"\n🖼️  Guardado ensamblado {'final' if scale == 1.0 else 'reducido'} "
+          f"→ {out}   score_total={score:.4f}{msg}")
     return matrix
 
 # ─────────── API PRINCIPAL ───────────
-def solve_greedy(pieces_dir: str,
-                 output_path: str | Path = "solution_greedy.png"
+def solve_greedy(pieces_dir: str | Dict[str, np.ndarray],
+                 output_path: str | Path = "solution_greedy.png",
+                 stats: dict | None = None,
+                 strategy: str = "greedy",
+                 beam_width: int = 8,
+                 deadline: float | None = None,
+                 workers: int = 1,
+                 cache_dir: str | Path | None = DEFAULT_CACHE_DIR,
+                 render: str = "full",
+                 thumb_scale: float = 0.25,
+                 topk: int = TOPK_DEFAULT,
+                 color_weight: float = COLOR_WEIGHT,
+                 color_max: float | None = None,
+                 prefilter: bool = True,
                  ) -> Tuple[List[List[Tuple[int, int]]], float, Dict[int, str]]:
-    pieces = load_piece_contours(pieces_dir)
-    if not pieces:
+    """
+    Resuelve el puzzle de `pieces_dir` y guarda el ensamblado en `output_path`.
+    `pieces_dir` también puede ser un dict {nombre: imagen RGBA} ya en memoria
+    (p. ej. la salida de `normalizar_piezas`); entonces no se lee nada del disco.
+    `strategy` elige el solver: "greedy", "beam" (con `beam_width` parciales
+    y un plazo opcional `deadline` en segundos) o "topk" (greedy que sólo
+    mira los `topk` lados más compatibles; para puzzles grandes).  Con
+    `workers` distinto de 1 el greedy se lanza en paralelo desde todas las
+    semillas de esquina (0 = todos los núcleos).  `color_weight` y
+    `color_max` añaden al coste la similitud de color de los bordes (ver
+    `build_cost_tensor`); el índice de "topk" sólo usa la forma, así que
+    combinarlos con "topk" da ValueError.  `prefilter` descarta los pares
+    de lados que no pueden encajar por tipo y longitud (ver
+    `build_cost_tensor`).  Los descriptores de cada pieza se guardan en `cache_dir` (None desactiva la caché en disco).  `render`
+    controla la imagen de salida: "none", "thumbnail" (escala
+    `thumb_scale`) o "full".
+    Si se pasa un dict en `stats`, se rellena con las estadísticas del solver
+    (tiempos en segundos).
+    """
+    stats = {} if stats is None else stats
+    store = (DescriptorCache(cache_dir, descriptor_params())
+             if cache_dir is not None else None)
+
+    t0 = time.perf_counter()
+    with profiler.etapa("descriptors"):
+        if isinstance(pieces_dir, dict):
+            cache = describe_pieces(pieces_dir, store)
+        else:
+            cache = load_piece_descriptors(pieces_dir, store)
+    if not cache:
         raise FileNotFoundError("❌ No hay PNG en la carpeta de entrada.")
+    stats["descriptors_s"] = time.perf_counter() - t0
 
-    cache: Dict[int, dict] = {}
-    for idx, (name, _, cnt, img) in enumerate(pieces):
-        borders, _ = extract_borders_from_contour(cnt)
-        cache[idx] = {
-            "img": img,
-            "borders": borders,
-            "straight": classify_straight_sides(borders),
-            "name": name,
-        }
-        print(f"✔︎ Pieza {idx:02d}: {name}  rectos={cache[idx]['straight'] or '—'}")
+    for idx, info in cache.items():
+        print(f"✔︎ Pieza {idx:02d}: {info['name']}  rectos={info['straight'] or '—'}")
+    if store:
+        stats["descriptor_cache"] = {"hits": store.hits, "misses": store.misses}
+        print(f"🗄️  Caché de descriptores: {store.hits} aciertos, "
+              f"{store.misses} fallos ({stats['descriptors_s'] * 1000:.1f} ms)")
 
-    places, score = solver_greedy(cache)
-    matrix = compose_and_output(cache, places, Path(output_path), score)
+    return solve_cache(cache, output_path, stats, strategy, beam_width, deadline,
+                       workers, render, thumb_scale, topk, color_weight, color_max,
+                       prefilter)
+
+
+def solve_cache(cache: Dict[int, dict],
+                output_path: str | Path = "solution_greedy.png",
+                stats: dict | None = None,
+                strategy: str = "greedy",
+                beam_width: int = 8,
+                deadline: float | None = None,
+                workers: int = 1,
+                render: str = "full",
+                thumb_scale: float = 0.25,
+                topk: int = TOPK_DEFAULT,
+                color_weight: float = COLOR_WEIGHT,
+                color_max: float | None = None,
+                prefilter: bool = True,
+                ) -> Tuple[List[List[Tuple[int, int]]], float, Dict[int, str]]:
+    """
+    Resuelve a partir de una caché de descriptores ya construida (la salida
+    de `describe_pieces`, o piezas conservadas entre fotogramas).  Mismos
+    parámetros y resultado que `solve_greedy`.
+    """
+    stats = {} if stats is None else stats
+    if strategy == "topk" and (color_weight or color_max is not None):
+        raise ValueError("color_weight / color_max no se aplican con strategy='topk' "
+                         "(el índice top-k sólo usa la forma)")
+    t0 = time.perf_counter()
+    if strategy == "topk":
+        with profiler.etapa("edge_index", k=topk):
+            index = build_edge_index(cache, topk, stats, prefilter)
+            profiler.contar("comparisons", stats["pairs_compared"])
+            profiler.contar("comparisons_pruned", stats["pairs_pruned"])
+        stats["tensor_s"] = time.perf_counter() - t0
+        print(f"⏱️  Índice top-{topk} de bordes ({4 * len(cache)} lados) "
+              f"en {stats['tensor_s'] * 1000:.1f} ms")
+    else:
+        with profiler.etapa("tensor", pieces=len(cache)):
+            cost = build_cost_tensor(cache, prefilter, stats, color_weight=color_weight,
+                                     color_max=color_max)
+            profiler.contar("comparisons", stats["pairs_total"] - stats["pairs_pruned"])
+            profiler.contar("comparisons_pruned", stats["pairs_pruned"])
+        stats["tensor_s"] = time.perf_counter() - t0
+        print(f"⏱️  Tensor de compatibilidad {len(cache)}×4×{len(cache)}×4 "
+              f"en {stats['tensor_s'] * 1000:.1f} ms")
+        if "color_s" in stats:
+            print(f"🎨 Franjas de color en {stats['color_s'] * 1000:.1f} ms; "
+                  f"{stats.get('pairs_color_pruned', 0)} pares descartados por color")
+        print(f"✂️  Prefiltro de bordes: {stats['pairs_pruned']}/{stats['pairs_total']} "
+              f"pares descartados ({stats['prune_rate']:.0%})")
+
+    t0 = time.perf_counter()
+    with profiler.etapa("solver", strategy=strategy):
+        if strategy == "topk":
+            places, score = solver_topk(cache, index, stats)
+        elif strategy == "beam":
+            places, score = solver_beam(cache, cost, beam_width, deadline, stats)
+        elif strategy == "greedy" and workers != 1:
+            places, score = solver_parallel(cache, cost, workers or None, stats)
+        elif strategy == "greedy":
+            places, score = solver_greedy(cache, cost)
+        else:
+            raise ValueError(f"Estrategia desconocida: {strategy}")
+        profiler.contar("pieces_placed", len(places))
+        for clave in ("beam_expanded", "beam_pruned", "topk_fallbacks", "seeds"):
+            if clave in stats:
+                profiler.contar(clave, stats[clave])
+    stats["solver_s"] = time.perf_counter() - t0
+    with profiler.etapa("compose", render=render):
+        matrix = compose_and_output(cache, places, Path(output_path), score,
+                                    render, thumb_scale, stats)
     idx2name = {idx: info["name"] for idx, info in cache.items()}
     return matrix, score, idx2name
 
@@ -303,9 +1070,44 @@ if __name__ == "__main__":
                     help="Directorio con PNG de piezas")
     ap.add_argument("-o", "--output", default="solution_greedy.png",
                     help="Ruta de la imagen ensamblada")
+    ap.add_argument("--strategy", choices=["greedy", "beam", "topk"], default="greedy",
+                    help="Solver a utilizar")
+    ap.add_argument("--topk", type=int, default=TOPK_DEFAULT,
+                    help="Lados candidatos por lado con --strategy topk")
+    ap.add_argument("--color-weight", type=float, default=COLOR_WEIGHT,
+                    help="Peso del ΔE de color en el coste (0 = sólo forma; no con topk)")
+    ap.add_argument("--color-max", type=float, default=None,
+                    help="ΔE a partir del cual un par se descarta sin mirar la forma (no con topk)")
+    ap.add_argument("--no-prefilter", action="store_true",
+                    help="No descartar pares de lados por tipo (saliente / entrante) ni longitud")
+    ap.add_argument("--beam-width", type=int, default=8,
+                    help="Ensamblados parciales que conserva el beam search")
+    ap.add_argument("--deadline", type=float, default=None,
+                    help="Plazo en segundos del beam search")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="Procesos para el greedy multi-semilla (0 = todos los núcleos)")
+    ap.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR),
+                    help="Directorio de la caché de descriptores")
+    ap.add_argument("--no-cache", action="store_true",
+                    help="No leer ni escribir la caché de descriptores")
+    ap.add_argument("--render", choices=RENDER_MODES, default="full",
+                    help="Imagen de salida: ninguna, miniatura o completa")
+    ap.add_argument("--thumb-scale", type=float, default=0.25,
+                    help="Escala de la miniatura con --render thumbnail")
     args = ap.parse_args()
 
-    matrix, score, idx2name = solve_greedy(args.input, args.output)
+    matrix, score, idx2name = solve_greedy(args.input, args.output,
+                                           strategy=args.strategy,
+                                           beam_width=args.beam_width,
+                                           deadline=args.deadline,
+                                           workers=args.workers,
+                                           cache_dir=None if args.no_cache else args.cache_dir,
+                                           render=args.render,
+                                           thumb_scale=args.thumb_scale,
+                                           topk=args.topk,
+                                           color_weight=args.color_weight,
+                                           color_max=args.color_max,
+                                           prefilter=not args.no_prefilter)
 
     print("\nRotaciones aplicadas por el solver:")
     for row in matrix:
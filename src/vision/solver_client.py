@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# solver_client.py
+#
+# Cliente mínimo de solver_daemon.py.  Sólo usa la biblioteca estándar (no
+# importa cv2 ni numpy), así que arranca en milisegundos.  Escribe en stdout
+# el JSON de la respuesta y, opcionalmente, los mismos dos ficheros que
+# main.py.
+#
+# Uso CLI:
+#   python solver_client.py in/puzzle_con_piezas.png [--send-bytes]
+#   python solver_client.py img.png --unix /tmp/puzzle.sock --strategy beam
+#   python solver_client.py --stats | --ping | --shutdown
+# ------------------------------------------------------------------------------
+
+from __future__ import annotations
+import argparse
+import base64
+import json
+import os
+import socket
+import sys
+
+HOST, PORT = "127.0.0.1", 5055
+
+
+def request(msg: dict, host: str = HOST, port: int = PORT,
+            unix: str | None = None, timeout: float | None = 60.0) -> dict:
+    """Envía un mensaje al servicio y devuelve la respuesta."""
+    if unix:
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        addr = unix
+    else:
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        addr = (host, port)
+    s.settimeout(timeout)
+    with s:
+        s.connect(addr)
+        with s.makefile("rwb") as f:
+            f.write(json.dumps(msg).encode() + b"\n")
+            f.flush()
+            line = f.readline()
+    if not line:
+        raise ConnectionError("El servicio cerró la conexión sin responder")
+    return json.loads(line)
+
+
+def solve(image: str, params: dict | None = None, send_bytes: bool = False,
+          **conn) -> dict:
+    """Petición SOLVE por ruta (el servicio lee el fichero) o con los bytes."""
+    msg = {"type": "SOLVE", "params": params or {}}
+    if send_bytes:
+        with open(image, "rb") as f:
+            msg["image_b64"] = base64.b64encode(f.read()).decode()
+    else:
+        msg["image"] = os.path.abspath(image)
+    return request(msg, **conn)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Cliente del servicio de solver.")
+    ap.add_argument("image", nargs="?", help="Imagen del tablero a resolver")
+    ap.add_argument("--host", default=HOST)
+    ap.add_argument("--port", type=int, default=PORT)
+    ap.add_argument("--unix", default=None, help="Socket Unix del servicio")
+    ap.add_argument("--send-bytes", action="store_true",
+                    help="Enviar la imagen en la petición en lugar de la ruta")
+    ap.add_argument("--strategy", choices=["greedy", "beam", "topk"], default=None)
+    ap.add_argument("--beam-width", type=int, default=None)
+    ap.add_argument("--topk", type=int, default=None)
+    ap.add_argument("--color-weight", type=float, default=None)
+    ap.add_argument("--color-max", type=float, default=None)
+    ap.add_argument("--no-prefilter", action="store_true")
+    ap.add_argument("--pyramid", type=float, default=None)
+    ap.add_argument("--out-dir", default=None,
+                    help="Guardar solution_greedy.json y piezas_info.json aquí")
+    ap.add_argument("--ping", action="store_true")
+    ap.add_argument("--stats", action="store_true")
+    ap.add_argument("--shutdown", action="store_true")
+    args = ap.parse_args()
+
+    conn = {"host": args.host, "port": args.port, "unix": args.unix}
+    if args.ping or args.stats or args.shutdown:
+        kind = "PING" if args.ping else "STATS" if args.stats else "SHUTDOWN"
+        print(json.dumps(request({"type": kind}, **conn), indent=2))
+        sys.exit(0)
+    if not args.image:
+        ap.error("falta la imagen")
+
+    params = {k: v for k, v in (("strategy", args.strategy),
+                                ("beam_width", args.beam_width),
+                                ("topk", args.topk),
+                                ("color_weight", args.color_weight),
+                                ("color_max", args.color_max),
+                                ("prefilter", False if args.no_prefilter else None),
+                                ("pyramid", args.pyramid)) if v is not None}
+    resp = solve(args.image, params, args.send_bytes, **conn)
+    if resp.get("type") != "RESULT":
+        print(json.dumps(resp), file=sys.stderr)
+        sys.exit(1)
+
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+        for name, key in (("solution_greedy.json", "full"), ("piezas_info.json", "info")):
+            with open(os.path.join(args.out_dir, name), "w") as f:
+                json.dump(resp[key], f, indent=2)
+    print(json.dumps(resp, indent=2))
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# solver_daemon.py
+#
+# Servicio local del pipeline de visión que se queda en marcha: cv2, shapely
+# y numpy se importan una sola vez y las cachés (descriptores, etapas y la
+# caché de páginas del SO) se mantienen calientes entre peticiones.
+#
+# Protocolo: una línea JSON por mensaje (como sockets/), sobre TCP local o
+# socket Unix.  Peticiones:
+#   {"type": "SOLVE", "image": "in/puzzle.png", "params": {...}}
+#   {"type": "SOLVE", "image_b64": "<PNG en base64>", "params": {...}}
+#   {"type": "PING"} · {"type": "STATS"} · {"type": "SHUTDOWN"}
+# Respuesta a SOLVE:
+#   {"type": "RESULT", "full": <solution_greedy.json>,
+#    "info": <piezas_info.json>, "timings": {...}}   o   {"type": "ERROR", ...}
+#
+# `params` admite strategy, beam_width, deadline, workers, topk, color_weight,
+# color_max, prefilter, pyramid y jobs.
+#
+# Uso CLI:
+#   python solver_daemon.py [--port 5055 | --unix /tmp/puzzle.sock] [--no-cache]
+# ------------------------------------------------------------------------------
+
+from __future__ import annotations
+import argparse
+import base64
+import contextlib
+import io
+import json
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from pipeline import resultado_json, run_pipeline
+from stage_cache import DEFAULT_CACHE_DIR as STAGE_CACHE_DIR
+
+HOST, PORT = "127.0.0.1", 5055
+BASE_DIR   = Path(__file__).resolve().parent
+WARMUP_IMG = BASE_DIR / "in" / "puzzle_con_piezas.png"
+
+SOLVER_PARAMS = {"strategy", "beam_width", "deadline", "workers", "topk",
+                 "color_weight", "color_max", "prefilter"}
+
+
+def send(f, obj):
+    f.write(json.dumps(obj).encode() + b"\n")
+    f.flush()
+
+
+def recv(f):
+    line = f.readline()
+    return json.loads(line) if line else None
+
+
+class SolverService:
+    """Ejecuta las peticiones SOLVE de una en una sobre el proceso caliente."""
+
+    def __init__(self, use_cache: bool = True, verbose: bool = False):
+        self.cache_dir = STAGE_CACHE_DIR if use_cache else None
+        self.verbose = verbose
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.requests = 0
+        self.busy_s = 0.0
+
+    def solve(self, msg: dict) -> dict:
+        params = dict(msg.get("params") or {})
+        kw = {k: params.pop(k) for k in list(params) if k in SOLVER_PARAMS}
+        if params.keys() - {"pyramid", "jobs"}:
+            raise ValueError(f"Parámetros desconocidos: {sorted(params.keys() - {'pyramid', 'jobs'})}")
+
+        if "image_b64" in msg:
+            data = np.frombuffer(base64.b64decode(msg["image_b64"]), np.uint8)
+            img = cv2.imdecode(data, cv2.IMREAD_UNCHANGED)
+            if img is None:
+                raise ValueError("image_b64 no es una imagen válida")
+        elif "image" in msg:
+            img = msg["image"]
+        else:
+            raise ValueError("Falta 'image' o 'image_b64'")
+
+        with self.lock:
+            t0 = time.perf_counter()
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out) if not self.verbose else contextlib.nullcontext():
+                res = run_pipeline(img, norm_workers=params.get("jobs", 1),
+                                   seg_pyramid=params.get("pyramid"),
+                                   stage_cache_dir=self.cache_dir, **kw)
+            self.requests += 1
+            self.busy_s += time.perf_counter() - t0
+
+        full, info = resultado_json(res)
+        return {"type": "RESULT", "full": full, "info": info,
+                "timings": res["timings"], "stage_cache": res["stage_cache"]}
+
+    def warmup(self, img: str | Path) -> None:
+        """Resuelve `img` para calentar el proceso, sin contar en STATS."""
+        with self.lock:
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out) if not self.verbose else contextlib.nullcontext():
+                run_pipeline(str(img), stage_cache_dir=self.cache_dir)
+
+    def stats(self) -> dict:
+        return {"type": "STATS", "pid": os.getpid(), "requests": self.requests,
+                "busy_s": self.busy_s, "uptime_s": time.time() - self.started,
+                "cache": self.cache_dir is not None}
+
+
+def handle_client(conn, service: SolverService, stop: threading.Event):
+    with conn, conn.makefile("rwb") as f:
+        while True:
+            try:
+                msg = recv(f)
+            except json.JSONDecodeError as e:
+                send(f, {"type": "ERROR", "error": f"JSON inválido: {e}"})
+                continue
+            if msg is None:
+                return
+            kind = msg.get("type")
+            try:
+                if kind == "SOLVE":
+                    send(f, service.solve(msg))
+                elif kind == "PING":
+                    send(f, {"type": "PONG"})
+                elif kind == "STATS":
+                    send(f, service.stats())
+                elif kind == "SHUTDOWN":
+                    send(f, {"type": "BYE"})
+                    stop.set()
+                    return
+                else:
+                    send(f, {"type": "ERROR", "error": f"Tipo desconocido: {kind}"})
+            except Exception as e:                  # el servicio no debe caer
+                send(f, {"type": "ERROR", "error": f"{type(e).__name__}: {e}"})
+
+
+def serve(host: str = HOST, port: int = PORT, unix: str | None = None,
+          use_cache: bool = True, warmup: bool = True, verbose: bool = False) -> None:
+    service = SolverService(use_cache, verbose)
+    if warmup and WARMUP_IMG.exists():
+        # primera pasada: inicializa OpenCV/NumPy y deja las cachés en memoria
+        t0 = time.perf_counter()
+        try:
+            service.warmup(WARMUP_IMG)
+        except Exception as e:
+            print(f"⚠️  Calentamiento fallido: {e}")
+        print(f"🔥 Calentado en {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    if unix:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(unix)
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        s.bind(unix)
+        where = unix
+    else:
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        s.bind((host, port))
+        where = f"{host}:{port}"
+
+    stop = threading.Event()
+    with s:
+        s.listen()
+        s.settimeout(0.2)
+        print(f"🧩 Solver escuchando en {where} (pid {os.getpid()})", flush=True)
+        while not stop.is_set():
+            try:
+                conn, _ = s.accept()
+            except socket.timeout:
+                continue
+            conn.settimeout(None)
+            threading.Thread(target=handle_client, args=(conn, service, stop),
+                             daemon=True).start()
+    if unix:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(unix)
+    print("👋 Solver detenido")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Servicio local del solver de visión.")
+    ap.add_argument("--host", default=HOST, help="Dirección TCP (sólo local)")
+    ap.add_argument("--port", type=int, default=PORT, help="Puerto TCP")
+    ap.add_argument("--unix", default=None, help="Escuchar en este socket Unix")
+    ap.add_argument("--no-cache", action="store_true",
+                    help="No usar la caché de etapas entre peticiones")
+    ap.add_argument("--no-warmup", action="store_true",
+                    help="No resolver la imagen de ejemplo al arrancar")
+    ap.add_argument("-v", "--verbose", action="store_true",
+                    help="Mostrar la salida del pipeline de cada petición")
+    args = ap.parse_args()
+    serve(args.host, args.port, args.unix, not args.no_cache,
+          not args.no_warmup, args.verbose)
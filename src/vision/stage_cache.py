@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# stage_cache.py
+#
+# Caché en disco, direccionada por contenido, de la salida de cada etapa del
+# pipeline de visión (segmentar, normalizar, resolver).  La clave de una
+# etapa es el hash de sus entradas (la clave de la etapa anterior o los
+# bytes de la imagen) y de sus parámetros, así que cambiar un parámetro sólo
+# invalida esa etapa y las posteriores.
+#
+# Cada entrada es un pickle.  El directorio tiene un tamaño máximo y se
+# recorta con el mismo LRU por mtime que la caché de descriptores (tamaño
+# total en memoria, temporales `*.pkl.tmp` fuera del patrón del LRU).
+# ------------------------------------------------------------------------------
+
+from __future__ import annotations
+import hashlib
+import json
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Dict
+
+from descriptor_cache import LOW_WATER, dir_bytes, evict_lru, file_bytes
+
+CACHE_VERSION     = 1
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / ".cache" / "stages"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class StageCache:
+    """Almacén de resultados de etapa {clave: objeto} con LRU en disco."""
+
+    def __init__(self, root: str | Path = DEFAULT_CACHE_DIR,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._bytes = dir_bytes(self.root, "*.pkl")  # tamaño actual, en memoria
+        self.hits = self.misses = 0
+        self.estado: Dict[str, str] = {}        # etapa → "hit" / "miss"
+
+    @staticmethod
+    def key(stage: str, data: bytes | str, params: dict | None = None) -> str:
+        """Clave de `stage` a partir de sus entradas y parámetros."""
+        h = hashlib.sha256(json.dumps({"version": CACHE_VERSION, "stage": stage,
+                                       **(params or {})}, sort_keys=True,
+                                      default=str).encode())
+        h.update(data.encode() if isinstance(data, str) else data)
+        return h.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.pkl"
+
+    def get(self, stage: str, key: str) -> Any | None:
+        path = self._path(key)
+        try:
+            with path.open("rb") as f:
+                value = pickle.load(f)
+        except (FileNotFoundError, OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            self.estado[stage] = "miss"
+            return None
+        os.utime(path)                              # marca de uso para el LRU
+        self.hits += 1
+        self.estado[stage] = "hit"
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        path = self._path(key)
+        tmp = self.root / f"{key}.{os.getpid()}.pkl.tmp"
+        with tmp.open("wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._bytes += file_bytes(tmp) - file_bytes(path)
+        os.replace(tmp, path)
+        if self._bytes > self.max_bytes:
+            self._bytes = evict_lru(self.root, int(self.max_bytes * LOW_WATER), "*.pkl")[1]
+
+    def clear(self) -> None:
+        for f in self.root.glob("*.pkl"):
+            f.unlink(missing_ok=True)
+        self._bytes = 0
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# stream.py
+#
+# Modo streaming: sigue el tablero sobre un flujo de fotogramas (un vídeo o
+# una secuencia de imágenes hacen de cámara) sin repetir en cada uno la
+# cadena completa segmentar → normalizar → describir.
+#
+# Por fotograma:
+#   1. diferencia con el fotograma anterior (a escala reducida) → regiones
+#      que han cambiado
+#   2. las piezas cuya caja toca una región cambiada se descartan y sólo esa
+#      región (ampliada con sus cajas) se vuelve a segmentar
+#   3. sólo las piezas nuevas se orientan y describen; las demás conservan
+#      sus descriptores y su id
+#
+# Uso CLI:
+#   python stream.py -i video.mp4 [--pyramid 0.25] [--solve]
+#   python stream.py -i carpeta_con_frames/
+# ------------------------------------------------------------------------------
+
+from __future__ import annotations
+import argparse
+import glob
+import os
+import time
+from typing import Dict, Iterator, List, Tuple
+
+import cv2
+import numpy as np
+
+from normalize_pieces import orientar
+from segment_pieces import AREA_REL_MIN, piezas_en_imagen, piezas_en_roi
+from solve_puzzle_borders import describe_pieces, solve_cache
+
+DIFF_ESCALA   = 0.25   # escala de la diferencia entre fotogramas
+DIFF_UMBRAL   = 25     # diferencia de gris que cuenta como cambio
+DIFF_AREA_MIN = 4      # px (a DIFF_ESCALA) de una región cambiada
+MARGEN_PX     = 8      # margen alrededor de cada región cambiada
+IOU_MISMA     = 0.5    # solape para conservar el id de una pieza re-segmentada
+
+Rect = Tuple[int, int, int, int]          # (x0, y0, x1, y1)
+
+
+# ─────────── FUENTES ───────────
+def leer_frames(fuente: str) -> Iterator[np.ndarray]:
+    """Fotogramas BGR de un vídeo, una carpeta de imágenes o un patrón glob."""
+    if os.path.isdir(fuente):
+        ficheros = sorted(f for ext in ("png", "jpg", "jpeg")
+                          for f in glob.glob(os.path.join(fuente, f"*.{ext}")))
+    elif any(c in fuente for c in "*?["):
+        ficheros = sorted(glob.glob(fuente))
+    else:
+        ficheros = None
+
+    if ficheros is not None:
+        for f in ficheros:
+            img = cv2.imread(f, cv2.IMREAD_COLOR)
+            if img is not None:
+                yield img
+        return
+
+    cap = cv2.VideoCapture(fuente)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"No se pudo abrir la fuente: {fuente}")
+    try:
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            yield frame
+    finally:
+        cap.release()
+
+
+# ─────────── GEOMETRÍA ───────────
+def _caja_a_rect(bbox: Tuple[int, int, int, int]) -> Rect:
+    x, y, w, h = bbox
+    return x, y, x + w, y + h
+
+
+def _solapan(a: Rect, b: Rect) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def _union(a: Rect, b: Rect) -> Rect:
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+
+def _iou(a: Rect, b: Rect) -> float:
+    iw = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    ih = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = iw * ih
+    area = lambda r: (r[2] - r[0]) * (r[3] - r[1])
+    return inter / float(area(a) + area(b) - inter) if inter else 0.0
+
+
+def _fusionar(rects: List[Rect]) -> List[Rect]:
+    """Une los rectángulos que se solapan hasta que no quede ninguno."""
+    rects = list(rects)
+    cambiado = True
+    while cambiado:
+        cambiado = False
+        for i in range(len(rects)):
+            for j in range(i + 1, len(rects)):
+                if _solapan(rects[i], rects[j]):
+                    rects[i] = _union(rects[i], rects.pop(j))
+                    cambiado = True
+                    break
+            if cambiado:
+                break
+    return rects
+
+
+# ─────────── SEGUIMIENTO ───────────
+class SeguidorTablero:
+    """
+    Estado del tablero entre fotogramas: {id: {"bbox", "area", "angle",
+    "entry"}}, donde `entry` es la entrada de descriptores que usa el solver.
+    """
+
+    def __init__(self, escala_piramide: float = 0.25):
+        self.escala = escala_piramide
+        self.piezas: Dict[int, dict] = {}
+        self._prev: np.ndarray | None = None
+        self._shape: Tuple[int, ...] | None = None
+        self._siguiente_id = 0
+        self.n_frames = 0
+
+    # — diferencia entre fotogramas —
+    def _reducida(self, frame: np.ndarray) -> np.ndarray:
+        small = cv2.resize(frame, None, fx=DIFF_ESCALA, fy=DIFF_ESCALA,
+                           interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    def _regiones_cambiadas(self, gris: np.ndarray) -> List[Rect]:
+        diff = cv2.absdiff(gris, self._prev)
+        _, mask = cv2.threshold(diff, DIFF_UMBRAL, 255, cv2.THRESH_BINARY)
+        mask = cv2.dilate(mask, np.ones((3, 3), np.uint8), iterations=1)
+        n, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        H, W = self._shape[:2]
+        rects = []
+        for x, y, w, h, area in stats[1:]:
+            if area < DIFF_AREA_MIN:
+                continue
+            rects.append((max(0, int(x / DIFF_ESCALA) - MARGEN_PX),
+                          max(0, int(y / DIFF_ESCALA) - MARGEN_PX),
+                          min(W, int(np.ceil((x + w) / DIFF_ESCALA)) + MARGEN_PX),
+                          min(H, int(np.ceil((y + h) / DIFF_ESCALA)) + MARGEN_PX)))
+        return rects
+
+    def _zonas_sucias(self, rects: List[Rect]) -> Tuple[List[Rect], List[int]]:
+        """Amplía las regiones con las cajas de las piezas que tocan."""
+        afectadas: set[int] = set()
+        zonas = _fusionar(rects)
+        while True:
+            nuevas = {pid for pid, p in self.piezas.items() if pid not in afectadas
+                      and any(_solapan(_caja_a_rect(p["bbox"]), z) for z in zonas)}
+            if not nuevas:
+                return zonas, sorted(afectadas)
+            afectadas |= nuevas
+            zonas = _fusionar(zonas + [_caja_a_rect(self.piezas[p]["bbox"]) for p in nuevas])
+
+    # — descriptores —
+    def _describir(self, nuevas: Dict[int, Tuple[Tuple[int, int, int, int], np.ndarray]]) -> None:
+        orientadas, angulos, areas = {}, {}, {}
+        for pid, (bbox, rgba) in nuevas.items():
+            areas[pid] = cv2.countNonZero(rgba[:, :, 3])
+            pieza = orientar(rgba)
+            if pieza is None:
+                continue
+            orientadas[f"piece_{pid}.png"] = pieza
+            angulos[pid] = pieza.angle
+        cache = describe_pieces(orientadas)
+        por_nombre = {e["name"]: e for e in cache.values()}
+        for pid, (bbox, _) in nuevas.items():
+            entry = por_nombre.get(f"piece_{pid}.png")
+            if entry is not None:
+                self.piezas[pid] = {"bbox": bbox, "area": areas[pid],
+                                    "angle": angulos[pid], "entry": entry}
+
+    def _nuevo_id(self) -> int:
+        self._siguiente_id += 1
+        return self._siguiente_id - 1
+
+    def procesar(self, frame: np.ndarray) -> dict:
+        """
+        Actualiza el tablero con un fotograma.  Devuelve estadísticas:
+        regiones cambiadas, piezas conservadas, descritas y eliminadas, y
+        el tiempo en ms.
+        """
+        t0 = time.perf_counter()
+        gris = self._reducida(frame)
+        stats = {"frame": self.n_frames, "regiones": 0, "conservadas": 0,
+                 "descritas": 0, "eliminadas": 0}
+
+        if self._prev is None or frame.shape != self._shape:
+            self._shape = frame.shape
+            self.piezas.clear()
+            self._describir({self._nuevo_id(): (bbox, rgba)
+                             for bbox, rgba in piezas_en_imagen(frame, self.escala).items()})
+            stats["descritas"] = len(self.piezas)
+        else:
+            rects = self._regiones_cambiadas(gris)
+            stats["regiones"] = len(rects)
+            if rects:
+                zonas, afectadas = self._zonas_sucias(rects)
+                viejas = {pid: _caja_a_rect(self.piezas.pop(pid)["bbox"]) for pid in afectadas}
+
+                halladas: Dict[Tuple[int, int, int, int], np.ndarray] = {}
+                for z in zonas:
+                    halladas.update(piezas_en_roi(frame, z))
+                # mismo filtro relativo de área que la segmentación completa
+                if self.piezas:
+                    minima = AREA_REL_MIN * np.median([p["area"] for p in self.piezas.values()])
+                    halladas = {b: p for b, p in halladas.items()
+                                if cv2.countNonZero(p[:, :, 3]) >= minima}
+
+                # mismo id si la pieza apenas se ha movido
+                nuevas = {}
+                for bbox, rgba in halladas.items():
+                    r = _caja_a_rect(bbox)
+                    pid = max(viejas, key=lambda v: _iou(viejas[v], r), default=None)
+                    if pid is None or _iou(viejas[pid], r) < IOU_MISMA:
+                        pid = self._nuevo_id()
+                    else:
+                        viejas.pop(pid)
+                    nuevas[pid] = (bbox, rgba)
+                self._describir(nuevas)
+                stats["descritas"] = len(nuevas)
+                stats["eliminadas"] = len(viejas)
+            stats["conservadas"] = len(self.piezas) - stats["descritas"]
+
+        self._prev = gris
+        self.n_frames += 1
+        stats["ms"] = (time.perf_counter() - t0) * 1000
+        return stats
+
+    # — solver —
+    def cache(self) -> Dict[int, dict]:
+        """Caché del solver {idx: entrada} con las piezas actuales (por id)."""
+        return {i: self.piezas[pid]["entry"] for i, pid in enumerate(sorted(self.piezas))}
+
+    def resolver(self, **solver_kw):
+        """Resuelve con los descriptores conservados (ver `solve_cache`)."""
+        solver_kw.setdefault("render", "none")
+        return solve_cache(self.cache(), **solver_kw)
+
+
+# ─────────── CLI ───────────
+def run(fuente: str, escala: float, resolver: bool, max_frames: int | None) -> None:
+    seguidor = SeguidorTablero(escala)
+    tiempos, descritas = [], 0
+    for frame in leer_frames(fuente):
+        if max_frames is not None and seguidor.n_frames >= max_frames:
+            break
+        st = seguidor.procesar(frame)
+        tiempos.append(st["ms"])
+        descritas += st["descritas"]
+        print(f"🎞️  frame {st['frame']:4d}: {st['regiones']} regiones · "
+              f"{st['descritas']} descritas · {st['conservadas']} conservadas · "
+              f"{st['eliminadas']} eliminadas · {st['ms']:.1f} ms")
+
+        n = len(seguidor.piezas)
+        if resolver and (st["descritas"] or st["eliminadas"]) and n >= 4 and int(n ** 0.5) ** 2 == n:
+            try:
+                _, score, _ = seguidor.resolver()
+                print(f"   🧩 score={score:.4f}")
+            except RuntimeError as e:
+                print(f"   ⚠️  {e}")
+
+    if tiempos:
+        print(f"\n⏱️  {len(tiempos)} fotogramas · media {np.mean(tiempos):.1f} ms · "
+              f"{descritas} descripciones (frente a "
+              f"{len(seguidor.piezas) * len(tiempos)} re-segmentando cada fotograma)")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Seguimiento incremental del tablero.")
+    ap.add_argument("-i", "--input", required=True,
+                    help="Vídeo, carpeta de imágenes o patrón glob de fotogramas")
+    ap.add_argument("--pyramid", type=float, default=0.25, metavar="ESCALA",
+                    help="Escala de la segmentación piramidal del primer fotograma")
+    ap.add_argument("--solve", action="store_true",
+                    help="Resolver el puzzle cada vez que cambian las piezas")
+    ap.add_argument("--max-frames", type=int, default=None,
+                    help="Procesar como mucho este número de fotogramas")
+    args = ap.parse_args()
+    run(args.input, args.pyramid, args.solve, args.max_frames)
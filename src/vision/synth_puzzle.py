@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# synth_puzzle.py
+#
+# Generador de puzzles sintéticos N×M con solución conocida.
+#
+# Cada borde interior recibe una lengüeta (saliente en una pieza, entrante en
+# la vecina) de posición y tamaño aleatorios; los bordes exteriores son
+# rectos.  La textura es una imagen aleatoria suave (sin píxeles casi negros,
+# para que la segmentación por umbral funcione) y cada pieza se gira un
+# múltiplo aleatorio de 90° más una inclinación aleatoria (--tilt) y se
+# coloca en una casilla aleatoria sobre fondo negro, como en las fotos de in/.
+#
+# La verdad de referencia guarda, por pieza, su celda (fila, col), el centro
+# de su caja en la imagen generada y el ángulo aplicado.
+#
+# Uso CLI:
+#   python synth_puzzle.py --rows 5 --cols 5 --seed 1 -o in/synth_5x5.png
+#   (escribe también in/synth_5x5.json con la verdad de referencia)
+# ------------------------------------------------------------------------------
+
+from __future__ import annotations
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+LADO      = 100     # lado de la celda en px
+SEPARACION = 24     # px mínimos entre piezas colocadas
+BRILLO_MIN = 40     # valor mínimo de la textura (el fondo es 0)
+
+
+# ─────────── BORDES ───────────
+def _perfil(rng: np.random.Generator, L: float, n_arco: int = 40) -> np.ndarray:
+    """
+    Perfil de una lengüeta sobre el segmento (0,0)→(L,0), saliendo hacia +y:
+    tramo recto, cuello y cabeza circular (más de media vuelta).
+    """
+    c = L * (0.5 + rng.uniform(-0.08, 0.08))
+    r = L * rng.uniform(0.11, 0.15)
+    w = r * rng.uniform(1.0, 1.4)                  # anchura del cuello (< 2r)
+    d = np.sqrt(r * r - (w / 2) ** 2)              # altura del centro de la cabeza
+    a0 = np.arctan2(-d, -w / 2) % (2 * np.pi)      # cuello izquierdo (~240°)
+    a1 = np.arctan2(-d, w / 2)                     # cuello derecho (~-60°)
+    t = np.linspace(a0, a1, n_arco)
+    arco = np.column_stack([c + r * np.cos(t), d + r * np.sin(t)])
+    return np.vstack([[0.0, 0.0], arco, [L, 0.0]])
+
+
+def _borde(p0, p1, perfil: np.ndarray | None, signo: int) -> np.ndarray:
+    """Lleva el perfil al segmento p0→p1; `signo` elige el lado de la lengüeta."""
+    p0, p1 = np.asarray(p0, float), np.asarray(p1, float)
+    if perfil is None:
+        return np.vstack([p0, p1])
+    u = (p1 - p0) / np.linalg.norm(p1 - p0)
+    n = np.array([-u[1], u[0]]) * signo            # perpendicular (giro +90°)
+    return p0 + perfil[:, :1] * u + perfil[:, 1:] * n
+
+
+def _textura(rng: np.random.Generator, h: int, w: int) -> np.ndarray:
+    """Imagen aleatoria suave con manchas de color, sin tonos casi negros."""
+    base = rng.uniform(0, 255, (max(2, h // 60), max(2, w // 60), 3)).astype(np.float32)
+    img = cv2.resize(base, (w, h), interpolation=cv2.INTER_CUBIC)
+    for _ in range(max(4, h * w // 4000)):
+        centro = (int(rng.integers(0, w)), int(rng.integers(0, h)))
+        color = tuple(float(v) for v in rng.uniform(0, 255, 3))
+        cv2.circle(img, centro, int(rng.integers(4, 24)), color, -1)
+    img = cv2.GaussianBlur(img, (0, 0), 2.0)
+    return np.clip(img, BRILLO_MIN, 255).astype(np.uint8)
+
+
+# ─────────── GENERADOR ───────────
+def generar_puzzle(filas: int, cols: int, seed: int = 0, lado: int = LADO,
+                   inclinacion: float = 45.0) -> Tuple[np.ndarray, Dict]:
+    """
+    Genera un puzzle filas×cols.  Devuelve (imagen BGR con las piezas
+    giradas sobre fondo negro, verdad de referencia).  Cada pieza se gira
+    un múltiplo aleatorio de 90° más una inclinación uniforme en
+    ±`inclinacion` grados (0 = sólo giros rectos).
+    """
+    rng = np.random.default_rng(seed)
+    L = float(lado)
+
+    # Bordes compartidos: H[r][c] horizontal (y = r·L), V[r][c] vertical (x = c·L)
+    H = [[(_perfil(rng, L), int(rng.choice((-1, 1)))) if 0 < r < filas else (None, 1)
+          for c in range(cols)] for r in range(filas + 1)]
+    V = [[(_perfil(rng, L), int(rng.choice((-1, 1)))) if 0 < c < cols else (None, 1)
+          for c in range(cols + 1)] for r in range(filas)]
+
+    m = int(L * 0.4)                               # margen para las lengüetas
+    tex = _textura(rng, int(filas * L) + 2 * m, int(cols * L) + 2 * m)
+
+    piezas: List[Tuple[int, int, np.ndarray, np.ndarray]] = []
+    for r in range(filas):
+        for c in range(cols):
+            x0, y0, x1, y1 = c * L + m, r * L + m, (c + 1) * L + m, (r + 1) * L + m
+            poly = np.vstack([
+                _borde((x0, y0), (x1, y0), *H[r][c]),            # top
+                _borde((x1, y0), (x1, y1), *V[r][c + 1]),        # right
+                _borde((x0, y1), (x1, y1), *H[r + 1][c])[::-1],  # bottom
+                _borde((x0, y0), (x0, y1), *V[r][c])[::-1],      # left
+            ])
+            bx, by, bw, bh = cv2.boundingRect(np.round(poly).astype(np.int32))
+            mask = np.zeros((bh, bw), np.uint8)
+            cv2.fillPoly(mask, [np.round(poly - (bx, by)).astype(np.int32)], 255)
+            piezas.append((r, c, tex[by:by + bh, bx:bx + bw], mask))
+
+    # Giro aleatorio de cada pieza
+    giradas = []
+    for r, c, rgb, mask in piezas:
+        ang = 90.0 * int(rng.integers(0, 4)) + float(rng.uniform(-inclinacion, inclinacion))
+        h, w = mask.shape
+        D = int(np.ceil(np.hypot(h, w))) + 2
+        M = cv2.getRotationMatrix2D((w / 2, h / 2), ang, 1.0)
+        M[:, 2] += (D / 2 - w / 2, D / 2 - h / 2)
+        rgb_r = cv2.warpAffine(rgb, M, (D, D), flags=cv2.INTER_LINEAR)
+        mask_r = cv2.warpAffine(mask, M, (D, D), flags=cv2.INTER_NEAREST)
+        ys, xs = np.nonzero(mask_r)
+        y_a, y_b, x_a, x_b = ys.min(), ys.max() + 1, xs.min(), xs.max() + 1
+        giradas.append((r, c, ang, rgb_r[y_a:y_b, x_a:x_b], mask_r[y_a:y_b, x_a:x_b]))
+
+    # Colocación en casillas barajadas con desplazamiento aleatorio
+    n = len(giradas)
+    celda = max(max(g[4].shape) for g in giradas) + SEPARACION
+    ncols = int(np.ceil(np.sqrt(n * 1.6)))
+    nfilas = int(np.ceil(n / ncols))
+    img = np.zeros((nfilas * celda + SEPARACION, ncols * celda + SEPARACION, 3), np.uint8)
+    casillas = [int(k) for k in rng.permutation(nfilas * ncols)[:n]]
+
+    verdad = {"rows": filas, "cols": cols, "seed": seed, "lado": lado,
+              "inclinacion": inclinacion, "pieces": []}
+    for (r, c, ang, rgb, mask), k in zip(giradas, casillas):
+        h, w = mask.shape
+        oy = (k // ncols) * celda + SEPARACION + int(rng.integers(0, celda - SEPARACION - h + 1))
+        ox = (k % ncols) * celda + SEPARACION + int(rng.integers(0, celda - SEPARACION - w + 1))
+        dst = img[oy:oy + h, ox:ox + w]
+        dst[mask > 0] = rgb[mask > 0]
+        verdad["pieces"].append({"row": r, "col": c, "angle": ang,
+                                 "center": [int(ox + w / 2), int(oy + h / 2)],
+                                 "bbox": [ox, oy, w, h]})
+    return img, verdad
+
+
+# ─────────── EVALUACIÓN ───────────
+def asignar_verdad(posiciones: Dict[int, Tuple[int, int]], verdad: Dict
+                   ) -> Dict[int, Tuple[int, int]]:
+    """{i: (fila, col)} de cada pieza segmentada, por el centro más próximo."""
+    centros = np.array([p["center"] for p in verdad["pieces"]], float)
+    celdas = [(p["row"], p["col"]) for p in verdad["pieces"]]
+    out = {}
+    for i, (x, y) in posiciones.items():
+        j = int(np.argmin(np.hypot(centros[:, 0] - x, centros[:, 1] - y)))
+        out[i] = celdas[j]
+    return out
+
+
+def precision(matrix: List[List[Tuple[int, int]]], celda_de: Dict[int, Tuple[int, int]]
+              ) -> Tuple[float, float]:
+    """
+    (precisión directa, precisión de vecinos) de una solución cuadrada
+    `matrix` [[(idx, rot)]], donde `celda_de[idx]` es la celda real de la
+    pieza.  Se toma el mejor de los 4 giros globales del tablero.
+    """
+    ids = np.array([[idx for idx, _ in row] for row in matrix])
+    mejor = (0.0, 0.0)
+    for k in range(4):
+        g = np.rot90(ids, k)
+        n, m = g.shape
+        directa = np.mean([celda_de.get(int(g[r, c])) == (r, c)
+                           for r in range(n) for c in range(m)])
+        pares = ok = 0
+        for r in range(n):
+            for c in range(m):
+                a = celda_de.get(int(g[r, c]))
+                for dr, dc in ((0, 1), (1, 0)):
+                    if r + dr < n and c + dc < m:
+                        b = celda_de.get(int(g[r + dr, c + dc]))
+                        pares += 1
+                        ok += a is not None and b is not None and b == (a[0] + dr, a[1] + dc)
+        mejor = max(mejor, (float(directa), ok / pares if pares else 1.0), key=lambda t: t[1])
+    return mejor
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Generador de puzzles sintéticos.")
+    ap.add_argument("--rows", type=int, default=4)
+    ap.add_argument("--cols", type=int, default=None, help="Por defecto igual a --rows")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--lado", type=int, default=LADO, help="Lado de la celda en px")
+    ap.add_argument("--tilt", type=float, default=45.0,
+                    help="Inclinación máxima (°) sobre el giro recto de cada pieza")
+    ap.add_argument("-o", "--output", default="in/synth.png",
+                    help="PNG de salida (la verdad se guarda junto, en .json)")
+    args = ap.parse_args()
+
+    img, verdad = generar_puzzle(args.rows, args.cols or args.rows, args.seed, args.lado,
+                                 args.tilt)
+    out = Path(args.output)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    cv2.imwrite(str(out), img)
+    out.with_suffix(".json").write_text(json.dumps(verdad, indent=2))
+    print(f"🧩 Puzzle {verdad['rows']}×{verdad['cols']} → {out} "
+          f"({img.shape[1]}×{img.shape[0]} px) + {out.with_suffix('.json').name}")